@@ -0,0 +1,57 @@
+"""Latency benchmark for the live StreamingDetector
+
+Generates --samples readings with the firmware emulator's waveforms and feeds
+them to a StreamingDetector in chunks of the sizes a serial read delivers,
+timing every call. A chunk has to be checked well inside one UI frame
+(16 ms) for its markers to appear on the next one. The deviation events are
+checked against DeviationDetector run over the whole stream at once.
+
+Usage: python benchmarks/bench_anomaly_detector.py [--samples 2000000] [--profile spikes]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from utils.anomaly_detector import StreamingDetector, DEVIATION
+from utils.board_emulator import PROFILES, make_profile
+from utils.thresholds import DeviationDetector
+
+CHUNK_SIZES = (1, 16, 256, 4096)
+FRAME_MS = 16
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--samples', type=int, default=2_000_000)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='spikes')
+    args = parser.parse_args()
+
+    profile = make_profile(args.profile, 50.0, amplitude=100.0, noise=2.0, seed=0)
+    currents = profile(np.arange(args.samples)).astype(np.float64)
+    expected = DeviationDetector(currents).events(StreamingDetector().deviations)
+
+    for chunk in CHUNK_SIZES:
+        count = min(args.samples, chunk * 20_000)
+        detector = StreamingDetector()
+        timings = []
+        deviations = []
+        for start in range(0, count, chunk):
+            began = time.perf_counter()
+            events = detector.process(currents[start:start + chunk], 0.0)
+            timings.append(time.perf_counter() - began)
+            deviations += [event for event in events if event.kind.startswith(DEVIATION)]
+        timings = np.array(timings) * 1e6
+        print(f"chunks of {chunk:>5}: median {np.median(timings):7.1f} us, p99 {np.percentile(timings, 99):7.1f} us, "
+              f"max {timings.max():8.1f} us ({timings.max() / 1000 / FRAME_MS:.1%} of a frame), "
+              f"{count / (timings.sum() / 1e6):,.0f} samples/s, {detector.events_total} events")
+        matched = expected[expected < count]
+        assert len(deviations) == len(matched), "streaming and whole-capture deviation events differ"
+        assert np.array_equal([event.current_ma for event in deviations], currents[matched])
+    print("Deviation events match DeviationDetector over the whole stream")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Redraw-time benchmark for min/max decimation of large captures
+
+For each sample count, times utils.decimation.minmax_decimate for a full and a
+zoomed (10%) view, then the complete redraw of an offscreen pyqtgraph plot
+(decimate + setData + render) with a DecimatedCurve versus a plain curve that
+is handed every raw point. Raw redraws above --raw-max samples are skipped
+because they take too long to be useful.
+
+Usage: python benchmarks/bench_decimation.py [--samples 1000000 10000000] [--width 1600]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+
+from utils.decimation import minmax_decimate
+
+def make_capture(count, seed=0):
+    """Dump-like current trace: noisy baseline with rare single-sample spikes"""
+    rng = np.random.default_rng(seed)
+    x = np.arange(1, count + 1, dtype=np.float64)
+    y = (20 + rng.normal(0, 3, count)).astype(np.float32)
+    spikes = rng.choice(count, size=max(count // 100000, 1), replace=False)
+    y[spikes] = 900
+    return x, y
+
+def best_of(repeats, func):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_decimate(x, y, width, repeats):
+    full = best_of(repeats, lambda: minmax_decimate(x, y, x[0], x[-1], width))
+    zoom_lo = x[len(x) // 2]
+    zoom_hi = x[len(x) // 2 + len(x) // 10 - 1]
+    zoom = best_of(repeats, lambda: minmax_decimate(x, y, zoom_lo, zoom_hi, width))
+    out_x, out_y = minmax_decimate(x, y, x[0], x[-1], width)
+    assert out_y.max() == y.max(), "decimation lost the largest spike"
+    print(f"  minmax_decimate full view   {full * 1000:9.1f} ms  -> {len(out_x)} points")
+    print(f"  minmax_decimate 10% zoom    {zoom * 1000:9.1f} ms")
+
+def bench_redraw(x, y, width, repeats, raw):
+    from PySide6.QtWidgets import QApplication
+    import pyqtgraph as pg
+    from widgets.decimated_curve import DecimatedCurve
+
+    app = QApplication.instance() or QApplication([])
+    plot_widget = pg.PlotWidget()
+    plot_widget.resize(width, 600)
+    plot_widget.show()
+    app.processEvents()
+
+    curve = DecimatedCurve(pen=pg.mkPen('g', width=2))
+    plot_widget.addItem(curve)
+    plot_widget.setXRange(x[0], x[-1], padding=0)
+    curve.set_full_data(x, y)
+
+    def decimated_redraw():
+        curve.redecimate()
+        plot_widget.grab()
+
+    print(f"  redraw decimated            {best_of(repeats, decimated_redraw) * 1000:9.1f} ms")
+    plot_widget.removeItem(curve)
+
+    if raw:
+        plain = plot_widget.plot(pen=pg.mkPen('g', width=2))
+
+        def raw_redraw():
+            plain.setData(x, y)
+            plot_widget.grab()
+
+        print(f"  redraw raw points           {best_of(1, raw_redraw) * 1000:9.1f} ms")
+    else:
+        print("  redraw raw points           (skipped, above --raw-max)")
+    plot_widget.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--width', type=int, default=1600, help="plot width in pixels")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--raw-max', type=int, default=1_000_000,
+                        help="largest sample count to also redraw without decimation")
+    args = parser.parse_args()
+
+    for count in args.samples:
+        x, y = make_capture(count)
+        print(f"{count:,} samples")
+        bench_decimate(x, y, args.width, args.repeats)
+        bench_redraw(x, y, args.width, args.repeats, count <= args.raw_max)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Throughput benchmark for loading saved FRAM dump files
+
+Writes StoreTextFileHere/RAW.txt repeated up to the requested size to a
+temporary file, then times three ways of loading it: the old FileReadWindow
+path (file.read() + substring validation + re.findall), the generic per-line
+parser, and utils.dump_reader.read_dump (mmap + vectorized fast path).
+
+Usage: python benchmarks/bench_dump_reader.py [--mb 50] [--chunk 1048576]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from utils.dump_reader import DumpReader, read_dump
+
+RAW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "StoreTextFileHere", "RAW.txt")
+
+def legacy_load(path):
+    """What FileReadWindow.process_file/parse_and_plot_data used to do"""
+    with open(path, 'r') as file:
+        content = file.read()
+    for section in ("FRAM READING", "Set", "----------", "Start Time:", "End Time:", "Average Current:"):
+        assert section in content
+    matches = re.findall(r'(\d+)\s+(\d+)', content)
+    times = np.array([float(index) for index, _ in matches])
+    currents = np.array([float(current) for _, current in matches], dtype=np.float32)
+    return times, currents
+
+def generic_load(path, chunk_size):
+    """Per-line parsing only, without the vectorized fast path"""
+    reader = DumpReader(os.path.getsize(path))
+    tail = b''
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            reader.handle_lines([line.strip() for line in lines if line.strip()])
+    if tail.strip():
+        reader.handle_lines([tail.strip()])
+    return reader.arrays()
+
+def fast_load(path, chunk_size):
+    return read_dump(path, chunk_size).arrays()
+
+def run(label, size, func):
+    start = time.perf_counter()
+    times, currents = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(times):>12,} samples  {elapsed:8.2f} s  {size / 1e6 / elapsed:8.1f} MB/s")
+    return times, currents
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mb', type=float, default=50, help="size of the generated dump in MB")
+    parser.add_argument('--chunk', type=int, default=1 << 20, help="block size for the streaming readers")
+    args = parser.parse_args()
+
+    with open(RAW_PATH, 'rb') as file:
+        raw = file.read()
+    repeats = max(1, int(args.mb * 1e6 / len(raw)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dump.txt")
+        with open(path, 'wb') as file:
+            for _ in range(repeats):
+                file.write(raw)
+        size = os.path.getsize(path)
+        print(f"Input: {RAW_PATH} x {repeats} ({size / 1e6:.1f} MB)")
+
+        expected = run("legacy read+findall", size, lambda: legacy_load(path))
+        generic = run("generic per-line", size, lambda: generic_load(path, args.chunk))
+        fast = run("read_dump (mmap+numpy)", size, lambda: fast_load(path, args.chunk))
+        for result in (generic, fast):
+            assert np.array_equal(result[0], expected[0]) and np.array_equal(result[1], expected[1])
+
+if __name__ == "__main__":
+    main()
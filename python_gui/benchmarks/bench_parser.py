@@ -0,0 +1,92 @@
+"""Throughput benchmark for the firmware protocol parser
+
+Replays StoreTextFileHere/RAW.txt (repeated up to the requested line count)
+through utils.protocol.parse_line, both on pre-split lines and through the
+full LineFramer + parser path that the serial reader uses. The legacy
+string-based checks from the old MainWindow.update_plot/parse_read_data are
+timed on the same input for comparison.
+
+Usage: python benchmarks/bench_parser.py [--lines 10000000] [--chunk 4096]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.protocol import parse_line
+from utils.serial_communication import LineFramer
+
+RAW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "StoreTextFileHere", "RAW.txt")
+
+def legacy_parse(line):
+    """The per-line substring/split checks the GUI used to run on every line"""
+    if "Index:" in line:
+        int(line.split('Index:')[1].strip())
+    if "Abnormal Storage status:" in line:
+        map(int, line.split('status:')[1].strip().split('/'))
+    if "Current:" in line:
+        parts = line.split('|')
+        if len(parts) == 3:
+            float(parts[0].split(':')[1].replace(" mA", "").strip())
+    if "Set " in line and "Start Time:" not in line:
+        line.split()[1].strip()
+    elif "Start Time:" in line or "End Time:" in line or "Average Current:" in line:
+        line.split(":")[1].strip()
+    elif "----------" in line:
+        pass
+    elif line.strip() and line[0].isdigit():
+        sample_num, current = line.strip().split()
+        int(sample_num), float(current)
+
+def load_lines():
+    with open(RAW_PATH, 'rb') as file:
+        raw = file.read()
+    lines = [line.strip() for line in raw.split(b'\n')]
+    return [line for line in lines if line]
+
+def run(label, total_lines, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {total_lines:>12,} lines  {elapsed:8.2f} s  {total_lines / elapsed:14,.0f} lines/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=10_000_000, help="total lines to parse")
+    parser.add_argument('--chunk', type=int, default=4096, help="read size for the framer benchmark")
+    args = parser.parse_args()
+
+    lines = load_lines()
+    repeats = max(1, args.lines // len(lines))
+    total_lines = repeats * len(lines)
+    text_lines = [line.decode('utf-8') for line in lines]
+    blob = b'\r\n'.join(lines) + b'\r\n'
+
+    def parse_only():
+        for _ in range(repeats):
+            for line in lines:
+                parse_line(line)
+
+    def framed():
+        framer = LineFramer()
+        chunk = args.chunk
+        for _ in range(repeats):
+            for offset in range(0, len(blob), chunk):
+                for line in framer.feed(blob[offset:offset + chunk]):
+                    parse_line(line)
+
+    def legacy():
+        for _ in range(repeats):
+            for line in text_lines:
+                legacy_parse(line)
+
+    print(f"Input: {RAW_PATH} ({len(lines)} lines) x {repeats}")
+    run("parse_line (bytes)", total_lines, parse_only)
+    run(f"LineFramer+parse ({args.chunk} B)", total_lines, framed)
+    run("legacy str checks", total_lines, legacy)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Latency benchmark for re-running the deviation check on a loaded capture
+
+Tiles the readings of StoreTextFileHere/RAW.txt (or --file) up to --samples
+readings in sets of 1000, then times building a DeviationDetector once and
+re-evaluating it for a series of threshold tables, which is what happens on
+every edit of the Serial Read window's threshold table. The per-sample loop
+the firmware runs is timed on a slice for comparison.
+
+Usage: python benchmarks/bench_redetect.py [--file RAW.txt] [--samples 2000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from utils.dump_reader import read_dump
+from utils.thresholds import DeviationDetector, DEFAULT_DEVIATIONS
+
+RAW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "StoreTextFileHere", "RAW.txt")
+SET_SIZE = 1000
+
+def loop_events(currents, deviations):
+    """The firmware's getThreshold comparison, one reading at a time"""
+    events = []
+    for i in range(1, len(currents)):
+        previous = currents[i - 1]
+        if i % SET_SIZE == 0 or previous <= 0:
+            continue
+        if previous <= 30:
+            threshold = deviations[0]
+        elif previous <= 60:
+            threshold = deviations[1]
+        elif previous <= 90:
+            threshold = deviations[2]
+        else:
+            threshold = deviations[3]
+        if abs(currents[i] - previous) / previous * 100 > threshold:
+            events.append(i)
+    return events
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--file', default=RAW_PATH, help="dump file whose readings are tiled")
+    parser.add_argument('--samples', type=int, default=2_000_000)
+    parser.add_argument('--tables', type=int, default=20, help="threshold tables evaluated")
+    args = parser.parse_args()
+
+    _, readings = read_dump(args.file).arrays()
+    currents = np.resize(readings.astype(np.float64), args.samples)
+    set_starts = np.arange(0, args.samples, SET_SIZE)
+
+    start = time.perf_counter()
+    detector = DeviationDetector(currents, set_starts)
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    tables = [DEFAULT_DEVIATIONS] + [rng.uniform(5, 300, 4) for _ in range(args.tables - 1)]
+    timings = []
+    for table in tables:
+        start = time.perf_counter()
+        events = detector.events(table)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    print(f"{args.samples:,} readings: precompute {build * 1000:.1f} ms, re-detect "
+          f"median {np.median(timings):.1f} ms, max {timings.max():.1f} ms over {len(tables)} tables")
+
+    # The loop is far slower; time it on a slice and check both agree there
+    count = min(args.samples, 200_000)
+    start = time.perf_counter()
+    expected = loop_events(currents[:count].tolist(), DEFAULT_DEVIATIONS)
+    loop_time = time.perf_counter() - start
+    vectorized = DeviationDetector(currents[:count], set_starts[set_starts < count]).events()
+    assert np.array_equal(vectorized, expected), "vectorized and loop results differ"
+    print(f"Per-reading loop: {loop_time * 1000:.0f} ms for {count:,} readings "
+          f"({loop_time / count * args.samples * 1000:.0f} ms extrapolated); results match")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""End-to-end throughput benchmark: replay a recording into an offscreen MainWindow
+
+Plays a session or dump file (StoreTextFileHere/RAW.txt on a loop by default)
+through ReplayTransport -> SerialHandler -> IngestWorker -> MainWindow, as
+fast as possible unless --speed is given. Once a second it prints the lines
+ingested, the samples the UI moved into the plot, the backlog left queued
+between them and the samples the bounded display queue dropped (oldest
+first) because the UI could not take them. The UI is keeping up while the
+backlog stays below one frame's worth of samples; the summary gives the
+highest rate sustained that way.
+
+Usage: python benchmarks/bench_replay.py [--file RAW.txt] [--speed 0] [--seconds 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication
+
+from controllers.SerialRead_window import MainWindow, MAX_SAMPLES_PER_FRAME
+
+RAW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "StoreTextFileHere", "RAW.txt")
+
+class NoModeSelection:
+    """Stand-in for the Application the window returns to on errors"""
+    def show_mode_selection(self):
+        raise SystemExit("replay could not be started")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--file', default=RAW_PATH, help="session (.zss) or dump file")
+    parser.add_argument('--speed', type=float, default=0.0, help="replay speed, 0 for as fast as possible")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--no-loop', action='store_true', help="stop at the end of the file")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    window = MainWindow(NoModeSelection(), replay=True,
+                        replay_settings={'path': args.file, 'speed': args.speed,
+                                         'loop': not args.no_loop})
+    window.show()
+
+    print(f"{'t s':>5} {'ingest lines/s':>15} {'UI samples/s':>13} {'backlog':>9} {'dropped':>10}")
+    start = time.perf_counter()
+    last = (start, 0, 0)
+    fell_behind = False
+    while time.perf_counter() - start < args.seconds and not window.replay_reported:
+        deadline = time.perf_counter() + 1.0
+        while time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        now = time.perf_counter()
+        lines = window.serial_handler.meter.lines_total
+        applied = window.samples_applied
+        elapsed = now - last[0]
+        backlog = window.pending_sample_count
+        fell_behind = fell_behind or backlog > MAX_SAMPLES_PER_FRAME
+        dropped = window.sample_queue.stats()['dropped_total']
+        print(f"{now - start:5.1f} {(lines - last[1]) / elapsed:15,.0f} "
+              f"{(applied - last[2]) / elapsed:13,.0f} {backlog:9,} {dropped:10,}")
+        last = (now, lines, applied)
+
+    total = time.perf_counter() - start
+    lines = window.serial_handler.meter.lines_total
+    print(f"Ingested {lines:,} lines in {total:.1f} s ({lines / total:,.0f} lines/s)")
+    if fell_behind:
+        # The UI drains as much as it can every frame, so while it is behind
+        # its drain rate is the most it can sustain
+        print(f"UI fell behind (backlog peaked at {window.backlog_peak:,} samples); "
+              f"maximum sustainable rate {window.samples_applied / total:,.0f} samples/s")
+    else:
+        print(f"UI kept up with {window.samples_applied / total:,.0f} samples/s; "
+              f"the replay, not the UI, was the limit")
+    window.close()
+    # Skip interpreter teardown: queued cross-thread signals still holding
+    # Python objects can crash PySide during finalization
+    sys.stdout.flush()
+    os._exit(0)
+
+if __name__ == "__main__":
+    main()
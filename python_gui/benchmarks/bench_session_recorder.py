@@ -0,0 +1,120 @@
+"""Overhead benchmark for raw serial session recording
+
+Drives a SerialHandler from a stand-in transport that delivers ``Current:``
+lines in 1 ms chunks at each requested line rate (0 = as fast as possible),
+once without and once with a SessionRecorder subscribed. For every run it
+reports the achieved line rate, the reader thread's CPU cost per MB and the
+latency from a chunk's arrival to its parsed records reaching a subscriber,
+which is where recording would show up as added delay. The cost of a single
+SessionRecorder.handle_data call is also timed on its own.
+
+Usage: python benchmarks/bench_session_recorder.py [--rates 10000 100000 0] [--seconds 3]
+                                                   [--fsync interval]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from utils.serial_communication import SerialHandler
+from utils.session_recorder import SessionRecorder, iter_session, FSYNC_POLICIES, FSYNC_INTERVAL
+
+LINE = b"Current: 29 mA | x | Index: 3\r\n"
+CHUNK_INTERVAL = 0.001
+
+class PacedTransport:
+    """Serial stand-in returning one chunk of lines every CHUNK_INTERVAL"""
+    def __init__(self, line_rate):
+        lines_per_chunk = max(1, round(line_rate * CHUNK_INTERVAL)) if line_rate else 256
+        self.chunk = LINE * lines_per_chunk
+        self.paced = bool(line_rate)
+        self.next_due = time.perf_counter()
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return len(self.chunk)
+
+    def read(self, size):
+        if self.paced:
+            delay = self.next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_due += CHUNK_INTERVAL
+        return self.chunk
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+def run(line_rate, seconds, recorder):
+    handler = SerialHandler(transport=PacedTransport(line_rate))
+    latencies = []
+
+    def on_records(records, arrival):
+        latencies.append(time.monotonic() - arrival)
+
+    handler.subscribe(on_records)
+    if recorder:
+        recorder.start()
+        handler.subscribe_raw(recorder.handle_data)
+    handler.start()
+    time.sleep(seconds)
+    handler.stop()
+    if recorder:
+        recorder.stop()
+
+    stats = handler.stats()
+    latencies = np.array(latencies) * 1e6
+    label = "recording" if recorder else "baseline"
+    rate = f"{line_rate:,}" if line_rate else "max"
+    line = (f"{rate:>10} {label:<10} {stats['lines_total'] / seconds:>12,.0f} "
+            f"{handler.meter.cpu_ms_per_mb():>9.1f} {np.percentile(latencies, 50):>9.1f} "
+            f"{np.percentile(latencies, 99):>9.1f}")
+    if recorder:
+        rec = recorder.stats()
+        line += (f"   {rec['bytes_written'] / 1e6:7.1f} MB written, {rec['dropped_bytes']} B dropped, "
+                 f"write max {rec['write_ms_max']:.1f} ms, fsync max {rec['fsync_ms_max']:.1f} ms")
+        assert rec['bytes_written'] + rec['dropped_bytes'] == stats['bytes_total']
+    print(line)
+
+def bench_handle_data(directory, count=1_000_000):
+    recorder = SessionRecorder(directory, max_pending_bytes=1 << 40)
+    chunk = LINE * 32
+    start = time.perf_counter()
+    for _ in range(count):
+        recorder.handle_data(chunk, 0.0)
+    elapsed = time.perf_counter() - start
+    print(f"SessionRecorder.handle_data: {elapsed / count * 1e9:.0f} ns per chunk")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rates', type=int, nargs='+', default=[10000, 100000, 1000000, 0],
+                        help="lines/s per run, 0 for as fast as possible")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_INTERVAL)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_handle_data(directory)
+        print(f"{'lines/s':>10} {'run':<10} {'achieved':>12} {'CPU ms/MB':>9} "
+              f"{'p50 us':>9} {'p99 us':>9}")
+        for line_rate in args.rates:
+            run(line_rate, args.seconds, None)
+            recorder = SessionRecorder(directory, fsync_policy=args.fsync)
+            run(line_rate, args.seconds, recorder)
+
+        # The recording must replay byte for byte
+        replayed = sum(len(data) for path in sorted(os.listdir(directory))
+                       for _, data in iter_session(os.path.join(directory, path)))
+        print(f"Replayed {replayed / 1e6:.1f} MB from {len(os.listdir(directory))} session files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""End-to-end benchmark for sweep_thresholds.py on a generated corpus
+
+Writes --normal and --abnormal dump files produced by the firmware emulator
+(utils.board_emulator) to a temporary directory: normal dumps hold steady
+currents with gaussian noise, abnormal ones the same with load steps or
+spikes. Then runs the full sweep (10^4 tables by default) and reports how long
+the per-dump reduction and the table evaluation took.
+
+Usage: python benchmarks/bench_threshold_sweep.py [--normal 200] [--abnormal 100] [--workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+from utils.board_emulator import BoardEmulator, SAMPLES_PER_SET, make_profile
+import sweep_thresholds
+
+# ``read`` takes single-digit set numbers, so a dump holds sets 1-9
+DUMP_SETS = 9
+
+def write_dump(path, profile):
+    emulator = BoardEmulator(profile, clock=lambda: 0.0)
+    emulator.advance(DUMP_SETS * SAMPLES_PER_SET)
+    dump = emulator.handle_command("read " + ",".join(str(number) for number in range(1, DUMP_SETS + 1)))
+    with open(path, 'wb') as file:
+        file.write(dump)
+
+def write_corpus(directory, normal, abnormal):
+    rng = np.random.default_rng(0)
+    for label, count in (("normal", normal), ("abnormal", abnormal)):
+        os.makedirs(os.path.join(directory, label))
+        for number in range(count):
+            base = rng.uniform(20, 120)
+            if label == "normal":
+                profile = make_profile('steady', base, noise=base * 0.02, seed=number)
+            else:
+                shape = ('steps', 'spikes')[number % 2]
+                profile = make_profile(shape, base, amplitude=base * rng.uniform(0.3, 3),
+                                       noise=base * 0.02, seed=number)
+            write_dump(os.path.join(directory, label, f"{label}_{number:04d}.txt"), profile)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--normal', type=int, default=200)
+    parser.add_argument('--abnormal', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_corpus(directory, args.normal, args.abnormal)
+        print(f"Generated {args.normal} normal and {args.abnormal} abnormal dumps "
+              f"in {time.perf_counter() - start:.1f} s")
+        argv = [os.path.join(directory, "normal"), os.path.join(directory, "abnormal"),
+                "-o", os.path.join(directory, "sweep"), "--no-cache", "--top", "5"]
+        if args.workers:
+            argv += ["--workers", str(args.workers)]
+        start = time.perf_counter()
+        sweep_thresholds.main(argv)
+        print(f"Sweep took {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
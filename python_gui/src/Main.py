@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+import multiprocessing
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from PySide6.QtWidgets import QApplication
@@ -43,9 +44,9 @@ class Application:
                     self.current_window.close()
                     delattr(self, 'current_window')
                 
-                if mode == "serial":
-                    self.logger.debug("Creating MainWindow")
-                    window = MainWindow(self)
+                if mode in ("serial", "replay"):
+                    self.logger.debug(f"Creating MainWindow ({mode})")
+                    window = MainWindow(self, replay=mode == "replay")
                     # Only show and store the window if initialization was successful
                     if hasattr(window, 'initialized') and window.initialized:
                         window.show()
@@ -81,4 +82,6 @@ def main():
     return app.run()
 
 if __name__ == "__main__":
+    # Dump parsing uses spawned worker processes; needed for frozen builds
+    multiprocessing.freeze_support()
     sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Headless batch analysis of saved FRAM dump files
+
+Scans a directory for dumps written by the firmware's ``read`` command,
+parses them in a process pool and writes one row of statistics per set to
+<output>.csv and <output>.npz (one array per column). Only NumPy and the
+non-Qt utils modules are imported, so this runs without PySide6, pyqtgraph
+or a display.
+
+Usage: python analyze_dumps.py DIR [-o dump_summary] [--pattern *.txt] [--recursive]
+                               [--workers N] [--thresholds 300,200,100,50]
+                               [--sample-period 0.001] [--voltage 3.3] [--no-cache]
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from utils.dump_cache import DumpCache, find_dumps
+from utils.dump_stats import (analyze_dump_file, COLUMNS, DEFAULT_SAMPLE_PERIOD,
+                              DEFAULT_SUPPLY_VOLTAGE)
+from utils.thresholds import DEFAULT_DEVIATIONS, THRESHOLD_RANGES
+
+logger = logging.getLogger("analyze_dumps")
+
+def parse_deviations(text):
+    values = tuple(float(value) for value in text.split(','))
+    if len(values) != len(THRESHOLD_RANGES):
+        raise argparse.ArgumentTypeError(
+            f"expected {len(THRESHOLD_RANGES)} values for ranges {', '.join(THRESHOLD_RANGES)} mA")
+    return values
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_columns(path, rows):
+    """Column-oriented binary copy of the table, loadable with np.load"""
+    columns = {}
+    for name in COLUMNS:
+        values = [row[name] for row in rows]
+        if name in ("dump", "set"):
+            columns[name] = np.array(values, dtype=np.str_)
+        elif name == "abnormal":
+            columns[name] = np.array(values, dtype=bool)
+        elif name in ("samples", "deviation_events"):
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array(values, dtype=np.float64)
+    np.savez(path, **columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help="directory containing dump files")
+    parser.add_argument('-o', '--output', default="dump_summary",
+                        help="output path without extension (writes .csv and .npz)")
+    parser.add_argument('--pattern', default="*.txt", help="file name pattern")
+    parser.add_argument('--recursive', action='store_true', help="also scan subdirectories")
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: one per core)")
+    parser.add_argument('--thresholds', type=parse_deviations, default=DEFAULT_DEVIATIONS,
+                        help="deviation %% per current range, comma separated "
+                             f"(default: {','.join(f'{value:g}' for value in DEFAULT_DEVIATIONS)})")
+    parser.add_argument('--sample-period', type=float, default=DEFAULT_SAMPLE_PERIOD,
+                        help="seconds between readings, for charge and energy")
+    parser.add_argument('--voltage', type=float, default=DEFAULT_SUPPLY_VOLTAGE,
+                        help="supply voltage, for energy")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the dump cache")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    paths = find_dumps(args.directory, args.pattern, args.recursive)
+    if not paths:
+        logger.error(f"No files matching {args.pattern} in {args.directory}")
+        return 1
+
+    analyze = partial(analyze_dump_file, cache=None if args.no_cache else DumpCache(),
+                      deviations=args.thresholds, sample_period=args.sample_period,
+                      voltage=args.voltage)
+    start = time.perf_counter()
+    rows = []
+    skipped = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # map keeps the input order, so the table is sorted by file
+        for path, result in zip(paths, executor.map(analyze, paths, chunksize=4)):
+            if result is None:
+                logger.warning(f"Skipping {path}: not a valid dump")
+                skipped += 1
+                continue
+            for row in result:
+                row["dump"] = os.path.relpath(path, args.directory)
+            rows.extend(result)
+    elapsed = time.perf_counter() - start
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_csv(args.output + ".csv", rows)
+    write_columns(args.output + ".npz", rows)
+    logger.info(f"Analysed {len(paths) - skipped} dumps ({len(rows)} sets) in {elapsed:.2f} s, "
+                f"skipped {skipped}; wrote {args.output}.csv and {args.output}.npz")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
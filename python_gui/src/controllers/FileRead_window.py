@@ -2,14 +2,25 @@ from PySide6.QtWidgets import QMainWindow, QFileDialog, QMessageBox, QVBoxLayout
 import pyqtgraph as pg
 from PySide6.QtCore import QTimer
 from ui.file_read_window_ui import Ui_MainWindow
-import re
 from PySide6.QtWidgets import QLabel
 from PySide6.QtGui import QPixmap
 from PySide6.QtCore import Qt
 import logging
 from dialogs.info_dialog import InfoDialog
-from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
+from widgets.decimated_curve import DecimatedCurve
+from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar, QComboBox, QDockWidget
 import os
+import numpy as np
+from workers.file_load_worker import FileLoadWorker
+from workers.multi_file_load_worker import MultiFileLoadWorker
+from workers.spectrum_worker import SpectrumWorker
+from widgets.spectrum_panel import SpectrumPanel
+from utils.dump_cache import DumpCache
+from utils.spectrum import DUMP_SAMPLE_RATE, MIN_SPECTRUM_SAMPLES
+
+# Captures at least this long get a level-of-detail pyramid (saved next to
+# the file); shorter ones are decimated directly on every view change
+LOD_MIN_SAMPLES = 1_000_000
 
 class FileReadWindow(QMainWindow):
     def __init__(self, app_instance):
@@ -38,12 +49,24 @@ class FileReadWindow(QMainWindow):
             self.logger.debug("Initializing data")
             self.current_data = []
             self.time_data = []
+            self.dump_sets = []
+            self.dump_set_label = None
+            self.pyramid = None
+            self.overlay_curves = []
+            self.load_worker = None
+            self.dump_cache = DumpCache()
+            # Bumped whenever the loaded data changes; with the set index it
+            # keys the spectrum cache
+            self.data_version = 0
+            self.spectrum_key = None
             
             self.logger.debug("Setting up logo")
             self.setup_logo()
             
             self.logger.debug("Setting up back button")
             self.setup_back_button()
+            self.setup_set_navigation()
+            self.setup_spectrum_panel()
             
             self.logger.debug("FileReadWindow initialization complete")
             
@@ -55,9 +78,13 @@ class FileReadWindow(QMainWindow):
         """Clean up resources before closing"""
         self.logger.debug("Starting FileReadWindow cleanup")
         try:
+            self.cancel_load()
+            if hasattr(self, 'spectrum_worker'):
+                self.spectrum_worker.stop()
+
             # Clear plot data
             if hasattr(self, 'curve'):
-                self.curve.setData([], [])
+                self.curve.clear_data()
             
             # Clear data arrays
             self.current_data = []
@@ -114,7 +141,11 @@ class FileReadWindow(QMainWindow):
             self.plot_widget.setLabel('bottom', 'Time', units='ms')
             
             # Create plot curve
-            self.curve = self.plot_widget.plot(pen=pg.mkPen('g', width=2))
+            self.curve = DecimatedCurve(pen=pg.mkPen('g', width=2))
+            self.plot_widget.addItem(self.curve)
+
+            # Lists the named per-file curves when several dumps are overlaid
+            self.plot_widget.addLegend(offset=(10, 10), labelTextSize='8pt')
             
             self.logger.debug("Plot setup complete")
         except Exception as e:
@@ -126,93 +157,261 @@ class FileReadWindow(QMainWindow):
         self.ui.ResetGraph_button_2.clicked.connect(self.reset_graph)
         
     def select_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select Data File",
+            "Select Data Files",
             "",
             "Text Files (*.txt);;All Files (*.*)"
         )
         
-        if file_path:
-            self.ui.Selected_file.setText(file_path)
-            self.process_file(file_path)
+        if len(file_paths) == 1:
+            self.ui.Selected_file.setText(file_paths[0])
+            self.process_file(file_paths[0])
+        elif file_paths:
+            self.ui.Selected_file.setText(f"{len(file_paths)} files")
+            self.process_files(file_paths)
             
     def process_file(self, file_path):
+        """Start parsing a dump file in the background; the plot fills as it loads"""
+        self.cancel_load()
         self.ui.Stauts_Output.setText("Opening...")
-        
-        try:
-            with open(file_path, 'r') as file:
-                content = file.read()
-                
-            self.ui.Stauts_Output.setText("Processing...")
-            
-            # Validate format
-            if self.validate_format(content):
-                self.ui.Stauts_Output.setText("Validated")
-                self.parse_and_plot_data(content)
-            else:
-                self.ui.Stauts_Output.setText("Invalid Format")
-                QMessageBox.warning(self, "Error", "Invalid file format")
-                
-        except Exception as e:
-            self.ui.Stauts_Output.setText("Error")
-            QMessageBox.critical(self, "Error", f"Error reading file: {str(e)}")
-            
-    def validate_format(self, content):
-        # Check for required sections
-        required_sections = [
-            "FRAM READING",
-            "Set",
-            "----------",
-            "Start Time:",
-            "End Time:",
-            "Average Current:"
-        ]
-        
-        return all(section in content for section in required_sections)
-        
-    def parse_and_plot_data(self, content):
-        # Extract data points
-        data_pattern = r'\d+\s+\d+'
-        matches = re.findall(data_pattern, content)
-        
+
         self.time_data = []
         self.current_data = []
-        
-        for match in matches:
-            time, current = map(float, match.split())
-            self.time_data.append(time)
-            self.current_data.append(current)
+        self.pyramid = None
+        self.curve.clear_data()
+        self.clear_sets()
+        self.clear_overlays()
+        self.clear_spectrum()
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.cancel_button.show()
+
+        # Validate and extract in a single streaming pass
+        self.load_worker = FileLoadWorker(file_path, lod_min_samples=LOD_MIN_SAMPLES,
+                                          cache=self.dump_cache)
+        self.load_worker.progress.connect(self.on_load_progress)
+        self.load_worker.finished.connect(self.on_load_finished)
+        self.load_worker.failed.connect(self.on_load_failed)
+        self.load_worker.start()
+        self.ui.Stauts_Output.setText("Processing...")
+
+    def process_files(self, file_paths):
+        """Overlay several dumps, one curve each, parsed in a process pool"""
+        self.cancel_load()
+        self.ui.Stauts_Output.setText("Opening...")
+
+        self.time_data = []
+        self.current_data = []
+        self.pyramid = None
+        self.curve.clear_data()
+        self.clear_sets()
+        self.clear_overlays()
+        self.clear_spectrum()
+        self.spectrum_panel.set_message("The spectrum is shown for a single file")
+        self.overlay_paths = list(file_paths)
+        self.overlay_loaded = 0
+        self.overlay_invalid = []
+        self.overlay_max = 0.0
+        self.load_progress.setValue(0)
+        self.load_progress.show()
+        self.cancel_button.show()
+
+        self.load_worker = MultiFileLoadWorker(file_paths, cache=self.dump_cache)
+        self.load_worker.file_loaded.connect(self.on_overlay_file_loaded)
+        self.load_worker.file_failed.connect(self.on_overlay_file_failed)
+        self.load_worker.finished.connect(self.on_overlay_finished)
+        self.load_worker.start()
+        self.ui.Stauts_Output.setText("Processing...")
+
+    def on_overlay_file_loaded(self, file_path, reader):
+        if not self.is_current_load():
+            return
+        self.overlay_loaded += 1
+        if not reader.valid:
+            self.overlay_invalid.append(os.path.basename(file_path))
+        else:
+            times, currents = reader.arrays()
+            if len(currents):
+                # Colour by position in the selection, so it does not depend
+                # on which file finished first
+                color = pg.intColor(self.overlay_paths.index(file_path),
+                                    hues=max(len(self.overlay_paths), 9))
+                curve = DecimatedCurve(pen=pg.mkPen(color, width=1),
+                                       name=os.path.basename(file_path))
+                self.plot_widget.addItem(curve)
+                curve.set_full_data(times, currents)
+                self.overlay_curves.append(curve)
+                self.overlay_max = max(self.overlay_max, curve.y_bounds[1])
+                self.plot_widget.setYRange(0, self.overlay_max + 400)
+        self.update_overlay_progress()
+
+    def on_overlay_file_failed(self, file_path, message):
+        if not self.is_current_load():
+            return
+        self.overlay_loaded += 1
+        self.overlay_invalid.append(f"{os.path.basename(file_path)} ({message})")
+        self.update_overlay_progress()
+
+    def update_overlay_progress(self):
+        total = len(self.overlay_paths)
+        self.load_progress.setValue(int(self.overlay_loaded * 100 / total))
+        self.ui.Stauts_Output.setText(f"Processing... {self.overlay_loaded}/{total} files")
+        samples = sum(len(curve.full_y) for curve in self.overlay_curves)
+        self.set_stats_label.setText(f"{len(self.overlay_curves)} files | {samples:,} samples")
+
+    def on_overlay_finished(self):
+        if not self.is_current_load():
+            return
+        self.load_worker = None
+        self.finish_load_ui()
+        self.ui.Stauts_Output.setText(f"Validated {len(self.overlay_curves)}/{len(self.overlay_paths)}")
+        if self.overlay_invalid:
+            QMessageBox.warning(self, "Error", "Could not load:\n" + "\n".join(self.overlay_invalid))
+
+    def clear_overlays(self):
+        for curve in self.overlay_curves:
+            self.plot_widget.removeItem(curve)
+        self.overlay_curves = []
+
+    def cancel_load(self):
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self.load_worker = None
+            self.finish_load_ui()
+            self.ui.Stauts_Output.setText("Cancelled")
+
+    def finish_load_ui(self):
+        if hasattr(self, 'cancel_button'):
+            self.load_progress.hide()
+            self.cancel_button.hide()
+
+    def is_current_load(self):
+        # Signals from a cancelled or replaced worker may still be queued
+        return self.load_worker is not None and self.sender() is self.load_worker
+
+    def on_load_progress(self, progress):
+        if not self.is_current_load():
+            return
+        if progress.total_bytes:
+            self.load_progress.setValue(int(progress.bytes_read * 100 / progress.total_bytes))
+        self.ui.Stauts_Output.setText(
+            f"Processing... {progress.bytes_read / 1e6:.1f}/{progress.total_bytes / 1e6:.1f} MB, "
+            f"{progress.sample_count:,} samples")
+        if progress.sample_count:
+            self.curve.set_full_data(progress.times, progress.currents)
+            self.plot_widget.setYRange(0, self.curve.y_bounds[1] + 400)
+
+    def on_load_finished(self, reader, pyramid):
+        if not self.is_current_load():
+            return
+        self.load_worker = None
+        self.finish_load_ui()
+        if reader.valid:
+            self.ui.Stauts_Output.setText("Validated")
+            self.plot_dump(reader, pyramid)
+        else:
+            self.curve.clear_data()
+            self.ui.Stauts_Output.setText("Invalid Format")
+            QMessageBox.warning(self, "Error", "Invalid file format")
+
+    def on_load_failed(self, message):
+        if not self.is_current_load():
+            return
+        self.load_worker = None
+        self.finish_load_ui()
+        self.ui.Stauts_Output.setText("Error")
+        QMessageBox.critical(self, "Error", f"Error reading file: {message}")
             
-        # Extract metadata
-        start_time = re.search(r'Start Time: (\d+)', content)
-        end_time = re.search(r'End Time: (\d+)', content)
-        avg_current = re.search(r'Average Current: ([\d.]+)', content)
-        set_number = re.search(r'Set ([\w\d]+)', content)
-        
+    def plot_dump(self, reader, pyramid=None):
+        self.time_data, self.current_data = reader.arrays()
+        self.data_version += 1
+        self.pyramid = pyramid
+        self.dump_set_label = reader.set_label
+
         # Update UI with units (changed from ms to s)
-        if start_time:
-            self.ui.StartTime_Box_2.setText(f"{start_time.group(1)} s")
-        if end_time:
-            self.ui.EndTime_Box_2.setText(f"{end_time.group(1)} s")
-        if avg_current:
-            self.ui.AverageCurrent_Box_2.setText(f"{avg_current.group(1)} mA")
-        if set_number:
-            self.ui.lineEdit.setText(set_number.group(1))
+        if reader.start_time is not None:
+            self.ui.StartTime_Box_2.setText(f"{reader.start_time:g} s")
+        if reader.end_time is not None:
+            self.ui.EndTime_Box_2.setText(f"{reader.end_time:g} s")
+        if reader.average_current is not None:
+            self.ui.AverageCurrent_Box_2.setText(f"{reader.average_current:.2f} mA")
+        if reader.set_label is not None:
+            self.ui.lineEdit.setText(reader.set_label)
             
+        self.populate_sets(reader.sets)
+
+    def populate_sets(self, sets):
+        """Fill the set selector and show the whole dump"""
+        self.dump_sets = sets
+        self.set_stats_cache = {}
+        self.set_selector.blockSignals(True)
+        self.set_selector.clear()
+        self.set_selector.addItem("All sets")
+        for segment in sets:
+            suffix = " (abnormal)" if segment.abnormal else ""
+            self.set_selector.addItem(f"Set {segment.label}{suffix}")
+        self.set_selector.setCurrentIndex(0)
+        self.set_selector.blockSignals(False)
+        self.set_selector.setEnabled(len(sets) > 1)
+        self.show_set(0)
+
+    def show_set(self, index):
+        """Plot one set (selector index, 0 for the whole dump) from the loaded arrays"""
+        if index <= 0 or index > len(self.dump_sets):
+            segment = None
+            times, currents = self.time_data, self.current_data
+        else:
+            segment = self.dump_sets[index - 1]
+            times = self.time_data[segment.start:segment.stop]
+            currents = self.current_data[segment.start:segment.stop]
+        if len(currents) == 0:
+            self.set_stats_label.clear()
+            return
+
+        stats = self.set_stats(index, currents)
         # Plot data with dynamic y-axis range
-        if self.current_data:
-            max_current = max(self.current_data)
-            y_max = max_current + 400  # Changed from 200mA to 400mA padding
-            
-            # Update plot with dynamic range
-            self.plot_widget.setYRange(0, y_max)
-            self.curve.setData(self.time_data, self.current_data)
+        y_max = stats['max'] + 400  # Changed from 200mA to 400mA padding
+        self.plot_widget.setYRange(0, y_max)
+        self.plot_widget.enableAutoRange(axis='x')
+        if segment is None and self.pyramid is not None:
+            self.curve.set_pyramid(self.pyramid)
+        else:
+            self.curve.set_full_data(times, currents)
+
+        label = segment.label if segment is not None else self.dump_set_label
+        if label is not None:
+            self.ui.lineEdit.setText(label)
+        self.set_stats_label.setText(
+            f"{stats['count']:,} samples | mean {stats['mean']:.2f} mA | "
+            f"min {stats['min']:g} mA | max {stats['max']:g} mA")
+        self.request_spectrum(index, currents, "All sets" if segment is None else f"Set {segment.label}")
+
+    def set_stats(self, index, currents):
+        """Summary statistics for a selector entry, computed once per load"""
+        stats = self.set_stats_cache.get(index)
+        if stats is None:
+            if index == 0 and self.pyramid is not None and self.pyramid.levels:
+                # The coarsest level already spans the whole capture
+                mins, maxs, means = self.pyramid.levels[-1]
+                low, high, mean = float(mins[0]), float(maxs[0]), float(means[0])
+            else:
+                low = float(np.min(currents))
+                high = float(np.max(currents))
+                mean = float(np.mean(currents, dtype=np.float64))
+            stats = {'count': len(currents), 'mean': mean, 'min': low, 'max': high}
+            self.set_stats_cache[index] = stats
+        return stats
         
     def reset_graph(self):
+        self.cancel_load()
         self.time_data = []
         self.current_data = []
-        self.curve.setData([], [])
+        self.pyramid = None
+        self.curve.clear_data()
+        self.clear_sets()
+        self.clear_overlays()
+        self.clear_spectrum()
         self.ui.StartTime_Box_2.clear()
         self.ui.EndTime_Box_2.clear()
         self.ui.AverageCurrent_Box_2.clear()
@@ -237,10 +436,87 @@ class FileReadWindow(QMainWindow):
         button_layout.addWidget(self.back_button)
         button_layout.addWidget(self.info_button)
         button_layout.addStretch()  # This pushes buttons to the left
+
+        # File loading progress and cancel, only visible while a file loads
+        self.load_progress = QProgressBar(self)
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.hide()
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.setMaximumWidth(100)
+        self.cancel_button.clicked.connect(self.cancel_load)
+        self.cancel_button.hide()
+        button_layout.addWidget(self.load_progress)
+        button_layout.addWidget(self.cancel_button)
         
         # Add layout to the main vertical layout
         self.ui.verticalLayout_13.insertLayout(0, button_layout)
 
+    def setup_set_navigation(self):
+        """Set selector and per-set statistics for multi-set dumps"""
+        set_layout = QHBoxLayout()
+        set_layout.addWidget(QLabel("Set:", self))
+        self.set_selector = QComboBox(self)
+        self.set_selector.setMinimumWidth(160)
+        self.set_selector.setEnabled(False)
+        self.set_selector.currentIndexChanged.connect(self.show_set)
+        self.set_stats_label = QLabel(self)
+        set_layout.addWidget(self.set_selector)
+        set_layout.addWidget(self.set_stats_label)
+        set_layout.addStretch()
+        self.set_stats_cache = {}
+        self.ui.verticalLayout_13.insertLayout(1, set_layout)
+
+    def setup_spectrum_panel(self):
+        """Dock with the Welch spectrum of the shown set, computed in the background"""
+        self.spectrum_panel = SpectrumPanel()
+        dock = QDockWidget("Spectrum", self)
+        dock.setWidget(self.spectrum_panel)
+        dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+
+        self.spectrum_worker = SpectrumWorker()
+        self.spectrum_worker.finished.connect(self.on_spectrum_ready)
+        self.spectrum_worker.failed.connect(self.on_spectrum_failed)
+        self.spectrum_worker.start()
+
+    def request_spectrum(self, index, currents, source):
+        """Show the spectrum of a selector entry, from the cache or once computed"""
+        if len(currents) < MIN_SPECTRUM_SAMPLES:
+            self.spectrum_key = None
+            self.spectrum_panel.clear()
+            return
+        self.spectrum_key = (self.data_version, index)
+        self.spectrum_source = source
+        spectrum = self.spectrum_worker.request(self.spectrum_key, currents, DUMP_SAMPLE_RATE)
+        if spectrum is not None:
+            self.spectrum_panel.show_spectrum(spectrum, source=source)
+        else:
+            self.spectrum_panel.set_message(f"{source}: computing spectrum...")
+
+    def on_spectrum_ready(self, key, spectrum, seconds):
+        # Results for data that is no longer shown stay in the cache only
+        if key == self.spectrum_key:
+            self.spectrum_panel.show_spectrum(spectrum, seconds, self.spectrum_source)
+
+    def on_spectrum_failed(self, key, message):
+        if key == self.spectrum_key:
+            self.spectrum_panel.set_message(f"Spectrum failed: {message}")
+
+    def clear_spectrum(self):
+        self.data_version += 1
+        self.spectrum_key = None
+        self.spectrum_panel.clear()
+
+    def clear_sets(self):
+        self.dump_sets = []
+        self.set_stats_cache = {}
+        self.set_selector.blockSignals(True)
+        self.set_selector.clear()
+        self.set_selector.blockSignals(False)
+        self.set_selector.setEnabled(False)
+        self.set_stats_label.clear()
+
     def return_to_mode_selection(self):
         """Return to mode selection dialog"""
         self.logger.debug("Returning to mode selection")
@@ -1,30 +1,99 @@
-from PySide6.QtWidgets import QMainWindow, QMessageBox, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QWidget
+from PySide6.QtWidgets import QMainWindow, QMessageBox, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QWidget, QDockWidget, QListWidget, QListWidgetItem, QCheckBox
 from PySide6.QtCore import QTimer, Qt
 import pyqtgraph as pg
-from threading import Thread
-from queue import Queue
-import collections
 import time
+from collections import deque
+import numpy as np
 import serial
-from serial.tools import list_ports
 from PySide6.QtGui import QPixmap, QIcon
 import re
+import os
 import logging
 
 from ui.main_window_ui import Ui_MainWindow
 from dialogs.serial_port_dialog import PortSelectionDialog
 from dialogs.info_dialog import InfoDialog
+from dialogs.replay_dialog import ReplayDialog
+from widgets.decimated_curve import DecimatedCurve
+from widgets.spectrum_panel import SpectrumPanel
+from utils.serial_communication import SerialHandler
+from workers.ingest_worker import IngestWorker
+from workers.spectrum_worker import SpectrumWorker
+from utils.frame_meter import FrameMeter
+from utils.ring_buffer import RingBuffer
+from utils.thresholds import THRESHOLD_RANGES, DEFAULT_DEVIATIONS, DeviationDetector
+from utils.session_recorder import SessionRecorder
+from utils.replay import ReplayTransport, open_replay_source
+from utils.spectrum import DUMP_SAMPLE_RATE, MIN_SPECTRUM_SAMPLES
+
+# GUI update loop: one frame every ~16 ms (60 fps), with at most this many
+# live samples moved into the plot per frame so bursts can't stall repaint
+FRAME_INTERVAL_MS = 16
+MAX_SAMPLES_PER_FRAME = 2000
+
+# Live plot buffer sizing: room for the measured sample rate over the time
+# window plus headroom, never below the minimum
+MIN_PLOT_CAPACITY = 5000
+PLOT_CAPACITY_HEADROOM = 1.5
+
+# Live anomaly events kept as plot markers and rows of the event index, and
+# the span (seconds either side) shown when one of them is clicked
+MAX_LIVE_EVENTS = 500
+LIVE_EVENT_SPAN = 1.0
+
+# Rolling statistics panel: windows (seconds, a session row is added),
+# refresh interval (seconds) and its columns, as (header, key in a
+# StreamStats window entry, format)
+STATS_WINDOWS = (1.0, 10.0, 60.0)
+STATS_INTERVAL = 0.25
+STATS_COLUMNS = (
+    ("Mean mA", 'mean', "{:.2f}"),
+    ("Min mA", 'min', "{:.0f}"),
+    ("Max mA", 'max', "{:.0f}"),
+    ("RMS mA", 'rms', "{:.2f}"),
+    ("p50 mA", 'p50', "{:.1f}"),
+    ("p95 mA", 'p95', "{:.1f}"),
+    ("p99 mA", 'p99', "{:.1f}"),
+    ("Rate /s", 'rate', "{:.0f}"),
+    ("Charge mAh", 'charge_mah', "{:.4f}"),
+)
+
+# Seconds between spectra of the live window, computed only while shown
+SPECTRUM_INTERVAL = 1.0
+
+# The three progress bar stylesheets, built once instead of on every update
+PROGRESS_BAR_STYLES = {
+    color: f"""
+            QProgressBar {{
+                border: 2px solid grey;
+                border-radius: 5px;
+                text-align: center;
+            }}
+            QProgressBar::chunk {{
+                background-color: {color};
+            }}
+            """
+    for color in ("green", "orange", "red")
+}
 
 class MainWindow(QMainWindow):
-    def __init__(self, app_instance):
+    def __init__(self, app_instance, replay=False, replay_settings=None):
         super().__init__()
         self.logger = logging.getLogger(__name__)
         self.logger.debug("Initializing MainWindow")
         self.app_instance = app_instance
         self.initialized = False
-        self.collecting_read_data = False
-        self.read_data_buffer = []
+        self.progress_bar_colors = {}
         self.first_data = True
+        self.session_recorder = None
+        # Replay mode feeds a recorded file through the pipeline instead of a
+        # port; without settings they are asked for in a dialog
+        self.replay = replay
+        self.replay_settings = replay_settings
+        self.replay_transport = None
+        self.replay_finished_at = None
+        self.replay_reported = False
+        self.backlog_peak = 0
         
         # Initialize UI
         self.ui = Ui_MainWindow()
@@ -45,6 +114,11 @@ class MainWindow(QMainWindow):
         
         # Setup plot
         self.setup_plot()
+
+        # Add live event index and statistics
+        self.setup_event_index()
+        self.setup_stats_panel()
+        self.setup_spectrum_panel()
         
         # Initialize progress bars
         self.ui.Normal_Parti_storage_2.setValue(0)
@@ -154,12 +228,8 @@ class MainWindow(QMainWindow):
                 "> 90.1mA"
             ]
             
-            deviations = [
-                "300",  # Removed % symbol to make editing easier
-                "200",
-                "100",
-                "50"
-            ]
+            # Removed % symbol to make editing easier
+            deviations = [f"{deviation:g}" for deviation in DEFAULT_DEVIATIONS]
             
             # Populate table
             for i in range(4):
@@ -255,20 +325,53 @@ class MainWindow(QMainWindow):
         self.plot_widget.setLabel('bottom', 'Time', units='ms')
         
         # Create the plot curve
-        self.curve = self.plot_widget.plot(pen=pg.mkPen('g', width=2))
+        self.curve = DecimatedCurve(pen=pg.mkPen('g', width=2))
+        self.plot_widget.addItem(self.curve)
+
+        # Readings of the plotted dump that the threshold table flags,
+        # re-detected whenever the table is edited
+        self.event_markers = pg.ScatterPlotItem(size=7, pen=None, brush=pg.mkBrush(255, 60, 60))
+        self.plot_widget.addItem(self.event_markers)
+        self.dump_detector = None
+        self.dump_points = None
+
+        # Live readings flagged by the ingest worker's StreamingDetector, as
+        # (arrival, mA), and how long each took from arrival to its marker
+        self.live_event_markers = pg.ScatterPlotItem(size=9, pen=pg.mkPen('w'), brush=pg.mkBrush(255, 160, 0))
+        self.plot_widget.addItem(self.live_event_markers)
+        self.live_events = deque(maxlen=MAX_LIVE_EVENTS)
+        self.live_events_total = 0
+        self.detection_latencies = deque(maxlen=1000)
+        self.marker_latencies = deque(maxlen=1000)
+        self.anomaly_detector = None
+        self.event_queue = None
+        self.follow_live = True
+        # Time span (plot seconds) of the buffer copy shown while not
+        # following, and how many of the oldest rows of the event index are
+        # disabled because their samples have left the plot buffer
+        self.frozen_span = None
+        self.stale_event_rows = 0
+        self.stream_stats = None
+        self.stats_updated = 0.0
         
         # Initialize data storage
-        self.max_points = 5000
-        self.time_data = collections.deque(maxlen=self.max_points)
-        self.current_data = collections.deque(maxlen=self.max_points)
+        self.plot_buffer = RingBuffer(MIN_PLOT_CAPACITY)
+        self.sample_rate = 0.0
         
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         self.sample_count = 0
         self.last_sample_time = time.time()
         self.total_current = 0
         self.total_samples = 0
+        self.samples_applied = 0
         self.time_window = 5
 
+        # Data handed over by the ingest worker, applied once per frame; live
+        # samples wait in the worker's bounded (drop-oldest) sample queue
+        self.pending_state = {}
+        self.sample_queue = None
+        self.frame_meter = FrameMeter()
+
     def connect_signals(self):
         # Connect button signals
         self.ui.Start_button_2.clicked.connect(lambda: self.send_function_command("R"))
@@ -280,44 +383,26 @@ class MainWindow(QMainWindow):
         self.ui.Recall_Button_3.clicked.connect(lambda: self.recall_data("normal"))
         self.ui.Recall_Button_4.clicked.connect(lambda: self.recall_data("abnormal"))
         self.ui.AB_Auto_Clear_Checkbox_2.stateChanged.connect(self.handle_auto_clear)
+        self.threshold_table.cellChanged.connect(lambda row, column: self.redetect_events())
 
     def initialize_serial(self):
-        # Check if any ports are available
-        if not list_ports.comports():
-            QMessageBox.critical(self, "Error", "No serial ports found!")
-            # Return to mode selection
-            self.logger.debug("No serial ports found, returning to mode selection")
-            self.close()
-            self.app_instance.show_mode_selection()
-            return False
+        if self.replay:
+            return self.initialize_replay()
 
-        # Show port selection dialog
+        # Show port selection dialog; without any serial ports a port can
+        # still be typed in, e.g. the pty or socket URL of emulate_board.py
         port_dialog = PortSelectionDialog()
         if port_dialog.exec():
             settings = port_dialog.get_settings()
-            
-            try:
-                self.ser = serial.Serial(
-                    port=settings['port'],
-                    baudrate=settings['baud'],
-                    timeout=1
-                )
-                
-                # Initialize data queue and thread control
-                self.data_queue = Queue()
-                self.running = True
-                self.first_data = True
-
-                # Start serial reading thread
-                self.serial_thread = Thread(target=self.read_serial_data, daemon=True)
-                self.serial_thread.start()
-
-                # Setup update timer
-                self.timer = QTimer()
-                self.timer.timeout.connect(self.update_plot)
-                self.timer.start(10)
+            if not settings['port']:
+                QMessageBox.critical(self, "Error", "No serial port selected!")
+                self.logger.debug("No serial port selected, returning to mode selection")
+                self.close()
+                self.app_instance.show_mode_selection()
+                return False
 
-                self.initialized = True
+            try:
+                self.start_ingest(SerialHandler(settings['port'], settings['baud']))
                 return True
 
             except serial.SerialException as e:
@@ -334,9 +419,61 @@ class MainWindow(QMainWindow):
             self.app_instance.show_mode_selection()
             return False
 
+    def initialize_replay(self):
+        """Feed a recorded session or dump file through the serial pipeline"""
+        settings = self.replay_settings
+        if settings is None:
+            replay_dialog = ReplayDialog()
+            if not replay_dialog.exec():
+                self.logger.debug("Replay cancelled, returning to mode selection")
+                self.close()
+                self.app_instance.show_mode_selection()
+                return False
+            settings = replay_dialog.get_settings()
+
+        try:
+            source = open_replay_source(settings['path'])
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not replay {settings['path']}: {str(e)}")
+            self.logger.debug("Replay file error, returning to mode selection")
+            self.close()
+            self.app_instance.show_mode_selection()
+            return False
+
+        self.replay_transport = ReplayTransport(source, settings['speed'], settings['loop'])
+        speed = f"{settings['speed']:g}x" if settings['speed'] else "max speed"
+        self.setWindowTitle(f"Current Sense V3.2 - Replay {os.path.basename(settings['path'])} "
+                            f"at {speed} [ Powered By ZSOM ]")
+        self.start_ingest(SerialHandler(transport=self.replay_transport))
+        return True
+
+    def start_ingest(self, serial_handler):
+        """Start the ingest pipeline on an open port (or replay) and the frame timer"""
+        self.serial_handler = serial_handler
+        self.first_data = True
+
+        # Parse on the reader thread and receive batched results
+        self.ingest_worker = IngestWorker(self.serial_handler, stats_windows=STATS_WINDOWS)
+        self.ingest_worker.batch_ready.connect(self.apply_batch)
+        self.sample_queue = self.ingest_worker.samples
+        self.event_queue = self.ingest_worker.events
+        self.anomaly_detector = self.ingest_worker.detector
+        self.stream_stats = self.ingest_worker.stats
+
+        # Start the shared ingest pipeline
+        self.serial_handler.start()
+        self.ingest_worker.start()
+
+        # Setup frame timer
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_plot)
+        self.timer.start(FRAME_INTERVAL_MS)
+
+        self.initialized = True
+
     def send_function_command(self, command):
         print(f"Sending {command}")
-        self.ser.write(f"{command}\n".encode('utf-8'))
+        self.serial_handler.send_command(command)
 
     def recall_data(self, partition_type):
         if partition_type == "normal":
@@ -347,32 +484,7 @@ class MainWindow(QMainWindow):
             command = f"read {set_num}"
         
         print(f"Sending {command}")
-        self.ser.write(f"{command}\n".encode('utf-8'))
-
-    def read_serial_data(self):
-        buffer = ""
-        while self.running:
-            try:
-                if self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8')
-                    if line:
-                        buffer += line
-                        lines = buffer.split('\n')
-                        buffer = lines[-1]
-                        
-                        for line in lines[:-1]:
-                            line = line.strip()
-                            if "FRAM READING" in line:
-                                print("Starting FRAM reading")
-                                self.collecting_read_data = True
-                                self.read_data_buffer = []
-                            if line:
-                                self.parse_read_data(line)
-                                self.data_queue.put(line)
-                        
-            except Exception as e:
-                print(f"Error reading serial data: {e}")
-                time.sleep(0.001)
+        self.serial_handler.send_command(command)
 
     def update_progress_bar_color(self, progress_bar, value):
         """Update progress bar color based on percentage"""
@@ -391,182 +503,262 @@ class MainWindow(QMainWindow):
         else:
             color = "red"
         
-        # Set the style sheet
-        progress_bar.setStyleSheet(
-            f"""
-            QProgressBar {{
-                border: 2px solid grey;
-                border-radius: 5px;
-                text-align: center;
-            }}
-            QProgressBar::chunk {{
-                background-color: {color};
-            }}
-            """
-        )
+        # Only restyle when the color actually changes
+        if self.progress_bar_colors.get(progress_bar) != color:
+            self.progress_bar_colors[progress_bar] = color
+            progress_bar.setStyleSheet(PROGRESS_BAR_STYLES[color])
+
+    def apply_batch(self, batch):
+        """Queue one batch of parsed serial data for the next frame (GUI thread)"""
+        state = self.pending_state
+        state['last_line'] = batch.last_line
+        if batch.storage_index is not None:
+            state['storage_index'] = batch.storage_index
+        if batch.abnormal_status is not None:
+            state['abnormal_status'] = batch.abnormal_status
+        if batch.set_label is not None:
+            state['set_label'] = batch.set_label
+        if batch.dump is not None:
+            state['dump'] = (batch.dump, batch.dump_set_starts)
+        if batch.start_time is not None:
+            state['start_time'] = batch.start_time
+        if batch.end_time is not None:
+            state['end_time'] = batch.end_time
+        if batch.average_current is not None:
+            state['average_current'] = batch.average_current
+
+    @property
+    def pending_sample_count(self):
+        return len(self.sample_queue) if self.sample_queue is not None else 0
+
+    def take_pending_samples(self, limit):
+        """Pop up to ``limit`` queued live samples as (times, currents) arrays"""
+        chunks = self.sample_queue.get(limit) if self.sample_queue is not None else []
+        if not chunks:
+            return None, None
+        return (np.concatenate([times for times, _ in chunks]),
+                np.concatenate([currents for _, currents in chunks]))
+
+    def apply_pending_state(self):
+        """Apply the latest value of each display, once per frame"""
+        state = self.pending_state
+        self.pending_state = {}
+
+        if 'last_line' in state:
+            self.ui.Output_2.setText(state['last_line'])
+
+        # Process normal storage index
+        if 'storage_index' in state:
+            index_value = state['storage_index']
+            self.ui.Normal_Parti_storage_2.setValue(min(index_value, 10))
+            self.update_progress_bar_color(self.ui.Normal_Parti_storage_2, index_value)
+
+        # Process abnormal storage status
+        if 'abnormal_status' in state:
+            current, total = state['abnormal_status']
+            self.ui.Abnormal_Partition_Storage_2.setValue(current)
+            self.update_progress_bar_color(self.ui.Abnormal_Partition_Storage_2, current)
+
+        # Process live current samples; a pending dump replaces the live
+        # trace, so everything queued before it is taken in one go
+        limit = self.pending_sample_count if 'dump' in state else MAX_SAMPLES_PER_FRAME
+        times, currents = self.take_pending_samples(limit)
+        if currents is not None:
+            # The live trace replaces a plotted dump, and with it its events
+            if self.dump_detector is not None:
+                self.clear_events()
+            if self.first_data:
+                self.start_time = times[0]
+                self.first_data = False
+
+            start_time = self.start_time
+            self.plot_buffer.extend(np.maximum(times - start_time, 0),
+                                    currents / 1000)  # Convert mA to A
+            self.sample_count += len(currents)
+            self.samples_applied += len(currents)
+
+            # Update average current calculation
+            self.total_current += float(currents.sum())
+            self.total_samples += len(currents)
+            avg_current = self.total_current / self.total_samples
+            self.ui.AverageCurrent_Box_2.setText(f"{avg_current:.2f} mA")
+
+            # Update Y-axis range based on the latest current value
+            if self.follow_live:
+                y_max = max(float(currents[-1]) + 500, 1000)  # At least 1000mA range
+                self.plot_widget.setYRange(0, y_max)
+
+        # Mark what the detector flagged; its samples were queued first, so
+        # they are already in the plot buffer (or, under a backlog, soon)
+        if not self.first_data:
+            self.apply_live_events()
+
+        # Process FRAM dump fields
+        if 'set_label' in state:
+            self.ui.lineEdit.setText(f"Set {state['set_label']}")
+        if 'dump' in state:
+            read_data, set_starts = state['dump']
+            print(f"Plotting {len(read_data)} points")
+            self.plot_read_data(read_data, set_starts)
+        if 'start_time' in state:
+            self.ui.StartTime_Box_2.setText(f"{state['start_time']:g} s")
+        if 'end_time' in state:
+            self.ui.EndTime_Box_2.setText(f"{state['end_time']:g} s")
+        if 'average_current' in state:
+            self.ui.AverageCurrent_Box_2.setText(f"{state['average_current']:.2f} mA")
 
     def update_plot(self):
-        while not self.data_queue.empty():
-            line = self.data_queue.get()
-            self.ui.Output_2.setText(line)
-            
-            # Process normal storage index
-            if "Index:" in line:
-                try:
-                    index_str = line.split('Index:')[1].strip()
-                    index_value = int(index_str)
-                    self.ui.Normal_Parti_storage_2.setValue(min(index_value, 10))
-                    self.update_progress_bar_color(self.ui.Normal_Parti_storage_2, index_value)
-                except (IndexError, ValueError) as e:
-                    print(f"Error parsing index: {e}")
-
-            # Process abnormal storage status
-            if "Abnormal Storage status:" in line:
-                try:
-                    status = line.split('status:')[1].strip()
-                    current, total = map(int, status.split('/'))
-                    self.ui.Abnormal_Partition_Storage_2.setValue(current)
-                    self.update_progress_bar_color(self.ui.Abnormal_Partition_Storage_2, current)
-                except (IndexError, ValueError) as e:
-                    print(f"Error parsing abnormal storage status: {e}")
-
-            # Only process regular current data if we're not collecting read data
-            if not self.collecting_read_data and "Current:" in line:
-                try:
-                    parts = line.split('|')
-                    if len(parts) == 3:
-                        # Update index/set number
-                        index_str = parts[2].split(':')[1].strip()
-                        index_value = int(index_str)
-                        self.ui.Normal_Parti_storage_2.setValue(min(index_value, 10))
-                        
-                        # Process current value
-                        current_value_str = parts[0].split(':')[1].replace(" mA", "").strip()
-                        current_value = float(current_value_str) / 1000  # Convert mA to A
-                        
-                        # Update average current calculation
-                        self.total_current += float(current_value_str)
-                        self.total_samples += 1
-                        avg_current = self.total_current / self.total_samples
-                        self.ui.AverageCurrent_Box_2.setText(f"{avg_current:.2f} mA")
-                        
-                        if self.first_data:
-                            self.start_time = time.time()
-                            self.first_data = False
-                        
-                        current_time = max(0, time.time() - self.start_time)
-                        
-                        self.time_data.append(current_time)
-                        self.current_data.append(current_value)
-                        self.sample_count += 1
-                        
-                        # Update Y-axis range based on current value
-                        current_value_ma = float(current_value_str)  # Already in mA
-                        y_max = max(current_value_ma + 500, 1000)  # At least 1000mA range
-                        self.plot_widget.setYRange(0, y_max)
-                except (IndexError, ValueError) as e:
-                    print(f"Error parsing line: {e}")
-                    continue
-
-        if time.time() - self.last_sample_time >= 1:
+        """Render one frame: apply pending state, then redraw the live window"""
+        frame_start = time.perf_counter()
+        self.apply_pending_state()
+
+        elapsed = time.time() - self.last_sample_time
+        if elapsed >= 1:
+            self.sample_rate = self.sample_count / elapsed
             self.sample_count = 0
             self.last_sample_time = time.time()
+            self.resize_plot_buffer()
 
-        if len(self.time_data) > 1:
-            current_time = time.time() - self.start_time
+        # While an event is inspected the trace stays as it was
+        if len(self.plot_buffer) > 1 and self.follow_live:
+            current_time = time.monotonic() - self.start_time
             cutoff_time = current_time - self.time_window
-            
-            while len(self.time_data) > 0 and self.time_data[0] < cutoff_time:
-                self.time_data.popleft()
-                self.current_data.popleft()
-            
-            time_list = list(self.time_data)
-            current_list = list(self.current_data)
-            
-            if time_list:
+
+            # Binary-search cut on the time column; both are contiguous views
+            # of a buffer that is overwritten in place, so the curve gets copies
+            time_view, current_view = self.plot_buffer.window(cutoff_time)
+
+            if len(time_view):
                 window_start = max(0, current_time - self.time_window)
                 window_end = max(self.time_window, current_time)
                 self.plot_widget.setXRange(window_start, window_end)
-                self.curve.setData(time_list, current_list)
+                self.curve.set_full_data(time_view.copy(), current_view.copy())
+
+        if self.stream_stats is not None and time.monotonic() - self.stats_updated >= STATS_INTERVAL:
+            self.update_stats_panel()
+        if self.follow_live and time.monotonic() - self.spectrum_requested >= SPECTRUM_INTERVAL:
+            self.request_live_spectrum()
+        if self.follow_live:
+            self.expire_event_rows()
+
+        self.frame_meter.add(time.perf_counter() - frame_start, self.pending_sample_count)
+        self.backlog_peak = max(self.backlog_peak, self.pending_sample_count)
+        if self.replay_transport and not self.replay_reported:
+            self.check_replay_finished()
+        report = self.frame_meter.maybe_report()
+        if report:
+            message = (f"{report['fps']:.0f} fps | frame {report['frame_ms_avg']:.1f} ms "
+                       f"(max {report['frame_ms_max']:.1f} ms) | backlog {report['backlog']} samples "
+                       f"(max {report['backlog_max']})")
+            queue = self.sample_queue.stats()
+            message += (f" | queue max {queue['high_water']}/{queue['capacity']}, "
+                        f"wait {queue['wait_ms_avg']:.0f} ms (max {queue['wait_ms_max']:.0f} ms), "
+                        f"{queue['dropped_total']} dropped")
+            if self.session_recorder:
+                stats = self.session_recorder.stats()
+                message += f" | recording {stats['bytes_written'] / 1e6:.2f} MB"
+                if stats['blocked_ms']:
+                    message += f" (waited {stats['blocked_ms']:.0f} ms for the disk)"
+                if stats['dropped_bytes']:
+                    message += f" ({stats['dropped_bytes']} bytes dropped)"
+            if self.replay_transport and not self.replay_reported:
+                message += f" | replay {self.serial_handler.stats()['lines_per_s']:.0f} lines/s"
+            self.update_event_stats()
+            if not self.replay_reported:
+                self.statusBar().showMessage(message)
+
+    def check_replay_finished(self):
+        """Report once the replay is over and everything it sent has been plotted"""
+        if not self.replay_transport.finished:
+            return
+        now = time.perf_counter()
+        if self.replay_finished_at is None:
+            self.replay_finished_at = now
+        # Give the last read time to pass through parsing and batching
+        if self.pending_sample_count or now - self.replay_finished_at < 0.25:
+            return
+
+        self.replay_reported = True
+        lines = self.serial_handler.meter.lines_total
+        ingest_time = max(self.replay_finished_at - self.replay_transport.started, 1e-9)
+        drawn_time = max(now - self.replay_transport.started, 1e-9)
+        message = (f"Replay finished: {lines} lines in {ingest_time:.2f} s "
+                   f"({lines / ingest_time:.0f} lines/s ingested)")
+        # Once more than a frame's worth of samples queue up the UI has fallen
+        # behind, and the rate it drained them at is the sustainable rate
+        dropped = self.sample_queue.stats()['dropped_total']
+        if self.backlog_peak > MAX_SAMPLES_PER_FRAME:
+            message += (f"; UI fell behind (backlog peaked at {self.backlog_peak} samples, "
+                        f"{dropped} oldest samples dropped) and "
+                        f"sustained {self.samples_applied / drawn_time:.0f} samples/s")
+        else:
+            message += "; UI kept up"
+        self.logger.info(message)
+        self.statusBar().showMessage(message)
+
+    def resize_plot_buffer(self):
+        """Size the live plot buffer from the measured sample rate and time window"""
+        required = max(int(self.sample_rate * self.time_window * PLOT_CAPACITY_HEADROOM),
+                       MIN_PLOT_CAPACITY)
+        capacity = self.plot_buffer.capacity
+        # Grow as soon as the window no longer fits; shrink only on a large drop
+        if required > capacity or (capacity > MIN_PLOT_CAPACITY and required * 4 < capacity):
+            self.logger.debug(f"Resizing plot buffer {capacity} -> {required} samples "
+                              f"({self.sample_rate:.0f} samples/s)")
+            self.plot_buffer.resize(required)
 
     def send_serial_data(self):
         """Send data from Input box to serial port"""
         data_to_send = self.ui.Input_2.text()
-        self.ser.write(f"{data_to_send}\n".encode('utf-8'))
+        self.serial_handler.send_command(data_to_send)
         self.ui.Input_2.clear()
 
     def norm_reset(self):
         """Reset normal storage"""
         print("Sending rst")
-        self.ser.write("rst\n".encode('utf-8'))
+        self.serial_handler.send_command("rst")
         self.ui.Normal_Parti_storage_2.setValue(0)
         self.update_progress_bar_color(self.ui.Normal_Parti_storage_2, 0)
 
     def ab_reset(self):
         """Reset abnormal storage"""
         print("Sending ab_rst")
-        self.ser.write("ab_rst\n".encode('utf-8'))
+        self.serial_handler.send_command("ab_rst")
         self.ui.Abnormal_Partition_Storage_2.setValue(0)
         self.update_progress_bar_color(self.ui.Abnormal_Partition_Storage_2, 0)
 
     def reset_graph(self):
         """Reset the graph display"""
-        self.time_data.clear()
-        self.current_data.clear()
+        self.plot_buffer.clear()
         self.first_data = True
-        self.curve.setData([], [])
+        self.curve.clear_data()
         self.plot_widget.setXRange(0, 5)  # Reset to default time window
         self.total_current = 0
         self.total_samples = 0
         self.ui.AverageCurrent_Box_2.setText("0 mA")
         self.ui.lineEdit.clear()
+        self.clear_events()
+        self.clear_live_events()
+        self.event_list.clear()
+        self.stale_event_rows = 0
+        self.follow_checkbox.setChecked(True)
+        if self.stream_stats is not None:
+            self.stream_stats.reset()
+        self.spectrum_key = None
+        self.spectrum_panel.clear()
 
-    def parse_read_data(self, line):
-        """Parse incoming serial data"""
-        if "Set " in line and "Start Time:" not in line:
-            try:
-                set_nums = line.split()[1].strip()
-                print(f"Set numbers: {set_nums}")
-                self.ui.lineEdit.setText(f"Set {set_nums}")
-            except IndexError:
-                pass
-        elif "Start Time:" in line:
-            start_time = line.split(":")[1].replace("ms", "").strip()
-            self.ui.StartTime_Box_2.setText(f"{start_time}")
-        elif "End Time:" in line:
-            end_time = line.split(":")[1].replace("ms", "").strip()
-            self.ui.EndTime_Box_2.setText(f"{end_time}")
-        elif "Average Current:" in line:
-            avg_current = line.split(":")[1].replace("mA", "").strip()
-            self.ui.AverageCurrent_Box_2.setText(f"{avg_current} mA")
-        elif "----------" in line:
-            if not self.collecting_read_data:  # Start of data
-                self.collecting_read_data = True
-                self.read_data_buffer = []
-            elif self.read_data_buffer:  # End of data
-                print(f"Plotting {len(self.read_data_buffer)} points")
-                self.plot_read_data()
-                self.collecting_read_data = False
-        elif self.collecting_read_data and line.strip():
-            try:
-                if line[0].isdigit():
-                    sample_num, current = line.strip().split()
-                    self.read_data_buffer.append((int(sample_num), float(current)))
-            except (ValueError, IndexError) as e:
-                print(f"Error parsing line: {line}, Error: {e}")
-
-    def plot_read_data(self):
-        """Plot data from read buffer"""
-        if not self.read_data_buffer:
+    def plot_read_data(self, read_data, set_starts=None):
+        """Plot data from a completed FRAM dump and mark its deviation events"""
+        if not read_data:
             print("No data to plot")
             return
 
-        times_ms = [point[0] for point in self.read_data_buffer]
-        currents = [point[1] for point in self.read_data_buffer]
+        times_ms = [point[0] for point in read_data]
+        currents = [point[1] for point in read_data]
         
-        # Clear previous data
-        self.time_data.clear()
-        self.current_data.clear()
+        # Clear previous data; live markers have no place on a dump's time axis
+        self.plot_buffer.clear()
+        self.clear_live_events()
         
         # Calculate appropriate x-axis range
         max_time = max(times_ms)
@@ -582,31 +774,295 @@ class MainWindow(QMainWindow):
         
         try:
             # Create a new curve with the data
-            self.curve.setData(times_ms, currents)
+            self.curve.set_full_data(times_ms, currents)
             self.plot_widget.replot()  # Force a replot
         except Exception as e:
             print(f"Error plotting data: {e}")
 
+        self.dump_points = (np.asarray(times_ms, dtype=np.float64), np.asarray(currents, dtype=np.float64))
+        self.dump_detector = DeviationDetector(self.dump_points[1], set_starts)
+        self.redetect_events()
+        self.dump_version += 1
+        self.request_spectrum(('dump', self.dump_version), self.dump_points[1], DUMP_SAMPLE_RATE, "Dump")
+
+    def table_deviations(self):
+        """Deviation % per range from the threshold table, or None if a cell is not a number"""
+        try:
+            return [float(self.threshold_table.item(i, 1).text()) for i in range(len(THRESHOLD_RANGES))]
+        except (AttributeError, ValueError):
+            return None
+
+    def redetect_events(self):
+        """Re-run the firmware's deviation check on the plotted dump with the table's values"""
+        if self.dump_detector is None:
+            return
+        deviations = self.table_deviations()
+        if deviations is None:
+            return
+        start = time.perf_counter()
+        events = self.dump_detector.events(deviations)
+        times_ms, currents = self.dump_points
+        self.event_markers.setData(times_ms[events], currents[events])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.statusBar().showMessage(f"{len(events)} deviation events in the dump with thresholds "
+                                     f"{', '.join(f'{value:g}' for value in deviations)} % "
+                                     f"({elapsed_ms:.1f} ms)")
+
+    def clear_events(self):
+        self.dump_detector = None
+        self.dump_points = None
+        self.event_markers.clear()
+
+    def setup_event_index(self):
+        """Dock listing live anomaly events, newest first; clicking one shows it"""
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        self.follow_checkbox = QCheckBox("Follow live")
+        self.follow_checkbox.setChecked(True)
+        self.follow_checkbox.toggled.connect(self.set_follow_live)
+        self.event_list = QListWidget()
+        self.event_list.itemClicked.connect(self.show_live_event)
+        self.event_stats_label = QLabel("No events")
+        self.event_stats_label.setWordWrap(True)
+
+        layout.addWidget(self.follow_checkbox)
+        layout.addWidget(self.event_list)
+        layout.addWidget(self.event_stats_label)
+
+        dock = QDockWidget("Live Events", self)
+        dock.setWidget(container)
+        dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.addDockWidget(Qt.RightDockWidgetArea, dock)
+
+    def setup_stats_panel(self):
+        """Dock with one row of rolling statistics per window of the live stream"""
+        self.stats_table = QTableWidget(0, len(STATS_COLUMNS))
+        self.stats_table.setHorizontalHeaderLabels([header for header, _, _ in STATS_COLUMNS])
+        self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.stats_table.verticalHeader().setDefaultSectionSize(18)
+        self.stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stats_rows = []
+
+        self.stats_dock = QDockWidget("Statistics", self)
+        self.stats_dock.setWidget(self.stats_table)
+        self.stats_dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.stats_dock)
+
+    def update_stats_panel(self):
+        """Refresh the statistics table from the ingest worker's StreamStats"""
+        self.stats_updated = time.monotonic()
+        snapshot = self.stream_stats.snapshot(self.stats_updated)
+        windows = list(snapshot)
+        if windows != self.stats_rows:
+            self.stats_rows = windows
+            self.stats_table.setRowCount(len(windows))
+            self.stats_table.setVerticalHeaderLabels([
+                "Session" if length is None else f"{length:g} s" if length < 60 else f"{length / 60:g} min"
+                for length in windows])
+            for row in range(len(windows)):
+                for column in range(len(STATS_COLUMNS)):
+                    item = QTableWidgetItem()
+                    item.setTextAlignment(Qt.AlignCenter)
+                    self.stats_table.setItem(row, column, item)
+        for row, length in enumerate(windows):
+            stats = snapshot[length]
+            for column, (_, key, text) in enumerate(STATS_COLUMNS):
+                self.stats_table.item(row, column).setText(text.format(stats[key]) if stats else "-")
+
+    def setup_spectrum_panel(self):
+        """Spectrum dock, tabbed with the statistics, fed by a background SpectrumWorker"""
+        self.spectrum_panel = SpectrumPanel()
+        dock = QDockWidget("Spectrum", self)
+        dock.setWidget(self.spectrum_panel)
+        dock.setFeatures(QDockWidget.DockWidgetMovable | QDockWidget.DockWidgetFloatable)
+        self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+        self.tabifyDockWidget(self.stats_dock, dock)
+        self.stats_dock.raise_()
+
+        self.spectrum_worker = SpectrumWorker()
+        self.spectrum_worker.finished.connect(self.on_spectrum_ready)
+        self.spectrum_worker.failed.connect(self.on_spectrum_failed)
+        self.spectrum_worker.start()
+        self.spectrum_key = None
+        self.spectrum_source = ""
+        self.spectrum_requested = 0.0
+        self.dump_version = 0
+        # Display queue drop count and when it last grew: the live window
+        # has a gap until a time window has passed since
+        self.display_drops = 0
+        self.display_drop_time = -np.inf
+
+    def request_live_spectrum(self):
+        """Ask for the spectrum of the live time window; keyed by the samples
+        applied so far, so an idle stream is not recomputed"""
+        now = time.monotonic()
+        self.spectrum_requested = now
+        if not self.spectrum_panel.isVisible() or self.stream_stats is None:
+            return
+
+        # Readings dropped by the display queue leave a gap in the window,
+        # which the spectrum would take for a signal
+        dropped = self.sample_queue.stats()['dropped_total']
+        if dropped != self.display_drops:
+            self.display_drops = dropped
+            self.display_drop_time = now
+        if now - self.display_drop_time < self.time_window:
+            self.spectrum_panel.set_message("Live window: paused while it holds samples the display dropped")
+            return
+
+        # The acquisition rate, from the statistics window closest to the
+        # time window; the GUI's own rate is only what it drained per frame
+        snapshot = self.stream_stats.snapshot(now)
+        lengths = [length for length in snapshot if length is not None and length >= self.time_window]
+        stats = snapshot[min(lengths)] if lengths else snapshot[None]
+        if not stats or not stats['rate'] > 0:
+            return
+
+        _, currents = self.plot_buffer.window(now - self.start_time - self.time_window)
+        if len(currents) < MIN_SPECTRUM_SAMPLES:
+            return
+        # The buffer holds A and is overwritten in place, so hand over a mA copy
+        self.request_spectrum(('live', self.samples_applied), currents * 1000.0, stats['rate'],
+                              "Live window", cache=False)
+
+    def request_spectrum(self, key, currents, sample_rate, source, cache=True):
+        self.spectrum_key = key
+        self.spectrum_source = source
+        spectrum = self.spectrum_worker.request(key, currents, sample_rate, cache)
+        if spectrum is not None:
+            self.spectrum_panel.show_spectrum(spectrum, source=source)
+
+    def on_spectrum_ready(self, key, spectrum, seconds):
+        # Results for data that is no longer shown stay in the cache only
+        if key == self.spectrum_key:
+            self.spectrum_panel.show_spectrum(spectrum, seconds, self.spectrum_source)
+
+    def on_spectrum_failed(self, key, message):
+        if key == self.spectrum_key:
+            self.spectrum_panel.set_message(f"Spectrum failed: {message}")
+
+    def apply_live_events(self):
+        """Take the anomaly events flagged since the last frame, mark and list them"""
+        events = self.event_queue.get() if self.event_queue is not None else []
+        if not events:
+            return
+        for event in events:
+            self.live_events.append((event.arrival, event.current_ma))
+        self.live_events_total += len(events)
+        self.draw_live_events()
+        now = time.monotonic()
+        for event in events:
+            self.detection_latencies.append((event.detected - event.arrival) * 1000)
+            self.marker_latencies.append((now - event.arrival) * 1000)
+
+        # Only the newest rows are listed
+        for event in events[-MAX_LIVE_EVENTS:]:
+            if event.kind.startswith("deviation"):
+                score = f"{event.score:.0f}% from {event.previous_ma:.0f} mA"
+            else:
+                score = f"z {event.score:+.1f}"
+            item = QListWidgetItem(f"{event.arrival - self.start_time:9.3f} s  {event.current_ma:6.0f} mA  "
+                                   f"{event.kind} ({score})")
+            item.setData(Qt.UserRole, event.arrival)
+            self.event_list.insertItem(0, item)
+        while self.event_list.count() > MAX_LIVE_EVENTS:
+            self.event_list.takeItem(self.event_list.count() - 1)
+            self.stale_event_rows = max(self.stale_event_rows - 1, 0)
+
+    def expire_event_rows(self):
+        """Disable the event rows whose samples are no longer in the plot buffer
+
+        Rows are newest first, so the disabled ones are always the bottom
+        ``stale_event_rows``; only the rows above them need checking.
+        """
+        times, _ = self.plot_buffer.data()
+        oldest = times[0] + self.start_time if len(times) else np.inf
+        row = self.event_list.count() - 1 - self.stale_event_rows
+        while row >= 0:
+            item = self.event_list.item(row)
+            if item.data(Qt.UserRole) >= oldest:
+                break
+            item.setFlags(item.flags() & ~Qt.ItemIsEnabled)
+            self.stale_event_rows += 1
+            row -= 1
+
+    def draw_live_events(self):
+        if not self.live_events:
+            self.live_event_markers.clear()
+            return
+        arrivals, currents = np.array(self.live_events).T
+        self.live_event_markers.setData(arrivals - self.start_time, currents / 1000)
+
+    def clear_live_events(self):
+        self.live_events.clear()
+        self.live_event_markers.clear()
+
+    def show_live_event(self, item):
+        """Stop following the stream and centre the plot on a listed event"""
+        if not item.flags() & Qt.ItemIsEnabled:
+            return
+        event_time = item.data(Qt.UserRole) - self.start_time
+        if self.follow_live:
+            self.follow_checkbox.setChecked(False)  # Freezes the buffer
+        elif self.frozen_span is None or event_time > self.frozen_span[1]:
+            # Flagged after the freeze: take a newer copy
+            self.freeze_live_view()
+        if self.frozen_span is None or event_time < self.frozen_span[0]:
+            self.expire_event_rows()
+            self.statusBar().showMessage("The samples around this event are no longer buffered")
+            return
+        self.plot_widget.setXRange(event_time - LIVE_EVENT_SPAN, event_time + LIVE_EVENT_SPAN)
+
+    def set_follow_live(self, checked):
+        self.follow_live = checked
+        if not checked:
+            self.freeze_live_view()
+
+    def freeze_live_view(self):
+        """Show a copy of the whole plot buffer, which the stream keeps overwriting"""
+        times, currents = self.plot_buffer.data()
+        if not len(times):
+            self.frozen_span = None
+            return
+        self.curve.set_full_data(times.copy(), currents.copy())
+        self.frozen_span = (float(times[0]), float(times[-1]))
+
+    def update_event_stats(self):
+        """Event count and detection / marker latency against the frame interval"""
+        if self.anomaly_detector is None:
+            return
+        stats = self.anomaly_detector.stats()
+        text = (f"{self.live_events_total} events in {stats['samples']} samples | "
+                f"check {stats['process_us_avg']:.0f} us/batch (max {stats['process_us_max']:.0f} us)")
+        if self.marker_latencies:
+            detection = np.array(self.detection_latencies)
+            marker = np.array(self.marker_latencies)
+            text += (f" | detected {np.median(detection):.2f} ms after arrival (max {detection.max():.2f}), "
+                     f"marked {np.median(marker):.1f} ms (p99 {np.percentile(marker, 99):.1f}, "
+                     f"max {marker.max():.1f}); frame {FRAME_INTERVAL_MS} ms")
+        self.event_stats_label.setText(text)
+
     def handle_auto_clear(self, state):
         """Handle auto clear checkbox state change"""
         if self.ui.AB_Auto_Clear_Checkbox_2.isChecked():
             print("Sending AutoABrst")
-            self.ser.write("AutoABrst\n".encode('utf-8'))
+            self.serial_handler.send_command("AutoABrst")
         else:
             print("Sending ManABrst")
-            self.ser.write("ManABrst\n".encode('utf-8'))
+            self.serial_handler.send_command("ManABrst")
 
     def closeEvent(self, event):
         """Handle application close"""
         self.logger.debug("Handling close event")
         try:
-            if hasattr(self, 'running'):
+            self.spectrum_worker.stop()
+            if hasattr(self, 'serial_handler'):
                 self.logger.debug("Cleaning up serial connection")
-                self.running = False
-                if hasattr(self, 'serial_thread'):
-                    self.serial_thread.join(timeout=1.0)
-                if hasattr(self, 'ser') and self.ser.is_open:
-                    self.ser.close()
+                self.stop_recording()
+                self.ingest_worker.stop()
+                self.serial_handler.close()
             super().closeEvent(event)
         except Exception as e:
             self.logger.error(f"Error in closeEvent: {str(e)}", exc_info=True)
@@ -643,25 +1099,69 @@ class MainWindow(QMainWindow):
         self.back_button.setMaximumWidth(100)
         self.back_button.clicked.connect(self.return_to_mode_selection)
         
+        # Session recording toggle
+        self.record_button = QPushButton("Record Session", self)
+        self.record_button.setCheckable(True)
+        self.record_button.setMaximumWidth(120)
+        self.record_button.toggled.connect(self.toggle_recording)
+        
         # Add button to layout
         button_layout.addWidget(self.back_button)
+        button_layout.addWidget(self.record_button)
         button_layout.addStretch()  # This pushes button to the left
         
         # Add layout to the main vertical layout
         self.ui.verticalLayout_13.insertLayout(0, button_layout)
 
+    def toggle_recording(self, checked):
+        if checked:
+            self.start_recording()
+        else:
+            self.stop_recording()
+
+    def start_recording(self):
+        """Log the raw serial stream to a session file until stopped"""
+        recorder = SessionRecorder()
+        try:
+            recorder.start()
+        except OSError as e:
+            QMessageBox.warning(self, "Recording Failed", f"Could not start recording: {str(e)}")
+            self.record_button.blockSignals(True)
+            self.record_button.setChecked(False)
+            self.record_button.blockSignals(False)
+            return
+        self.session_recorder = recorder
+        self.serial_handler.subscribe_raw(recorder.handle_data)
+        self.serial_handler.add_queue("session", recorder.queue)
+        self.record_button.setText("Stop Recording")
+        self.logger.debug(f"Recording serial session to {recorder.directory}")
+        self.statusBar().showMessage(f"Recording serial session to {recorder.directory}")
+
+    def stop_recording(self):
+        recorder = self.session_recorder
+        if recorder is None:
+            return
+        self.session_recorder = None
+        self.serial_handler.unsubscribe_raw(recorder.handle_data)
+        self.serial_handler.remove_queue("session")
+        recorder.stop()
+        self.logger.debug(f"Session recording stopped: {recorder.stats()}")
+        self.record_button.blockSignals(True)
+        self.record_button.setChecked(False)
+        self.record_button.blockSignals(False)
+        self.record_button.setText("Record Session")
+        self.statusBar().showMessage(f"Session saved to {recorder.file_path}")
+
     def return_to_mode_selection(self):
         """Return to mode selection dialog"""
         self.logger.debug("Returning to mode selection")
         try:
             # Cleanup serial connection
-            if hasattr(self, 'running'):
+            if hasattr(self, 'serial_handler'):
                 self.logger.debug("Cleaning up serial connection")
-                self.running = False
-                if hasattr(self, 'serial_thread'):
-                    self.serial_thread.join(timeout=1.0)
-                if hasattr(self, 'ser') and self.ser.is_open:
-                    self.ser.close()
+                self.stop_recording()
+                self.ingest_worker.stop()
+                self.serial_handler.close()
             
             # Close current window
             self.logger.debug("Closing window")
@@ -676,7 +1176,8 @@ class MainWindow(QMainWindow):
     def update_thresholds(self):
         """Send updated thresholds to Arduino"""
         try:
-            ranges = ["0.0-30.0", "30.1-60.0", "60.1-90.0", ">90.1"]
+            ranges = THRESHOLD_RANGES
+            sent = []
             for i in range(4):
                 deviation = self.threshold_table.item(i, 1).text().strip()
                 if not deviation.isdigit():
@@ -685,10 +1186,15 @@ class MainWindow(QMainWindow):
                     return
                 
                 # Send command to Arduino: "THR:range:value"
-                command = f"THR:{ranges[i]}:{deviation}\n"
-                if hasattr(self, 'ser') and self.ser.is_open:
-                    self.ser.write(command.encode())
+                command = f"THR:{ranges[i]}:{deviation}"
+                if hasattr(self, 'serial_handler') and self.serial_handler.serial.is_open:
+                    self.serial_handler.send_command(command)
+                    sent.append(float(deviation))
                     time.sleep(0.1)  # Small delay between commands
+
+            # The live detector follows the table the board now runs
+            if self.anomaly_detector is not None and len(sent) == len(ranges):
+                self.anomaly_detector.set_deviations(sent)
             
             QMessageBox.information(self, "Success", "Thresholds updated successfully")
             
@@ -14,12 +14,15 @@ class ModeSelectionDialog(QDialog):
         
         serial_button = QPushButton("Serial Read Mode")
         file_button = QPushButton("File Read Mode")
+        replay_button = QPushButton("Replay Mode")
         
         serial_button.clicked.connect(lambda: self.select_mode("serial"))
         file_button.clicked.connect(lambda: self.select_mode("file"))
+        replay_button.clicked.connect(lambda: self.select_mode("replay"))
         
         layout.addWidget(serial_button)
         layout.addWidget(file_button)
+        layout.addWidget(replay_button)
         
         self.setLayout(layout)
         
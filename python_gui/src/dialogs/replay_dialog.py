@@ -0,0 +1,78 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
+    QLabel, QComboBox, QPushButton, QLineEdit, QCheckBox, QFileDialog)
+
+# Replay speeds offered, as (label, factor); 0 plays as fast as possible
+REPLAY_SPEEDS = [("1x", 1.0), ("2x", 2.0), ("5x", 5.0), ("10x", 10.0), ("100x", 100.0),
+                 ("As fast as possible", 0.0)]
+
+class ReplayDialog(QDialog):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Replay Configuration")
+        self.setModal(True)
+        self.setMinimumWidth(400)
+        self.setup_ui()
+        self.center_window()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        # File selection
+        file_layout = QHBoxLayout()
+        file_layout.addWidget(QLabel("File:"))
+        self.path_edit = QLineEdit()
+        self.path_edit.setPlaceholderText("Session (.zss) or dump (.txt) file")
+        file_layout.addWidget(self.path_edit)
+        browse_button = QPushButton("Browse...")
+        browse_button.clicked.connect(self.browse)
+        file_layout.addWidget(browse_button)
+        layout.addLayout(file_layout)
+
+        # Speed selection
+        speed_layout = QHBoxLayout()
+        speed_layout.addWidget(QLabel("Speed:"))
+        self.speed_combo = QComboBox()
+        self.speed_combo.addItems([label for label, _ in REPLAY_SPEEDS])
+        speed_layout.addWidget(self.speed_combo)
+        self.loop_checkbox = QCheckBox("Loop")
+        speed_layout.addWidget(self.loop_checkbox)
+        layout.addLayout(speed_layout)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+        self.ok_button = QPushButton("OK")
+        self.ok_button.clicked.connect(self.accept)
+        self.ok_button.setEnabled(False)
+        self.path_edit.textChanged.connect(lambda text: self.ok_button.setEnabled(bool(text.strip())))
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.ok_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def browse(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Recording", "",
+            "Recordings (*.zss *.txt);;Session Files (*.zss);;Dump Files (*.txt);;All Files (*)")
+        if path:
+            self.path_edit.setText(path)
+
+    def get_settings(self):
+        return {
+            'path': self.path_edit.text().strip(),
+            'speed': REPLAY_SPEEDS[self.speed_combo.currentIndex()][1],
+            'loop': self.loop_checkbox.isChecked()
+        }
+
+    def center_window(self):
+        """Center the window on the screen"""
+        screen = self.screen()
+        screen_geometry = screen.geometry()
+        window_geometry = self.geometry()
+
+        x = (screen_geometry.width() - window_geometry.width()) // 2
+        y = (screen_geometry.height() - window_geometry.height()) // 2
+
+        self.move(x, y)
@@ -19,6 +19,9 @@ class PortSelectionDialog(QDialog):
         port_layout.addWidget(QLabel("Port:"))
         self.port_combo = QComboBox()
         self.port_combo.addItems([port.device for port in list_ports.comports()])
+        # Editable so an emulator's pty path or a socket://host:port URL can be entered
+        self.port_combo.setEditable(True)
+        self.port_combo.lineEdit().setPlaceholderText("COM3, /dev/ttyACM0 or socket://host:port")
         port_layout.addWidget(self.port_combo)
         layout.addLayout(port_layout)
         
@@ -45,7 +48,7 @@ class PortSelectionDialog(QDialog):
         
     def get_settings(self):
         return {
-            'port': self.port_combo.currentText(),
+            'port': self.port_combo.currentText().strip(),
             'baud': int(self.baud_combo.currentText())
         } 
         
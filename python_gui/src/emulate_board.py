@@ -0,0 +1,235 @@
+"""Firmware emulator for load testing the serial path without a board
+
+Serves utils.board_emulator.BoardEmulator on a pseudo-terminal, which
+serial.Serial opens like the board's USB port (the GUI port field and
+record_daemon.py take its path), and/or on a TCP port, opened with the
+``socket://HOST:PORT`` URL. Readings are emitted at --rate samples/s from a
+waveform profile; rates far above the board's 1 kHz stress the ingest path
+and the Serial Read window. Commands from any client are answered like the
+firmware does.
+
+Output a client cannot take right away is queued up to --max-backlog-kb per
+client and dropped beyond that, like a USB CDC port nobody reads. Transfer
+statistics are printed every --stats-interval seconds.
+
+Usage: python emulate_board.py [--pty] [--tcp 7777] [--rate 1000]
+                               [--profile steps] [--base 30] [--amplitude 60] [--noise 1]
+                               [--seed 0] [--stats-interval 10]
+"""
+import argparse
+import logging
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+
+from utils.board_emulator import BoardEmulator, PROFILES, make_profile
+
+logger = logging.getLogger("emulate_board")
+
+# Emulation step; readings due since the previous step are sent together
+TICK = 0.001
+# After a stall, catch up with at most this many seconds of readings
+MAX_CATCH_UP = 0.1
+
+class Client:
+    """One connected endpoint with its own bounded output queue"""
+    def __init__(self, name, fd, send, max_backlog):
+        self.name = name
+        self.fd = fd
+        self.send = send
+        self.max_backlog = max_backlog
+        self.pending = bytearray()
+        self.input = bytearray()
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+
+    def queue(self, data):
+        # Drop whole chunks so the lines that do get through stay intact
+        if len(self.pending) + len(data) > self.max_backlog:
+            self.bytes_dropped += len(data)
+            return
+        self.pending += data
+
+    def flush(self):
+        """Send as much of the queue as the endpoint takes without blocking"""
+        while self.pending:
+            try:
+                sent = self.send(self.pending)
+            except BlockingIOError:
+                return
+            if not sent:
+                return
+            del self.pending[:sent]
+            self.bytes_sent += sent
+
+    def feed(self, data):
+        """Buffer received bytes and return the complete command lines"""
+        self.input += data
+        if b'\n' not in self.input:
+            return []
+        end = self.input.rfind(b'\n')
+        lines = bytes(self.input[:end]).split(b'\n')
+        del self.input[:end + 1]
+        return [line.decode('ascii', errors='replace') for line in lines if line.strip()]
+
+class EmulatorServer:
+    """Selector loop pacing the emulator and serving its clients"""
+    def __init__(self, emulator, rate, max_backlog):
+        self.emulator = emulator
+        self.rate = rate
+        self.max_backlog = max_backlog
+        self.selector = selectors.DefaultSelector()
+        self.clients = []
+        self.running = True
+        self.samples_sent = 0
+
+    def open_pty(self):
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        # Keeping the slave open means a client closing the port does not
+        # hang up the master
+        self.pty_slave = slave
+        client = Client(os.ttyname(slave), master, lambda data: os.write(master, data), self.max_backlog)
+        self.add_client(client)
+        return client.name
+
+    def open_tcp(self, host, port):
+        listener = socket.create_server((host, port))
+        listener.setblocking(False)
+        self.selector.register(listener, selectors.EVENT_READ, self.accept)
+        return listener.getsockname()
+
+    def accept(self, listener):
+        connection, address = listener.accept()
+        connection.setblocking(False)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = Client(f"{address[0]}:{address[1]}", connection, connection.send, self.max_backlog)
+        self.add_client(client)
+        logger.info(f"Client {client.name} connected")
+
+    def add_client(self, client):
+        self.clients.append(client)
+        client.queue(self.emulator.banner().encode('ascii'))
+        self.selector.register(client.fd, selectors.EVENT_READ, lambda _: self.receive(client))
+
+    def remove_client(self, client):
+        self.selector.unregister(client.fd)
+        self.clients.remove(client)
+        client.fd.close()
+        logger.info(f"Client {client.name} disconnected ({client.bytes_sent} B sent, "
+                    f"{client.bytes_dropped} B dropped)")
+
+    def receive(self, client):
+        try:
+            if isinstance(client.fd, socket.socket):
+                data = client.fd.recv(4096)
+                if not data:
+                    self.remove_client(client)
+                    return
+            else:
+                data = os.read(client.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            # A pty master reports EIO while no client has the port open
+            return
+        for line in client.feed(data):
+            logger.info(f"Command {line.strip()!r} from {client.name}")
+            self.broadcast(self.emulator.handle_command(line))
+
+    def broadcast(self, data):
+        """Queue data for every client and send what each one takes now"""
+        for client in list(self.clients):
+            client.queue(data)
+            try:
+                client.flush()
+            except OSError:
+                if isinstance(client.fd, socket.socket):
+                    self.remove_client(client)
+
+    def run(self, stats_interval):
+        base = time.monotonic()
+        due_from = 0
+        next_stats = base + stats_interval
+        while self.running:
+            for key, _ in self.selector.select(timeout=TICK):
+                key.data(key.fileobj)
+
+            now = time.monotonic()
+            due = 0
+            if not self.emulator.measuring:
+                # Paused: restart the schedule on resume instead of catching up
+                base, due_from = now, 0
+            else:
+                due = int((now - base) * self.rate) - due_from
+                if due > self.rate * MAX_CATCH_UP:
+                    base, due_from = now - MAX_CATCH_UP, 0
+                    due = int(self.rate * MAX_CATCH_UP)
+            if due > 0:
+                due_from += due
+                self.samples_sent += due
+                self.broadcast(self.emulator.advance(due))
+            else:
+                # Keep draining queued output between readings
+                self.broadcast(b'')
+
+            if now >= next_stats:
+                next_stats = now + stats_interval
+                self.log_stats()
+
+    def log_stats(self):
+        for client in self.clients:
+            logger.info(f"{client.name}: {client.bytes_sent / 1e6:.1f} MB sent, "
+                        f"{client.bytes_dropped / 1e6:.1f} MB dropped, {len(client.pending)} B queued")
+        logger.info(f"{self.samples_sent:,} readings emitted, set {self.emulator.set_number + 1}, "
+                    f"abnormal {self.emulator.abnormal_set_number}/10")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pty', action='store_true', help="serve on a pseudo-terminal (POSIX only)")
+    parser.add_argument('--tcp', type=int, metavar='PORT', help="serve on this TCP port")
+    parser.add_argument('--host', default="127.0.0.1", help="address the TCP port listens on")
+    parser.add_argument('--rate', type=float, default=1000.0, help="readings per second")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='steps', help="waveform of the readings")
+    parser.add_argument('--base', type=float, default=30.0, help="baseline current in mA")
+    parser.add_argument('--amplitude', type=float, default=60.0, help="step, spike or swing size in mA")
+    parser.add_argument('--noise', type=float, default=1.0, help="gaussian noise sigma in mA")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-backlog-kb', type=int, default=1024, help="output queued per client")
+    parser.add_argument('--stats-interval', type=float, default=10.0, help="seconds between stats lines")
+    args = parser.parse_args(argv)
+
+    if not args.pty and args.tcp is None:
+        parser.error("give --pty, --tcp PORT or both")
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.pty and not hasattr(os, 'openpty'):
+        parser.error("--pty needs a POSIX system; use --tcp")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    profile = make_profile(args.profile, args.base, args.amplitude, args.noise, args.seed)
+    server = EmulatorServer(BoardEmulator(profile), args.rate, args.max_backlog_kb << 10)
+    if args.pty:
+        # Printed on its own line so scripts can read the path from stdout
+        print(server.open_pty(), flush=True)
+    if args.tcp is not None:
+        host, port = server.open_tcp(args.host, args.tcp)[:2]
+        print(f"socket://{host}:{port}", flush=True)
+
+    def stop(*_):
+        server.running = False
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, stop)
+
+    logger.info(f"Emulating the board at {args.rate:,.0f} readings/s, profile {args.profile}")
+    server.run(args.stats_interval)
+    server.log_stats()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Headless recording of a live board, for unattended overnight runs
+
+Opens the serial port through the same SerialHandler ingest and parse path
+as the Serial Read window and writes
+  samples_*.csv  every live reading (wall-clock time, mA, set index), rotated by size
+  dump_*.txt     every completed ``read`` dump, in the firmware's dump layout
+  session_*.zss  with --record-raw, the raw byte stream (see utils.session_recorder)
+  daemon.log     periodic ingest and recording statistics
+to the output directory, keeping only the newest files of each kind. Commands
+can be sent at startup, at exit and on a fixed schedule. No Qt modules are
+imported, so no display is needed.
+
+Usage: python record_daemon.py PORT [--baud 9600] [-o recordings]
+                               [--start-command R] [--stop-command S]
+                               [--thresholds 300,200,100,50] [--every 3600 "read 1,2,3"]
+                               [--stats-interval 60] [--max-file-mb 64] [--max-files 100]
+                               [--record-raw] [--fsync interval]
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import signal
+import sys
+import time
+from threading import Event
+
+import serial
+
+from utils.bounded_queue import BoundedQueue, BLOCK
+from utils.protocol import (CurrentSample, DumpStart, DumpSample, DumpTrailer, SetHeader,
+    Separator, AVERAGE_CURRENT, format_dump_record)
+from utils.rotating_writer import RotatingFileWriter
+from utils.serial_communication import SerialHandler
+from utils.session_recorder import SessionRecorder, FSYNC_POLICIES, FSYNC_INTERVAL
+from utils.thresholds import DEFAULT_DEVIATIONS, THRESHOLD_RANGES
+
+logger = logging.getLogger("record_daemon")
+
+# How often queued records are written out; the main loop sleeps in between
+FLUSH_INTERVAL = 0.5
+# Gap between consecutive commands, as the GUI leaves between THR updates
+COMMAND_GAP = 0.1
+# Parsed records held between the reader thread and the main loop; a full
+# queue makes the reader wait instead of dropping anything
+MAX_PENDING_RECORDS = 1_000_000
+
+_DUMP_RECORDS = (DumpStart, SetHeader, Separator, DumpSample, DumpTrailer)
+
+class CommandScheduler:
+    """Send each (interval_s, command) entry every interval seconds"""
+    def __init__(self, send, entries, now=None):
+        now = time.monotonic() if now is None else now
+        self.send = send
+        self.entries = [[interval, command, now + interval] for interval, command in entries]
+
+    def poll(self, now):
+        for entry in self.entries:
+            interval, command, due = entry
+            if now >= due:
+                logger.info(f"Sending scheduled command {command!r}")
+                self.send(command)
+                # Skip missed slots rather than sending a burst after a stall
+                entry[2] = max(due + interval, now)
+
+class DumpRecorder:
+    """Collect the records of one ``read`` dump and save it as a dump file"""
+    def __init__(self, writer):
+        self.writer = writer
+        self.lines = None
+        self.trailer_done = False
+        self.dumps_written = 0
+        self.dumps_dropped = 0
+
+    def handle(self, record):
+        """Return True if the record belonged to a dump"""
+        record_type = type(record)
+        if record_type is DumpStart:
+            if self.lines:
+                self.drop()
+            self.lines = [format_dump_record(record)]
+            self.trailer_done = False
+            return True
+        if self.lines is None or record_type not in _DUMP_RECORDS:
+            if self.lines is not None and record_type is CurrentSample:
+                # Live readings resumed before the dump was complete
+                self.drop()
+            return False
+        self.lines.append(format_dump_record(record))
+        if record_type is DumpTrailer and record.field == AVERAGE_CURRENT:
+            self.trailer_done = True
+        elif record_type is Separator and self.trailer_done:
+            self.save()
+        return True
+
+    def save(self):
+        self.writer.write(b'\r\n'.join(self.lines) + b'\r\n')
+        self.writer.rotate()
+        logger.info(f"Saved dump ({len(self.lines)} lines) to {self.writer.file_path}")
+        self.dumps_written += 1
+        self.lines = None
+
+    def drop(self):
+        logger.warning(f"Dropping incomplete dump ({len(self.lines)} lines)")
+        self.dumps_dropped += 1
+        self.lines = None
+
+class RecordDaemon:
+    """Drain the ingest pipeline into rotating files from the main thread
+
+    The SerialHandler subscriber only appends to a bounded, never-dropping
+    queue (registered as "recording"), so the reader thread only waits on the
+    disk if the main loop falls MAX_PENDING_RECORDS behind; everything else
+    runs every FLUSH_INTERVAL.
+    """
+    def __init__(self, serial_handler, output_dir, max_bytes, max_files, schedule=(),
+                 stats_interval=60.0):
+        self.serial_handler = serial_handler
+        self.queue = BoundedQueue(MAX_PENDING_RECORDS, BLOCK)
+        self.sample_writer = RotatingFileWriter(output_dir, "samples", ".csv", max_bytes, max_files,
+                                                header=b"time_s,current_ma,index\n")
+        self.dump_recorder = DumpRecorder(
+            RotatingFileWriter(output_dir, "dump", ".txt", 0, max_files))
+        self.scheduler = CommandScheduler(serial_handler.send_command, schedule)
+        self.stats_interval = stats_interval
+        self.samples_total = 0
+        self.reset_interval_stats()
+        serial_handler.subscribe(self.enqueue)
+        serial_handler.add_queue("recording", self.queue)
+
+    def reset_interval_stats(self):
+        self.interval_start = time.monotonic()
+        self.cpu_start = time.process_time()
+        self.interval_samples = 0
+        self.interval_sum = 0.0
+        self.interval_min = None
+        self.interval_max = None
+
+    def enqueue(self, records, arrival):
+        self.queue.put((records, arrival), len(records))
+
+    def run(self, stop_event):
+        try:
+            while not stop_event.wait(FLUSH_INTERVAL):
+                now = time.monotonic()
+                self.scheduler.poll(now)
+                self.drain()
+                if now - self.interval_start >= self.stats_interval:
+                    self.log_stats(now)
+        finally:
+            self.serial_handler.unsubscribe(self.enqueue)
+            self.drain()
+            self.queue.close()
+            self.sample_writer.close()
+            self.dump_recorder.writer.close()
+
+    def drain(self):
+        """Write out everything queued since the previous call"""
+        # Arrival times are monotonic; anchor them to the wall clock each
+        # drain so the offset follows clock adjustments over long runs
+        wall_offset = time.time() - time.monotonic()
+        rows = []
+        handle_dump = self.dump_recorder.handle
+        for records, arrival in self.queue.get():
+            timestamp = f"{arrival + wall_offset:.3f}"
+            for record in records:
+                if type(record) is CurrentSample:
+                    current = record.current_ma
+                    rows.append(f"{timestamp},{current:g},{record.index}\n")
+                    self.interval_sum += current
+                    if self.interval_min is None or current < self.interval_min:
+                        self.interval_min = current
+                    if self.interval_max is None or current > self.interval_max:
+                        self.interval_max = current
+                handle_dump(record)
+        if rows:
+            self.sample_writer.write("".join(rows).encode('ascii'))
+            self.interval_samples += len(rows)
+            self.samples_total += len(rows)
+        self.sample_writer.flush()
+
+    def log_stats(self, now):
+        elapsed = max(now - self.interval_start, 1e-9)
+        ingest = self.serial_handler.stats()
+        cpu_percent = (time.process_time() - self.cpu_start) / elapsed * 100
+        if self.interval_samples:
+            currents = (f"mean {self.interval_sum / self.interval_samples:.1f} mA, "
+                        f"min {self.interval_min:g} mA, max {self.interval_max:g} mA")
+        else:
+            currents = "no live samples"
+        queues = "; ".join(
+            f"{name} queue max {queue['high_water']}/{queue['capacity']}, "
+            f"wait {queue['wait_ms_avg']:.0f} ms (max {queue['wait_ms_max']:.0f} ms), "
+            f"blocked {queue['blocked_ms']:.0f} ms, {queue['dropped_total']} dropped"
+            for name, queue in ingest['queues'].items())
+        logger.info(f"{self.interval_samples} samples ({self.interval_samples / elapsed:.0f}/s), "
+                    f"{currents} | ingest {ingest['bytes_per_s']:.0f} B/s, "
+                    f"{ingest['lines_per_s']:.0f} lines/s, {ingest['parse_errors']} parse errors | "
+                    f"{self.samples_total} samples and {self.dump_recorder.dumps_written} dumps "
+                    f"written, {self.dump_recorder.dumps_dropped} dropped | {queues} | "
+                    f"CPU {cpu_percent:.1f}%{peak_memory()}")
+        self.reset_interval_stats()
+
+def peak_memory():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return ""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak_mb = peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+    return f", peak RSS {peak_mb:.1f} MB"
+
+def parse_deviations(text):
+    values = text.split(',')
+    if len(values) != len(THRESHOLD_RANGES) or not all(value.strip().isdigit() for value in values):
+        raise argparse.ArgumentTypeError(
+            f"expected {len(THRESHOLD_RANGES)} whole numbers for ranges {', '.join(THRESHOLD_RANGES)} mA")
+    return [value.strip() for value in values]
+
+def send_commands(serial_handler, commands):
+    for command in commands:
+        logger.info(f"Sending {command!r}")
+        serial_handler.send_command(command)
+        time.sleep(COMMAND_GAP)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('port', help="serial port, e.g. COM3 or /dev/ttyACM0, or socket://host:port")
+    parser.add_argument('--baud', type=int, default=9600)
+    parser.add_argument('-o', '--output', default="recordings", help="output directory")
+    parser.add_argument('--start-command', action='append', default=[], metavar='COMMAND',
+                        help="command sent at startup, e.g. R (repeatable)")
+    parser.add_argument('--stop-command', action='append', default=[], metavar='COMMAND',
+                        help="command sent before exiting, e.g. S (repeatable)")
+    parser.add_argument('--thresholds', type=parse_deviations,
+                        help="deviation %% per current range sent as THR: commands at startup "
+                             f"(e.g. {','.join(f'{value:g}' for value in DEFAULT_DEVIATIONS)})")
+    parser.add_argument('--every', nargs=2, action='append', default=[], metavar=('SECONDS', 'COMMAND'),
+                        help="send COMMAND every SECONDS, e.g. --every 3600 \"read 1\" (repeatable)")
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="seconds between stats log lines")
+    parser.add_argument('--max-file-mb', type=float, default=64.0, help="size at which sample files rotate")
+    parser.add_argument('--max-files', type=int, default=100, help="sample and dump files kept of each kind")
+    parser.add_argument('--record-raw', action='store_true', help="also record the raw serial byte stream")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=FSYNC_INTERVAL,
+                        help="when raw session files are fsynced")
+    args = parser.parse_args(argv)
+
+    try:
+        schedule = [(float(seconds), command) for seconds, command in args.every]
+    except ValueError:
+        parser.error("--every takes a number of seconds and a command")
+    if any(seconds <= 0 for seconds, _ in schedule):
+        parser.error("--every intervals must be positive")
+
+    os.makedirs(args.output, exist_ok=True)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.handlers.RotatingFileHandler(os.path.join(args.output, "daemon.log"),
+                                                        maxBytes=10 << 20, backupCount=5)
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    logging.basicConfig(level=logging.INFO, handlers=[file_handler, stream_handler])
+
+    try:
+        serial_handler = SerialHandler(args.port, args.baud)
+    except serial.SerialException as e:
+        logger.error(f"Could not open port {args.port}: {e}")
+        return 1
+
+    stop_event = Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop_event.set())
+
+    max_bytes = int(args.max_file_mb * (1 << 20))
+    daemon = RecordDaemon(serial_handler, args.output, max_bytes, args.max_files, schedule,
+                          args.stats_interval)
+    session_recorder = None
+    if args.record_raw:
+        session_recorder = SessionRecorder(args.output, max_bytes, args.max_files, args.fsync)
+        session_recorder.start()
+        serial_handler.subscribe_raw(session_recorder.handle_data)
+        serial_handler.add_queue("session", session_recorder.queue)
+    serial_handler.start()
+    logger.info(f"Recording {args.port} at {args.baud} baud to {os.path.abspath(args.output)}")
+    try:
+        startup = list(args.start_command)
+        if args.thresholds:
+            startup += [f"THR:{name}:{value}" for name, value in zip(THRESHOLD_RANGES, args.thresholds)]
+        send_commands(serial_handler, startup)
+        daemon.run(stop_event)
+        send_commands(serial_handler, args.stop_command)
+    finally:
+        serial_handler.close()
+        if session_recorder:
+            session_recorder.stop()
+            logger.info(f"Raw session recording: {session_recorder.stats()}")
+        logger.info(f"Stopped; serial ingest totals: {serial_handler.meter.summary()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Sweep deviation tables over normal and known-abnormal dumps
+
+Evaluates every combination of candidate deviation percentages (one list per
+current range) against two directories of dump files: one with normal
+captures and one with captures known to contain an abnormality. For each
+table it counts
+  detected_dumps         abnormal dumps with at least one flagged set
+  detected_sets          flagged sets in the abnormal dumps
+  false_alarm_dumps      normal dumps with at least one flagged set
+  false_alarm_sets       flagged sets in the normal dumps, each of which the
+                         firmware would copy to the abnormal partition
+  false_alarm_readings   flagged readings in the normal dumps
+and writes one row per table to <output>.csv, best first: highest detection,
+then fewest false alarms. The best tables are printed with the THR: commands
+that load them into the board. Dumps are reduced in a process pool, then the
+tables are evaluated in blocks in a second pool whose processes receive the
+reduced corpus once. Only NumPy and the non-Qt utils modules are imported.
+
+Usage: python sweep_thresholds.py NORMAL_DIR ABNORMAL_DIR [-o threshold_sweep]
+                                  [--values 5,10,15,25,35,50,75,100,200,300]
+                                  [--range-values 0.0-30.0 100,200,300]
+                                  [--pattern *.txt] [--recursive] [--workers N]
+                                  [--block 256] [--top 10] [--no-cache]
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from utils.dump_cache import DumpCache, find_dumps
+from utils.thresholds import THRESHOLD_RANGES
+from utils.threshold_sweep import (RESULT_COLUMNS, SweepCorpus, dump_features, evaluate_block,
+                                   init_worker, table_grid)
+
+logger = logging.getLogger("sweep_thresholds")
+
+# Ten candidates per range give the 10^4 tables of a full sweep
+DEFAULT_VALUES = (5.0, 10.0, 15.0, 25.0, 35.0, 50.0, 75.0, 100.0, 200.0, 300.0)
+
+def parse_values(text):
+    try:
+        values = sorted({float(value) for value in text.split(',')})
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected comma separated numbers")
+    if not values or values[0] < 0:
+        raise argparse.ArgumentTypeError("expected non-negative percentages")
+    return values
+
+def load_features(executor, paths, cache, label):
+    """DumpFeatures of every valid dump among ``paths``"""
+    features = []
+    for path, result in zip(paths, executor.map(partial(dump_features, cache=cache), paths, chunksize=4)):
+        if result is None:
+            logger.warning(f"Skipping {path}: not a valid dump")
+            continue
+        features.append(result)
+    sets = sum(len(item.set_maxima) for item in features)
+    logger.info(f"{len(features)} {label} dumps ({sets} sets)")
+    return features
+
+def rank(tables, results):
+    """Order: detection rate down, then false-alarm sets and readings up,
+    then detected sets down"""
+    columns = {name: results[:, index] for index, name in enumerate(RESULT_COLUMNS)}
+    return np.lexsort((-columns['detected_sets'], columns['false_alarm_readings'],
+                       columns['false_alarm_sets'], -columns['detection_rate']))
+
+def write_csv(path, tables, results, order):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([f"deviation_{name}" for name in THRESHOLD_RANGES] + list(RESULT_COLUMNS))
+        for index in order:
+            writer.writerow([f"{value:g}" for value in tables[index]]
+                            + [f"{value:.4f}" if name == "detection_rate" else int(value)
+                               for name, value in zip(RESULT_COLUMNS, results[index])])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('normal', help="directory of normal dump files")
+    parser.add_argument('abnormal', help="directory of dump files known to contain an abnormality")
+    parser.add_argument('-o', '--output', default="threshold_sweep", help="output path without extension")
+    parser.add_argument('--values', type=parse_values, default=list(DEFAULT_VALUES),
+                        help="candidate deviation %% for every range, comma separated")
+    parser.add_argument('--range-values', nargs=2, action='append', default=[], metavar=('RANGE', 'VALUES'),
+                        help=f"candidates for one range ({', '.join(THRESHOLD_RANGES)}), "
+                             "overriding --values (repeatable)")
+    parser.add_argument('--pattern', default="*.txt", help="file name pattern")
+    parser.add_argument('--recursive', action='store_true', help="also scan subdirectories")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument('--block', type=int, default=256, help="tables per pool task")
+    parser.add_argument('--top', type=int, default=10, help="best tables printed")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the dump cache")
+    args = parser.parse_args(argv)
+
+    candidates = [list(args.values) for _ in THRESHOLD_RANGES]
+    for name, text in args.range_values:
+        if name not in THRESHOLD_RANGES:
+            parser.error(f"unknown range {name!r}; use one of {', '.join(THRESHOLD_RANGES)}")
+        try:
+            candidates[THRESHOLD_RANGES.index(name)] = parse_values(text)
+        except argparse.ArgumentTypeError as e:
+            parser.error(f"--range-values {name}: {e}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    normal_paths = find_dumps(args.normal, args.pattern, args.recursive)
+    abnormal_paths = find_dumps(args.abnormal, args.pattern, args.recursive)
+    if not normal_paths or not abnormal_paths:
+        logger.error(f"Need files matching {args.pattern} in both {args.normal} and {args.abnormal}")
+        return 1
+
+    cache = None if args.no_cache else DumpCache()
+    tables = table_grid(candidates)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        normal = load_features(executor, normal_paths, cache, "normal")
+        abnormal = load_features(executor, abnormal_paths, cache, "abnormal")
+    if not normal or not abnormal:
+        logger.error("No valid dumps to sweep")
+        return 1
+    corpus = SweepCorpus(normal, abnormal)
+    reduced = time.perf_counter()
+
+    blocks = [tables[index:index + args.block] for index in range(0, len(tables), args.block)]
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(corpus,)) as executor:
+        results = np.vstack(list(executor.map(evaluate_block, blocks)))
+    finished = time.perf_counter()
+    logger.info(f"Reduced {len(normal) + len(abnormal)} dumps in {reduced - start:.1f} s, "
+                f"evaluated {len(tables)} tables in {finished - reduced:.1f} s")
+
+    order = rank(tables, results)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_csv(args.output + ".csv", tables, results, order)
+
+    print(f"{'table (% per range)':<28} {'detected':>12} {'false alarm sets':>17} {'readings':>9}")
+    for index in order[:args.top]:
+        detected, rate, _, _, false_sets, false_readings = results[index]
+        table = "/".join(f"{value:g}" for value in tables[index])
+        print(f"{table:<28} {int(detected):>5} ({rate:5.1%}) {int(false_sets):>17} {int(false_readings):>9}")
+    best = tables[order[0]]
+    print("Best table: " + " ".join(f"THR:{name}:{value:g}" for name, value in zip(THRESHOLD_RANGES, best)))
+    logger.info(f"Wrote {args.output}.csv")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Streaming anomaly detection on live current samples
+
+Two checks run on every batch of readings as it arrives, vectorized over the
+batch with a constant amount of state carried between batches:
+
+  deviation  the firmware's rule (utils.thresholds): a reading that differs
+             from the previous one by more than the deviation % of the
+             previous reading's current range. The live stream is treated as
+             one continuous set, so the last reading of a batch is the
+             predecessor of the next batch's first.
+  z-score    a reading more than ``z_threshold`` standard deviations from an
+             exponentially weighted moving average of the stream. Only the
+             first reading of an excursion is reported, so a sustained
+             step is one event rather than one per sample.
+"""
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from utils.thresholds import FIRMWARE_DEVIATIONS, RANGE_LIMITS
+
+DEVIATION = "deviation"
+ZSCORE = "z-score"
+
+class AnomalyEvent(NamedTuple):
+    """One flagged reading"""
+    arrival: float          # time.monotonic() of the read that carried it
+    detected: float         # time.monotonic() when the check flagged it
+    current_ma: float
+    previous_ma: float
+    kind: str               # DEVIATION, ZSCORE or both joined by "+"
+    score: float            # deviation % for DEVIATION, else the z-score
+
+class StreamingDetector:
+    """Deviation and EWMA z-score checks over a stream of sample batches
+
+    State between batches is the previous reading, the EWMA of the readings
+    and of their squares (``alpha`` is the weight of a new reading), the
+    number of readings seen and whether the last one was in a z-score
+    excursion. The z-score of a batch is taken against the averages as they
+    were before it, then the averages absorb the whole batch in one weighted
+    sum. Readings are not z-scored until ``warmup`` have been seen, and the
+    standard deviation is floored at ``min_std_ma`` so a perfectly flat
+    signal does not turn noise of one count into an anomaly.
+
+    ``deviations`` (one % per current range) starts as the firmware's
+    compiled-in table, so the host flags what the board flags; it may be
+    replaced at any time with ``set_deviations`` (once the board has been
+    sent the same table) and the next batch uses the new one.
+    """
+    def __init__(self, deviations=FIRMWARE_DEVIATIONS, alpha=0.01, z_threshold=6.0, warmup=200,
+                 min_std_ma=1.0):
+        self.set_deviations(deviations)
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.min_std_ma = min_std_ma
+        self.reset()
+
+    def set_deviations(self, deviations):
+        self.deviations = np.asarray(deviations, dtype=np.float64)
+
+    def reset(self):
+        self.previous = np.nan
+        self.mean = 0.0
+        self.mean_square = 0.0
+        self.count = 0
+        self.in_excursion = False
+        self.batches = 0
+        self.events_total = 0
+        self.process_time_total = 0.0
+        self.process_time_max = 0.0
+
+    def process(self, currents, arrival):
+        """Check one batch of readings (mA) and return its AnomalyEvents"""
+        start = time.perf_counter()
+        currents = np.asarray(currents, dtype=np.float64)
+        count = len(currents)
+        if count == 0:
+            return []
+
+        # Deviation rule, with the previous batch's last reading in front
+        previous = np.empty(count)
+        previous[0] = self.previous
+        previous[1:] = currents[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.abs(currents - previous) / previous * 100
+        ranges = np.digitize(previous, RANGE_LIMITS, right=True)
+        deviation = (previous > 0) & (percent > self.deviations[ranges])
+
+        # z-score against the averages before this batch; report the first
+        # reading of every excursion only
+        if self.count == 0:
+            self.mean = currents[0]
+            self.mean_square = currents[0] * currents[0]
+        std = max(np.sqrt(max(self.mean_square - self.mean * self.mean, 0.0)), self.min_std_ma)
+        z = (currents - self.mean) / std
+        outside = np.abs(z) > self.z_threshold
+        if self.count < self.warmup:
+            outside[:self.warmup - self.count] = False
+        started = outside.copy()
+        started[0] &= not self.in_excursion
+        started[1:] &= ~outside[:-1]
+
+        # Fold the batch into the averages: after n readings the old value
+        # weighs (1 - alpha)^n and reading i weighs alpha * (1 - alpha)^(n-1-i)
+        decay = 1.0 - self.alpha
+        weights = self.alpha * decay ** np.arange(count - 1, -1, -1, dtype=np.float64)
+        remaining = decay ** count
+        self.mean = remaining * self.mean + float(weights @ currents)
+        self.mean_square = remaining * self.mean_square + float(weights @ (currents * currents))
+        self.count += count
+        self.previous = currents[-1]
+        self.in_excursion = bool(outside[-1])
+
+        flagged = np.flatnonzero(deviation | started)
+        events = []
+        if len(flagged):
+            detected = time.monotonic()
+            for index in flagged.tolist():
+                if deviation[index]:
+                    kind = DEVIATION + "+" + ZSCORE if started[index] else DEVIATION
+                    score = percent[index]
+                else:
+                    kind = ZSCORE
+                    score = z[index]
+                events.append(AnomalyEvent(arrival, detected, float(currents[index]),
+                                           float(previous[index]), kind, float(score)))
+            self.events_total += len(events)
+
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.process_time_total += elapsed
+        if elapsed > self.process_time_max:
+            self.process_time_max = elapsed
+        return events
+
+    def stats(self):
+        return {
+            'samples': self.count,
+            'batches': self.batches,
+            'events': self.events_total,
+            'process_us_avg': self.process_time_total * 1e6 / self.batches if self.batches else 0.0,
+            'process_us_max': self.process_time_max * 1e6,
+        }
@@ -0,0 +1,279 @@
+"""Software model of the ZSOM-M01 current detection firmware
+
+BoardEmulator reproduces the sketch's serial protocol and storage behaviour:
+sets of 1000 readings written to a 10-set normal partition that wraps, sets
+with a deviation above the threshold table copied to a 10-set abnormal
+partition (manual or automatic reset when full), the ``read`` dump layout and
+the command set (R, S, rst, ab_rst, AutoABrst, ManABrst, read, THR:). Output
+text, including the command echo and the partition messages, follows the
+sketch line for line.
+
+Readings come from a waveform profile instead of the ADC, and the firmware's
+spike and near-zero smoothing is not modelled. While measuring, every reading
+is sent as ``Current: X mA | Sample: n/1000 | Index: set``, the live line the
+Serial Read window parses.
+"""
+import time
+import numpy as np
+
+from utils.thresholds import FIRMWARE_DEVIATIONS, THRESHOLD_RANGES, deviation_events
+
+SAMPLES_PER_SET = 1000
+MAX_SETS = 10
+CURRENT_LIMIT_MA = 2500
+
+HELP_TEXT = (
+    "Invalid command. Available commands:",
+    "'S' - Stop measuring",
+    "'R' - Resume measuring",
+    "'AutoABrst' - Enable auto reset of abnormal partition",
+    "'ManABrst' - Enable manual reset of abnormal partition",
+    "'RST' - Reset normal partition",
+    "'AB_RST' - Reset abnormal partition",
+    "'read X' - Read sets (X: 1-10 or A1-A10)",
+    "'THR:range:value' - Update threshold",
+)
+
+def _steady(positions, rng, base, amplitude, noise):
+    return base + rng.normal(0, noise, len(positions))
+
+def _sine(positions, rng, base, amplitude, noise):
+    return base + amplitude * np.sin(2 * np.pi * positions / SAMPLES_PER_SET) + rng.normal(0, noise, len(positions))
+
+def _sawtooth(positions, rng, base, amplitude, noise):
+    return base + amplitude * (positions % SAMPLES_PER_SET) / SAMPLES_PER_SET + rng.normal(0, noise, len(positions))
+
+def _steps(positions, rng, base, amplitude, noise):
+    # Load switched on for the second quarter of every third set, like
+    # toggling an extra resistor path on the evaluation board
+    in_set = positions % SAMPLES_PER_SET
+    on = ((positions // SAMPLES_PER_SET) % 3 == 2) & (in_set >= 250) & (in_set < 500)
+    return base + amplitude * on + rng.normal(0, noise, len(positions))
+
+def _spikes(positions, rng, base, amplitude, noise):
+    values = base + rng.normal(0, noise, len(positions))
+    values[rng.random(len(positions)) < 0.0005] += amplitude
+    return values
+
+PROFILES = {
+    'steady': _steady,
+    'sine': _sine,
+    'sawtooth': _sawtooth,
+    'steps': _steps,
+    'spikes': _spikes,
+}
+
+def make_profile(name, base=30.0, amplitude=60.0, noise=1.0, seed=0):
+    """Callable returning the readings (uint16 mA) at the given sample positions"""
+    function = PROFILES[name]
+    rng = np.random.default_rng(seed)
+
+    def profile(positions):
+        values = function(positions, rng, base, amplitude, noise)
+        return np.clip(np.rint(values), 0, CURRENT_LIMIT_MA).astype(np.uint16)
+    return profile
+
+def _lines(*lines):
+    """Text as Serial.println would send it"""
+    return "".join(f"{line}\r\n" for line in lines)
+
+class StoredSet:
+    __slots__ = ('start_time', 'end_time', 'readings')
+
+    def __init__(self, start_time=0, end_time=0, readings=None):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.readings = np.zeros(SAMPLES_PER_SET, dtype=np.uint16) if readings is None else readings
+
+class BoardEmulator:
+    """Firmware state machine; every method returns the text the board sends
+
+    ``advance(count)`` takes the next ``count`` readings, ``handle_command``
+    processes one command line. The emulator is not thread-safe; drive it
+    from one thread.
+    """
+    def __init__(self, profile, clock=time.monotonic):
+        self.profile = profile
+        self.clock = clock
+        self.started = clock()
+        self.deviations = list(FIRMWARE_DEVIATIONS)
+        self.normal = [StoredSet() for _ in range(MAX_SETS)]
+        self.abnormal = [StoredSet() for _ in range(MAX_SETS)]
+        self.set_number = 0
+        self.abnormal_set_number = 0
+        self.abnormal_full = False
+        self.auto_reset = False
+        self.measuring = True
+        self.position = 0
+        self.set_readings = np.zeros(SAMPLES_PER_SET, dtype=np.uint16)
+        self.set_index = 0
+        self.set_start = 0
+
+    def seconds(self):
+        return int(self.clock() - self.started)
+
+    def banner(self):
+        status = "Empty" if self.abnormal_set_number == 0 else f"{self.abnormal_set_number}/5"
+        return _lines(f"Continuing from normal set: {self.set_number + 1}",
+                      f"Abnormal partition: {status}")
+
+    def advance(self, count):
+        """Take ``count`` readings (while measuring) and return the output"""
+        out = []
+        while count > 0 and self.measuring:
+            if self.set_index == 0:
+                self.set_start = self.seconds()
+                out.append(f"\nIndex: {self.set_number + 1}\r\n")
+                out.append(_lines(f"Timestamp: {self.set_start}s", "Reading 1000 samples..."))
+                if self.abnormal_full:
+                    out.append(_lines("WARNING: Abnormal partition is full!"))
+            take = min(count, SAMPLES_PER_SET - self.set_index)
+            values = self.profile(np.arange(self.position, self.position + take))
+            self.set_readings[self.set_index:self.set_index + take] = values
+            suffix = f" mA | Sample: {{}}/{SAMPLES_PER_SET} | Index: {self.set_number + 1}\r\n"
+            out.extend(f"Current: {value}{suffix.format(sample)}"
+                       for sample, value in enumerate(values.tolist(), self.set_index + 1))
+            self.set_index += take
+            self.position += take
+            count -= take
+            if self.set_index == SAMPLES_PER_SET:
+                out.append(self.complete_set())
+        return "".join(out).encode('ascii')
+
+    def complete_set(self):
+        end_time = self.seconds()
+        readings = self.set_readings.copy()
+        valid = readings[readings <= CURRENT_LIMIT_MA]
+        average = float(valid.mean()) if len(valid) else 0.0
+        out = []
+
+        # The firmware checks every reading against the previous one and
+        # keeps the set if any deviation exceeds the table
+        abnormal = len(deviation_events(readings, self.deviations)) > 0
+        if abnormal and not self.abnormal_full:
+            self.abnormal[self.abnormal_set_number] = StoredSet(self.set_start, end_time, readings)
+            self.abnormal_set_number += 1
+            out.append(_lines(f"Abnormal Storage status: {self.abnormal_set_number}/{MAX_SETS}"))
+            if self.abnormal_set_number >= MAX_SETS:
+                if self.auto_reset:
+                    out.append(_lines("Performing automatic reset of abnormal partition..."))
+                    out.append(self.clear_partition(True))
+                    out.append(_lines("Abnormal partition auto-reset completed"))
+                else:
+                    self.abnormal_full = True
+                    self.abnormal_set_number = MAX_SETS - 1
+                    out.append(_lines("WARNING: Abnormal partition full - Manual reset required"))
+
+        self.normal[self.set_number] = StoredSet(self.set_start, end_time, readings)
+        out.append(_lines(f"Timestamp: {end_time}s", f"Avg current: {average:.2f}mA",
+                          f"Total time taken: {end_time - self.set_start}s"))
+        self.set_index = 0
+        self.set_number += 1
+        if self.set_number >= MAX_SETS:
+            out.append(self.clear_partition(False))
+            out.append(_lines("All normal sets complete (10 sets). Normal partition cleared. Starting over."))
+        return "".join(out)
+
+    def clear_partition(self, abnormal):
+        if abnormal:
+            self.abnormal = [StoredSet() for _ in range(MAX_SETS)]
+            self.abnormal_set_number = 0
+            self.abnormal_full = False
+        else:
+            self.normal = [StoredSet() for _ in range(MAX_SETS)]
+            self.set_number = 0
+            self.set_index = 0
+        return f"\nClearing {'abnormal' if abnormal else 'normal'} partition...\r\n" + _lines("Partition cleared!")
+
+    def handle_command(self, line):
+        """Process one command line (str) and return the output"""
+        command = line.strip()
+        out = _lines(f"Received command: '{command}'")
+        lowered = command.lower()
+        if lowered == "manabrst":
+            self.auto_reset = False
+            out += _lines("Manual abnormal partition reset enabled")
+        elif lowered == "autoabrst":
+            self.auto_reset = True
+            out += _lines("Automatic abnormal partition reset enabled")
+        elif lowered == "s":
+            self.measuring = False
+            out += _lines("Measurement stopped. Press 'R' to resume.")
+        elif lowered == "r":
+            self.measuring = True
+            out += _lines("Measurement resumed.")
+        elif lowered == "rst":
+            out += self.clear_partition(False)
+        elif lowered == "ab_rst":
+            out += self.clear_partition(True)
+        elif command.startswith("read"):
+            out += self.read_sets(command)
+        elif command.startswith("THR:"):
+            self.update_threshold(command)
+            out += _lines("Threshold updated")
+        else:
+            out += _lines(*HELP_TEXT)
+        return out.encode('ascii', errors='replace')
+
+    def update_threshold(self, command):
+        parts = command.split(':', 2)
+        if len(parts) < 3:
+            return
+        try:
+            value = float(parts[2])
+        except ValueError:
+            # Arduino's String.toFloat() gives 0 for anything unparsable
+            value = 0.0
+        if parts[1] in THRESHOLD_RANGES:
+            self.deviations[THRESHOLD_RANGES.index(parts[1])] = value
+
+    def read_sets(self, command):
+        """``read 1,2,A3`` dump, parsed character by character as the sketch does"""
+        sets = command[5:] + ","
+        selected = []
+        abnormal_read = False
+        listed = []
+        i = 0
+        while i < len(sets):
+            char = sets[i]
+            if char in "Aa":
+                abnormal_read = True
+                if i + 1 < len(sets) and sets[i + 1].isdigit():
+                    number = int(sets[i + 1]) - 1
+                    if 0 <= number < MAX_SETS:
+                        selected.append((True, number))
+                        listed.append(f"A{number + 1},")
+                    i += 1
+            elif char.isdigit():
+                number = int(char) - 1
+                if 0 <= number < MAX_SETS:
+                    selected.append((False, number))
+                    listed.append(f"{number + 1},")
+            i += 1
+
+        out = ["\nFRAM READING\nSet ", "".join(listed), "\n----------\r\n"]
+        if not selected:
+            out.append(_lines("No valid sets specified. Use format 'read 1,2,3' or 'read A1,A2' (numbers 1-10)"))
+            return "".join(out)
+
+        # Start and end times come from the lowest and highest set number,
+        # all from the abnormal partition if any abnormal set was named
+        partition = self.abnormal if abnormal_read else self.normal
+        numbers = [number for _, number in selected]
+        first_start = partition[min(numbers)].start_time
+        last_end = partition[max(numbers)].end_time
+
+        total = 0
+        global_index = 1
+        for is_abnormal, number in selected:
+            readings = (self.abnormal if is_abnormal else self.normal)[number].readings
+            out.append(f"\nSet {'A' if is_abnormal else ''}{number + 1} readings:\r\n")
+            out.extend(f"{index} {value}\r\n" for index, value in enumerate(readings.tolist(), global_index))
+            global_index += len(readings)
+            total += int(readings.sum(dtype=np.int64))
+        average = total / (len(selected) * SAMPLES_PER_SET)
+        out.append("\n----------\r\n")
+        out.append(_lines(f"Start Time: {first_start} s", f"End Time: {last_end} s",
+                          f"Average Current: {average:.1f} mA"))
+        out.append("----------\n\r\n")
+        return "".join(out)
@@ -0,0 +1,142 @@
+import time
+from collections import deque
+from threading import Condition
+
+# Overflow policies: the display wants the freshest data and drops the
+# oldest; recording must not lose anything, so its producer waits for room
+DROP_OLDEST = "drop-oldest"
+BLOCK = "block"
+QUEUE_POLICIES = (DROP_OLDEST, BLOCK)
+
+class BoundedQueue:
+    """Thread-safe FIFO handoff holding at most ``capacity`` units
+
+    Every item is put with its size in the queue's unit (samples, records or
+    bytes). When an item does not fit, DROP_OLDEST discards the oldest items
+    to make room and counts them; BLOCK makes ``put`` wait until the consumer
+    has taken enough. An item larger than the whole capacity is still accepted
+    once the queue is empty. With ``split(item, n) -> (head, rest)``,
+    ``get(limit)`` takes part of an item to stay within the limit.
+
+    ``stats()`` reports the fill level, the high-water mark, what was dropped,
+    how long the producer was blocked and how long items waited in the queue.
+    """
+    def __init__(self, capacity, policy=DROP_OLDEST, split=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r}")
+        self.capacity = capacity
+        self.policy = policy
+        self.split = split
+        self.items = deque()
+        self.size = 0
+        self.closed = False
+        self.condition = Condition()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.condition:
+            self.put_total = 0
+            self.dropped_items = 0
+            self.dropped_total = 0
+            self.high_water = self.size
+            self.blocked_puts = 0
+            self.blocked_time = 0.0
+            self.taken_total = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def put(self, item, size=1, timeout=None):
+        """Queue an item; False if it was not queued (BLOCK timed out or closed)"""
+        with self.condition:
+            if self.closed:
+                self._count_drop(size)
+                return False
+            if self.size + size > self.capacity and self.size:
+                if self.policy == DROP_OLDEST:
+                    while self.items and self.size + size > self.capacity:
+                        _, dropped_size, _ = self.items.popleft()
+                        self.size -= dropped_size
+                        self._count_drop(dropped_size)
+                else:
+                    started = time.monotonic()
+                    self.blocked_puts += 1
+                    fits = self.condition.wait_for(
+                        lambda: self.closed or not self.size or self.size + size <= self.capacity,
+                        timeout)
+                    self.blocked_time += time.monotonic() - started
+                    if not fits or self.closed:
+                        self._count_drop(size)
+                        return False
+            self.items.append((item, size, time.monotonic()))
+            self.size += size
+            self.put_total += size
+            if self.size > self.high_water:
+                self.high_water = self.size
+            return True
+
+    def _count_drop(self, size):
+        self.dropped_items += 1
+        self.dropped_total += size
+
+    def get(self, limit=None):
+        """Take queued items totalling at most ``limit`` (all if None), oldest first
+
+        Never blocks; returns an empty list when nothing is queued. Without a
+        split function the first item is taken whole even if it exceeds the
+        limit.
+        """
+        taken = []
+        with self.condition:
+            now = time.monotonic()
+            total = 0
+            items = self.items
+            while items and (limit is None or total < limit):
+                item, size, stamp = items[0]
+                room = None if limit is None else limit - total
+                if room is not None and size > room:
+                    if self.split is not None:
+                        item, rest = self.split(item, room)
+                        items[0] = (rest, size - room, stamp)
+                        size = room
+                    elif taken:
+                        break
+                    else:
+                        items.popleft()
+                else:
+                    items.popleft()
+                taken.append(item)
+                total += size
+                wait = now - stamp
+                self.wait_total += wait * size
+                if wait > self.wait_max:
+                    self.wait_max = wait
+            self.size -= total
+            self.taken_total += total
+            if total:
+                self.condition.notify_all()
+        return taken
+
+    def close(self):
+        """Refuse further items and release any producer waiting for room"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'policy': self.policy,
+                'size': self.size,
+                'capacity': self.capacity,
+                'high_water': self.high_water,
+                'put_total': self.put_total,
+                'dropped_total': self.dropped_total,
+                'dropped_items': self.dropped_items,
+                'blocked_puts': self.blocked_puts,
+                'blocked_ms': self.blocked_time * 1000,
+                'wait_ms_avg': self.wait_total * 1000 / self.taken_total if self.taken_total else 0.0,
+                'wait_ms_max': self.wait_max * 1000,
+            }
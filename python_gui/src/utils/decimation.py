@@ -0,0 +1,55 @@
+import numpy as np
+
+def visible_slice(x, x_min, x_max):
+    """Index range of the samples inside [x_min, x_max], plus one neighbour on
+    each side so the drawn line reaches the edges of the view"""
+    n = len(x)
+    lo = max(int(np.searchsorted(x, x_min, side='left')) - 1, 0)
+    hi = min(int(np.searchsorted(x, x_max, side='right')) + 1, n)
+    return lo, hi
+
+def interleave_minmax(x, mins, maxs):
+    """Build the drawable (x, y) arrays from per-column min/max values"""
+    out_x = np.repeat(x, 2)
+    out_y = np.empty(2 * len(mins), dtype=np.result_type(mins, maxs))
+    out_y[0::2] = mins
+    out_y[1::2] = maxs
+    return out_x, out_y
+
+def reduce_columns(x, mins, maxs, columns):
+    """Merge consecutive (x, min, max) entries so at most ``columns`` remain,
+    evenly spread over the x extent, and return the drawable (x, y) arrays"""
+    if len(x) <= columns:
+        return interleave_minmax(x, mins, maxs)
+
+    # First entry of every non-empty column
+    edges = np.linspace(x[0], x[-1], columns + 1)[:-1]
+    starts = np.searchsorted(x, edges, side='left')
+    keep = np.empty(len(starts), dtype=bool)
+    keep[0] = True
+    np.not_equal(starts[1:], starts[:-1], out=keep[1:])
+    starts = starts[keep]
+
+    return interleave_minmax(x[starts],
+                             np.minimum.reduceat(mins, starts),
+                             np.maximum.reduceat(maxs, starts))
+
+def minmax_decimate(x, y, x_min, x_max, columns):
+    """Reduce the samples visible in [x_min, x_max] to one min/max pair per pixel column
+
+    ``x`` must be sorted ascending. Every column keeps its extreme values, so
+    single-sample current spikes survive at any zoom level. Returns the input
+    slice unchanged when it already has no more than two points per column.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) == 0:
+        return x, y
+
+    lo, hi = visible_slice(x, x_min, x_max)
+    xs = x[lo:hi]
+    ys = y[lo:hi]
+    columns = max(int(columns), 1)
+    if len(xs) <= 2 * columns:
+        return xs, ys
+    return reduce_columns(xs, ys, ys, columns)
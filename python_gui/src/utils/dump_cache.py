@@ -0,0 +1,161 @@
+"""Cache of parsed dump files, so reopening a dump skips parsing entirely
+
+Each entry is a single file in the cache directory: a short fixed prefix, a
+JSON header (identity of the source file and the DumpReader metadata) and
+the raw sample arrays, which are memory-mapped on load. An entry is only
+used while the source file still has the size and modification time it had
+when it was parsed. The directory is kept under a size cap by deleting the
+least recently used entries.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import struct
+import numpy as np
+
+from utils.dump_reader import DumpReader, read_dump
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".dumpcache"
+DEFAULT_MAX_BYTES = 2 << 30
+
+_MAGIC = b"ZSDC"
+_PREFIX = struct.Struct("<4sII")  # magic, version, header length
+_ALIGNMENT = 64
+_TIME_DTYPE = np.dtype('<f8')
+_CURRENT_DTYPE = np.dtype('<f4')
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ZSOM-CurrentSense", "dump_cache")
+
+def file_identity(path):
+    """What a cache entry is keyed on: absolute path, size and mtime"""
+    stat = os.stat(path)
+    return {'path': os.path.normcase(os.path.abspath(path)), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns}
+
+def _aligned(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+class DumpCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def entry_path(self, source_path):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(source_path)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def load(self, source_path):
+        """Return the cached DumpReader for a file, or None if missing or stale"""
+        entry_path = self.entry_path(source_path)
+        try:
+            identity = file_identity(source_path)
+            with open(entry_path, 'rb') as file:
+                magic, version, header_length = _PREFIX.unpack(file.read(_PREFIX.size))
+                if magic != _MAGIC or version != CACHE_VERSION:
+                    return None
+                header = json.loads(file.read(header_length))
+            if header['identity'] != identity:
+                return None
+            times = self._map(entry_path, _TIME_DTYPE, header['times_offset'], header['count'])
+            currents = self._map(entry_path, _CURRENT_DTYPE, header['currents_offset'], header['count'])
+            # Entry modification time doubles as its last-used time for eviction
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Ignoring dump cache entry {entry_path}: {e}")
+            return None
+        logger.debug(f"Loaded {source_path} from dump cache")
+        return DumpReader.from_metadata(times, currents, header['metadata'])
+
+    @staticmethod
+    def _map(path, dtype, offset, count):
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def store(self, source_path, reader, identity=None):
+        """Save a finished reader; ``identity`` should be taken before parsing
+        started, so a file changed mid-parse is never cached as current"""
+        if identity is None:
+            identity = file_identity(source_path)
+        times, currents = reader.arrays()
+        count = len(times)
+        header = {'identity': identity, 'metadata': reader.metadata(), 'count': count,
+                  'times_offset': 0, 'currents_offset': 0}
+        # The header is padded, so filling in the offsets cannot outgrow it
+        header_length = len(json.dumps(header).encode('utf-8')) + 64
+        header['times_offset'] = _aligned(_PREFIX.size + header_length)
+        header['currents_offset'] = _aligned(header['times_offset'] + count * _TIME_DTYPE.itemsize)
+        header_bytes = json.dumps(header).encode('utf-8').ljust(header_length)
+
+        entry_path = self.entry_path(source_path)
+        temp_path = entry_path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                file.write(_PREFIX.pack(_MAGIC, CACHE_VERSION, header_length))
+                file.write(header_bytes)
+                file.seek(header['times_offset'])
+                np.asarray(times, dtype=_TIME_DTYPE).tofile(file)
+                file.seek(header['currents_offset'])
+                np.asarray(currents, dtype=_CURRENT_DTYPE).tofile(file)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Could not write dump cache entry for {source_path}: {e}")
+            return
+        logger.debug(f"Stored {source_path} in dump cache")
+        self.evict(keep=entry_path)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the directory fits the cap"""
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(CACHE_SUFFIX):
+                    path = os.path.join(self.directory, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                # Still memory-mapped somewhere (Windows); try again next time
+                pass
+
+def find_dumps(directory, pattern, recursive):
+    """Sorted paths of the files in ``directory`` matching ``pattern``"""
+    if recursive:
+        paths = glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+    else:
+        paths = glob.glob(os.path.join(directory, pattern))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+def load_or_parse(source_path, cache=None):
+    """Reader for a dump file from the cache, parsing and caching it on a miss
+
+    A plain function of picklable arguments, so it can run in a process pool.
+    """
+    reader = cache.load(source_path) if cache else None
+    if reader is None:
+        identity = file_identity(source_path)
+        reader = read_dump(source_path)
+        # Trim the sample arrays before they are stored or sent back
+        reader.arrays()
+        if cache:
+            cache.store(source_path, reader, identity)
+    return reader
@@ -0,0 +1,352 @@
+"""Streaming reader for dump files saved from the firmware's ``read`` command
+
+The file is memory-mapped and walked in line-aligned blocks; each line is
+classified once, so format validation and sample extraction happen in the
+same pass. Samples go straight into preallocated NumPy arrays, so peak memory
+is the compact sample arrays plus one block, whatever the file size.
+
+Well-formed ``<index> <mA>`` lines, nearly the whole of a dump, are located
+and converted with vectorized NumPy byte operations. Every other line
+(headers, separators, the trailer and anything malformed) goes through the
+generic per-line parser, in file order.
+"""
+import mmap
+import os
+from typing import NamedTuple
+import numpy as np
+
+from utils.protocol import (parse_line, DumpStart, SetHeader, Separator, DumpTrailer,
+    START_TIME, END_TIME, AVERAGE_CURRENT)
+
+CHUNK_SIZE = 1 << 20
+
+# Sections a dump must contain to be accepted
+REQUIRED_SECTIONS = frozenset(("FRAM READING", "Set", "----------",
+                               "Start Time:", "End Time:", "Average Current:"))
+
+_TRAILER_SECTIONS = {START_TIME: "Start Time:", END_TIME: "End Time:",
+                     AVERAGE_CURRENT: "Average Current:"}
+
+# Typical "<index> <mA>\r\n" line length, used to size the arrays up front
+BYTES_PER_SAMPLE_ESTIMATE = 10
+
+# Digit runs converted by the fast path; longer ones go to the generic parser
+MAX_DIGITS = 16
+
+# Masks keeping the last n bytes of a little-endian 64-bit word, n = 0..8
+_KEEP = np.array([~((1 << (8 * (8 - n))) - 1) & 0xFFFFFFFFFFFFFFFF for n in range(9)],
+                 dtype=np.uint64)
+_ASCII_ZEROS = np.uint64(0x3030303030303030)
+_BYTE_LANES = np.uint64(0x00FF00FF00FF00FF)
+_SHORT_LANES = np.uint64(0x0000FFFF0000FFFF)
+_LOW_WORD = np.uint64(0xFFFFFFFF)
+
+def _word_digits(words, lengths):
+    """Value of the last ``lengths`` (0..8) ASCII digits of each little-endian word
+
+    Adjacent digits are combined in place (pairs, then quads, then the two
+    halves), so a whole word is converted with a handful of integer ops.
+    """
+    keep = _KEEP[lengths]
+    words = (words & keep) - (_ASCII_ZEROS & keep)
+    words = (words & _BYTE_LANES) * np.uint64(10) + ((words >> np.uint64(8)) & _BYTE_LANES)
+    words = (words & _SHORT_LANES) * np.uint64(100) + ((words >> np.uint64(16)) & _SHORT_LANES)
+    return (words & _LOW_WORD) * np.uint64(10000) + (words >> np.uint64(32))
+
+def _token_values(padded, ends, lengths):
+    """Decimal value of each digit run ``padded[ends - lengths:ends]``
+
+    The eight bytes before each run end are read as one unaligned 64-bit word;
+    runs longer than eight digits take a second word.
+    """
+    words = np.ndarray((len(padded) - 7,), dtype='<u8', buffer=padded, strides=(1,))
+    low = np.minimum(lengths, 8)
+    values = _word_digits(words[ends - 8], low)
+    if len(lengths) and lengths.max() > 8:
+        high = _word_digits(words[ends - 16], lengths - low)
+        values += high * np.uint64(100000000)
+    return values
+
+def scan_lines(block):
+    """Split a block of complete lines and convert the well-formed sample lines
+
+    Returns (starts, ends, clean, index, current): the byte range of every
+    line without its line ending, a mask of the lines that are exactly
+    ``<digits> <digits>``, and the two values of each clean line, in order.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    # Spaces in front so fixed-width windows never start before the block,
+    # and a newline at the end so the last line is terminated
+    padded = np.full(len(data) + MAX_DIGITS + 1, 32, dtype=np.uint8)
+    padded[MAX_DIGITS:-1] = data
+    padded[-1] = 10
+
+    # Positions of all non-digit bytes; a clean line has exactly a space, an
+    # optional \r and its \n, so counting is done on ranks in this array
+    non_digits = np.flatnonzero((padded - 48) >= 10)
+    newline_ranks = np.flatnonzero(padded[non_digits] == 10)
+    newlines = non_digits[newline_ranks]
+    previous_ranks = np.empty_like(newline_ranks)
+    previous_ranks[:1] = MAX_DIGITS - 1  # the last padding space
+    previous_ranks[1:] = newline_ranks[:-1]
+
+    starts = np.empty_like(newlines)
+    starts[:1] = MAX_DIGITS
+    starts[1:] = newlines[:-1] + 1
+    carriage = padded[newlines - 1] == 13
+    ends = newlines - (carriage & (newlines > starts))
+    space = non_digits[previous_ranks + 1]
+
+    index_lengths = space - starts
+    current_lengths = ends - space - 1
+    clean = ((padded[space] == 32) & (newline_ranks - previous_ranks == 2 + carriage)
+             & (index_lengths > 0) & (index_lengths <= MAX_DIGITS)
+             & (current_lengths > 0) & (current_lengths <= MAX_DIGITS))
+
+    index = _token_values(padded, space[clean], index_lengths[clean])
+    current = _token_values(padded, ends[clean], current_lengths[clean]).astype(np.float32)
+    return starts - MAX_DIGITS, ends - MAX_DIGITS, clean, index, current
+
+class SetSegment(NamedTuple):
+    """One ``Set N readings:`` block of a dump
+
+    ``offset``/``end_offset`` are the byte range in the file, from the header
+    line to the line that closes the block; ``start``/``stop`` the range of
+    the block's samples in the sample arrays.
+    """
+    label: str
+    offset: int
+    end_offset: int
+    start: int
+    stop: int
+
+    @property
+    def abnormal(self):
+        return self.label.startswith('A')
+
+    def __len__(self):
+        return self.stop - self.start
+
+class SampleBuffer:
+    """Preallocated sample arrays (index as float64, mA as float32) that grow
+    geometrically if the initial estimate was too small"""
+    def __init__(self, capacity):
+        capacity = max(int(capacity), 1024)
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.currents = np.empty(capacity, dtype=np.float32)
+        self.size = 0
+
+    @classmethod
+    def wrap(cls, times, currents):
+        """Buffer over existing (e.g. memory-mapped) arrays, without copying"""
+        buffer = cls.__new__(cls)
+        buffer.times = times
+        buffer.currents = currents
+        buffer.size = len(times)
+        return buffer
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, times, currents):
+        count = len(times)
+        if count == 0:
+            return
+        needed = self.size + count
+        if needed > len(self.times):
+            capacity = max(needed, int(len(self.times) * 1.5))
+            self.times = np.resize(self.times, capacity)
+            self.currents = np.resize(self.currents, capacity)
+        self.times[self.size:needed] = times
+        self.currents[self.size:needed] = currents
+        self.size = needed
+
+    def views(self):
+        """Views of the filled part; later ``extend`` calls never modify them"""
+        return self.times[:self.size], self.currents[:self.size]
+
+    def arrays(self):
+        """Return the filled part, trimmed to size if the spare capacity is large"""
+        if self.size < len(self.times) * 0.75:
+            self.times = self.times[:self.size].copy()
+            self.currents = self.currents[:self.size].copy()
+        return self.views()
+
+class DumpReader:
+    """Incremental dump parser
+
+    Pass line-aligned blocks to ``feed_lines`` (see ``iter_line_blocks``), or
+    arbitrary chunks to ``feed`` followed by ``finish``.
+    """
+    def __init__(self, size_hint=0):
+        self.tail = b''
+        self.samples = SampleBuffer(size_hint // BYTES_PER_SAMPLE_ESTIMATE)
+        self.sections = set()
+        self.start_time = None
+        self.end_time = None
+        self.average_current = None
+        self.set_label = None
+        self.sets = []  # SetSegment per "Set N readings:" block
+        self.open_set = None  # (label, offset, start) of the block being read
+        self.bytes_read = 0
+        self.parse_errors = 0
+
+    @property
+    def valid(self):
+        return self.sections >= REQUIRED_SECTIONS
+
+    def feed(self, chunk):
+        """Parse the complete lines of a chunk and keep the rest for later"""
+        chunk = self.tail + bytes(chunk)
+        end = chunk.rfind(b'\n') + 1
+        self.tail = chunk[end:]
+        if end:
+            self.feed_lines(chunk[:end])
+
+    def finish(self):
+        """Parse a final line that has no trailing newline and close the last set"""
+        tail, self.tail = self.tail, b''
+        if tail:
+            self.feed_lines(tail)
+        self.close_set(self.bytes_read)
+        return self
+
+    def feed_lines(self, block):
+        """Parse a block of complete lines (the last one may lack its newline)"""
+        base = self.bytes_read
+        self.bytes_read += len(block)
+        starts, ends, clean, index, current = scan_lines(block)
+        others = np.flatnonzero(~clean & (ends > starts))
+        if len(others):
+            # Keep file order: the samples before each run of other lines
+            # are stored before the run is parsed
+            data = np.frombuffer(block, dtype=np.uint8)
+            splits = np.cumsum(clean)[others].tolist()
+            done = 0
+            pending = []
+            offsets = []
+            for line, split in zip(others.tolist(), splits):
+                if split != done:
+                    if pending:
+                        self.handle_lines(pending, offsets)
+                        pending = []
+                        offsets = []
+                    self.samples.extend(index[done:split], current[done:split])
+                    done = split
+                text = data[starts[line]:ends[line]].tobytes().strip()
+                if text:
+                    pending.append(text)
+                    offsets.append(base + int(starts[line]))
+            if pending:
+                self.handle_lines(pending, offsets)
+            index = index[done:]
+            current = current[done:]
+        self.samples.extend(index, current)
+
+    def handle_lines(self, lines, offsets=None):
+        """Generic per-line parsing; ``offsets`` are the lines' byte offsets
+        in the file, used for the set index"""
+        times = []
+        currents = []
+        for position, line in enumerate(lines):
+            try:
+                # <index> <mA> lines are nearly the whole file; keep them
+                # out of the record machinery
+                if 48 <= line[0] <= 57:
+                    index, current = line.split()
+                    times.append(int(index))
+                    currents.append(float(current))
+                    continue
+                record = parse_line(line)
+            except (ValueError, IndexError):
+                self.parse_errors += 1
+                continue
+            if times:
+                self.samples.extend(times, currents)
+                times = []
+                currents = []
+            self.handle_record(record, offsets[position] if offsets else self.bytes_read)
+        self.samples.extend(times, currents)
+
+    def handle_record(self, record, offset=0):
+        record_type = type(record)
+        if record_type is DumpTrailer:
+            self.sections.add(_TRAILER_SECTIONS[record.field])
+            # Keep the first occurrence of each field
+            if record.field == START_TIME and self.start_time is None:
+                self.start_time = record.value
+            elif record.field == END_TIME and self.end_time is None:
+                self.end_time = record.value
+            elif record.field == AVERAGE_CURRENT and self.average_current is None:
+                self.average_current = record.value
+        elif record_type is SetHeader:
+            self.sections.add("Set")
+            if self.set_label is None:
+                self.set_label = record.label.split(',')[0]
+            if record.readings:
+                self.close_set(offset)
+                self.open_set = (record.label, offset, len(self.samples))
+        elif record_type is Separator:
+            self.sections.add("----------")
+            self.close_set(offset)
+        elif record_type is DumpStart:
+            self.sections.add("FRAM READING")
+
+    def close_set(self, offset):
+        """End the current ``Set N readings:`` block at a byte offset"""
+        if self.open_set is not None:
+            label, start_offset, start = self.open_set
+            self.sets.append(SetSegment(label, start_offset, offset, start, len(self.samples)))
+            self.open_set = None
+
+    def arrays(self):
+        return self.samples.arrays()
+
+    def metadata(self):
+        """Everything except the samples, as JSON-serialisable values"""
+        return {'sections': sorted(self.sections), 'start_time': self.start_time,
+                'end_time': self.end_time, 'average_current': self.average_current,
+                'set_label': self.set_label, 'sets': self.sets,
+                'bytes_read': self.bytes_read, 'parse_errors': self.parse_errors}
+
+    @classmethod
+    def from_metadata(cls, times, currents, metadata):
+        """Rebuild a finished reader from ``metadata()`` and its sample arrays"""
+        reader = cls()
+        reader.samples = SampleBuffer.wrap(times, currents)
+        reader.sections = set(metadata['sections'])
+        for name in ('start_time', 'end_time', 'average_current', 'set_label',
+                     'bytes_read', 'parse_errors'):
+            setattr(reader, name, metadata[name])
+        reader.sets = [SetSegment(*segment) for segment in metadata['sets']]
+        return reader
+
+def iter_line_blocks(path, chunk_size=CHUNK_SIZE):
+    """Yield zero-copy views of a memory-mapped file, each ending on a newline
+
+    Blocks are about ``chunk_size`` bytes; one is only longer if a single
+    line does not fit. The views must be released before the next block.
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    newline = mapped.rfind(b'\n', start, end)
+                    if newline < 0:
+                        newline = mapped.find(b'\n', end)
+                    end = size if newline < 0 else newline + 1
+                with memoryview(mapped)[start:end] as block:
+                    yield block
+                start = end
+
+def read_dump(path, chunk_size=CHUNK_SIZE):
+    """Parse a dump file in one streaming pass and return the DumpReader"""
+    reader = DumpReader(os.path.getsize(path))
+    for block in iter_line_blocks(path, chunk_size):
+        reader.feed_lines(block)
+    return reader.finish()
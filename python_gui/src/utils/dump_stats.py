@@ -0,0 +1,60 @@
+"""Per-set summary statistics for parsed dump files"""
+import numpy as np
+
+from utils.dump_cache import load_or_parse
+from utils.thresholds import deviation_events, DEFAULT_DEVIATIONS
+
+# The firmware takes one reading per loop with a 1 ms delay
+DEFAULT_SAMPLE_PERIOD = 0.001
+# Supply voltage used to turn charge into energy
+DEFAULT_SUPPLY_VOLTAGE = 3.3
+
+COLUMNS = ("dump", "set", "abnormal", "samples", "mean_ma", "min_ma", "max_ma", "p50_ma",
+           "p99_ma", "charge_mas", "energy_mj", "deviation_events", "start_time_s", "end_time_s")
+
+def set_statistics(currents, deviations=DEFAULT_DEVIATIONS, sample_period=DEFAULT_SAMPLE_PERIOD,
+                   voltage=DEFAULT_SUPPLY_VOLTAGE):
+    """Summary of one set of current readings (mA)
+
+    Charge is the sum of the readings times the sample period (mA*s) and
+    energy that charge at the supply voltage (mJ).
+    """
+    currents = np.asarray(currents, dtype=np.float64)
+    if len(currents) == 0:
+        return {"samples": 0, "mean_ma": np.nan, "min_ma": np.nan, "max_ma": np.nan,
+                "p50_ma": np.nan, "p99_ma": np.nan, "charge_mas": 0.0, "energy_mj": 0.0,
+                "deviation_events": 0}
+    p50, p99 = np.percentile(currents, [50, 99])
+    charge = float(currents.sum()) * sample_period
+    return {"samples": len(currents), "mean_ma": float(currents.mean()),
+            "min_ma": float(currents.min()), "max_ma": float(currents.max()),
+            "p50_ma": float(p50), "p99_ma": float(p99), "charge_mas": charge,
+            "energy_mj": charge * voltage,
+            "deviation_events": len(deviation_events(currents, deviations))}
+
+def dump_statistics(reader, file_name="", **options):
+    """One row per set of a parsed dump (or one row for a dump without sets)"""
+    _, currents = reader.arrays()
+    if reader.sets:
+        segments = [(segment.label, segment.abnormal, currents[segment.start:segment.stop])
+                    for segment in reader.sets]
+    else:
+        segments = [("", False, currents)]
+
+    rows = []
+    for label, abnormal, values in segments:
+        row = {"dump": file_name, "set": label, "abnormal": abnormal}
+        row.update(set_statistics(values, **options))
+        row["start_time_s"] = reader.start_time if reader.start_time is not None else np.nan
+        row["end_time_s"] = reader.end_time if reader.end_time is not None else np.nan
+        rows.append(row)
+    return rows
+
+def analyze_dump_file(path, cache=None, file_name=None, **options):
+    """Parse (or load from the cache) one dump and return its rows, or None
+    if it is not a valid dump; runs in a process pool, so only the small
+    rows travel back"""
+    reader = load_or_parse(path, cache)
+    if not reader.valid:
+        return None
+    return dump_statistics(reader, file_name if file_name is not None else path, **options)
@@ -0,0 +1,42 @@
+import time
+
+class FrameMeter:
+    """Frame time, achieved frame rate and backlog of a GUI update loop"""
+    def __init__(self, report_interval=1.0):
+        self.report_interval = report_interval
+        self.last_report = None
+        self.reset()
+
+    def reset(self):
+        self.window_start = time.monotonic()
+        self.frames = 0
+        self.frame_time_total = 0.0
+        self.frame_time_max = 0.0
+        self.backlog = 0
+        self.backlog_max = 0
+
+    def add(self, frame_time, backlog):
+        """Record one frame's work time (seconds) and the backlog it left behind"""
+        self.frames += 1
+        self.frame_time_total += frame_time
+        if frame_time > self.frame_time_max:
+            self.frame_time_max = frame_time
+        self.backlog = backlog
+        if backlog > self.backlog_max:
+            self.backlog_max = backlog
+
+    def maybe_report(self):
+        """Return a stats dict once per report interval, otherwise None"""
+        elapsed = time.monotonic() - self.window_start
+        if elapsed < self.report_interval or self.frames == 0:
+            return None
+
+        self.last_report = {
+            'fps': self.frames / elapsed,
+            'frame_ms_avg': self.frame_time_total * 1000 / self.frames,
+            'frame_ms_max': self.frame_time_max * 1000,
+            'backlog': self.backlog,
+            'backlog_max': self.backlog_max,
+        }
+        self.reset()
+        return self.last_report
@@ -0,0 +1,152 @@
+import os
+import logging
+import numpy as np
+
+from utils.decimation import visible_slice, reduce_columns, minmax_decimate
+
+logger = logging.getLogger(__name__)
+
+LOD_SUFFIX = ".lod.npy"
+
+def _pairwise(values, op, **kwargs):
+    """Combine neighbouring entries two at a time; an odd tail entry is kept as is"""
+    even = len(values) - len(values) % 2
+    combined = op(values[0:even:2], values[1:even:2], **kwargs)
+    if even == len(values):
+        return combined
+    return np.concatenate((combined, values[even:].astype(combined.dtype)))
+
+class LodPyramid:
+    """Multi-resolution level-of-detail summary of one sample series
+
+    Level ``k`` (1..len(levels)) holds the min, max and mean of every block of
+    ``2**k`` consecutive samples; level 0 is the raw data itself. A query
+    picks the coarsest level that still has at least one block per pixel
+    column in the visible range, so the work per frame stays proportional to
+    the plot width rather than to the number of samples on screen.
+    """
+    def __init__(self, x, y, levels):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.levels = levels  # [(mins, maxs, means)] for k = 1, 2, ...
+
+    def __len__(self):
+        return len(self.y)
+
+    @classmethod
+    def build(cls, x, y):
+        """Build every level in one O(n) pass of pairwise reductions"""
+        y = np.asarray(y)
+        count = len(y)
+        levels = []
+        mins = maxs = sums = y
+        block = 1
+        while len(mins) > 1:
+            block *= 2
+            mins = _pairwise(mins, np.minimum)
+            maxs = _pairwise(maxs, np.maximum)
+            sums = _pairwise(sums, np.add, dtype=np.float64)
+            # Every block is full except possibly the last one
+            means = (sums / block).astype(np.float32)
+            means[-1] = sums[-1] / (count - (len(sums) - 1) * block)
+            levels.append((mins, maxs, means))
+        return cls(x, y, levels)
+
+    def level_for(self, visible_count, columns):
+        """Coarsest level with at least ``columns`` blocks across ``visible_count`` samples"""
+        if visible_count <= 2 * columns:
+            return 0
+        level = int(np.log2(visible_count / columns))
+        return min(max(level, 0), len(self.levels))
+
+    def query_blocks(self, x_min, x_max, columns):
+        """Return (level, x, mins, maxs, means) for the blocks covering the view"""
+        lo, hi = visible_slice(self.x, x_min, x_max)
+        level = self.level_for(hi - lo, max(int(columns), 1))
+        if level == 0:
+            ys = self.y[lo:hi]
+            return 0, self.x[lo:hi], ys, ys, ys
+
+        step = 1 << level
+        block_lo = lo >> level
+        block_hi = (hi + step - 1) >> level
+        mins, maxs, means = self.levels[level - 1]
+        block_x = self.x[block_lo * step:block_hi * step:step]
+        return (level, block_x, mins[block_lo:block_hi], maxs[block_lo:block_hi],
+                means[block_lo:block_hi])
+
+    def query(self, x_min, x_max, columns):
+        """Drawable min/max (x, y) arrays for the visible x-range"""
+        if len(self.x) == 0:
+            return self.x, self.y
+        level, x, mins, maxs, _ = self.query_blocks(x_min, x_max, columns)
+        if level == 0:
+            return minmax_decimate(x, mins, x_min, x_max, columns)
+        return reduce_columns(x, mins, maxs, max(int(columns), 1))
+
+    @staticmethod
+    def level_lengths(count):
+        """Number of blocks on each level for a series of ``count`` samples"""
+        lengths = []
+        while count > 1:
+            count = (count + 1) // 2
+            lengths.append(count)
+        return lengths
+
+    def save(self, path):
+        """Write all levels as one (3, blocks) float32 .npy file: mins, maxs, means"""
+        stacked = np.empty((3, sum(len(level[0]) for level in self.levels)), dtype=np.float32)
+        offset = 0
+        for level in self.levels:
+            end = offset + len(level[0])
+            for row, values in enumerate(level):
+                stacked[row, offset:end] = values
+            offset = end
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as file:
+            np.save(file, stacked)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, x, y):
+        """Memory-map saved levels for (x, y); None if missing or mismatched
+
+        Only the blocks a query touches are ever read from disk.
+        """
+        try:
+            stacked = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        lengths = cls.level_lengths(len(y))
+        if stacked.ndim != 2 or stacked.shape != (3, sum(lengths)):
+            return None
+        levels = []
+        offset = 0
+        for length in lengths:
+            levels.append(tuple(stacked[row, offset:offset + length] for row in range(3)))
+            offset += length
+        return cls(x, y, levels)
+
+def load_or_build_pyramid(source_path, x, y):
+    """Return the pyramid for a data file, reusing the sidecar next to it if current
+
+    The sidecar is only trusted when it is newer than the data file and its
+    shape matches the sample count.
+    """
+    lod_path = source_path + LOD_SUFFIX
+    try:
+        if os.stat(lod_path).st_mtime >= os.stat(source_path).st_mtime:
+            pyramid = LodPyramid.load(lod_path, x, y)
+            if pyramid is not None:
+                logger.debug(f"Loaded LOD pyramid from {lod_path}")
+                return pyramid
+    except OSError:
+        pass
+
+    pyramid = LodPyramid.build(x, y)
+    try:
+        pyramid.save(lod_path)
+        logger.debug(f"Saved LOD pyramid to {lod_path}")
+    except OSError as e:
+        logger.warning(f"Could not save LOD pyramid to {lod_path}: {e}")
+    return pyramid
@@ -0,0 +1,153 @@
+"""Parser for the ZSOM-M01 firmware's line-based text protocol
+
+Every framed line (bytes, already stripped) is classified exactly once by its
+leading byte and turned into a small typed record. Lines that are not part of
+the protocol come back as ``Message`` records; malformed protocol lines raise
+ValueError or IndexError, which the ingest pipeline counts as parse errors.
+"""
+from typing import NamedTuple
+
+class CurrentSample(NamedTuple):
+    """Live reading: ``Current: X mA | ... | Index: N``"""
+    current_ma: float
+    index: int
+
+class StorageIndex(NamedTuple):
+    """Normal partition set being filled: ``Index: N``"""
+    index: int
+
+class AbnormalStatus(NamedTuple):
+    """Abnormal partition usage: ``Abnormal Storage status: a/b``"""
+    count: int
+    total: int
+
+class DumpStart(NamedTuple):
+    """``FRAM READING`` banner that opens a ``read`` dump"""
+
+class SetHeader(NamedTuple):
+    """``Set 1,2,`` list line or ``Set A1 readings:`` block header"""
+    label: str
+    readings: bool
+
+class Separator(NamedTuple):
+    """``----------`` delimiter inside a dump"""
+
+class DumpSample(NamedTuple):
+    """Dump reading: ``<index> <mA>``"""
+    index: int
+    current_ma: float
+
+class DumpTrailer(NamedTuple):
+    """Dump summary field: Start Time, End Time or Average Current"""
+    field: str
+    value: float
+
+class Message(NamedTuple):
+    """Any other line (command echoes, warnings, status text)"""
+    text: str
+
+START_TIME = 'start_time'
+END_TIME = 'end_time'
+AVERAGE_CURRENT = 'average_current'
+
+_DUMP_START = DumpStart()
+_SEPARATOR = Separator()
+
+# NamedTuple.__new__ is a Python-level function; building the high-volume
+# records with tuple.__new__ directly skips that call on the hot paths
+_new = tuple.__new__
+
+def _message(line):
+    return Message(line.decode('utf-8', errors='replace'))
+
+def _parse_c(line):
+    if not line.startswith(b'Current:'):
+        return _message(line)
+    # Current: X mA | ... | Index: N
+    if line.count(b'|') != 2:
+        raise ValueError(f"unexpected current line: {line!r}")
+    head = line[8:line.index(b'|')]
+    return _new(CurrentSample, (float(head.strip(b' mA')), int(line[line.rindex(b':') + 1:])))
+
+def _parse_i(line):
+    if not line.startswith(b'Index:'):
+        return _message(line)
+    return StorageIndex(int(line[6:]))
+
+def _parse_a(line):
+    if line.startswith(b'Abnormal Storage status:'):
+        count, total = line[24:].split(b'/')
+        return AbnormalStatus(int(count), int(total))
+    if line.startswith(b'Average Current:'):
+        return DumpTrailer(AVERAGE_CURRENT, float(line[16:].strip(b' mA')))
+    return _message(line)
+
+def _parse_s(line):
+    if line.startswith(b'Set '):
+        return SetHeader(line.split()[1].decode('ascii'), line.endswith(b'readings:'))
+    if line.startswith(b'Start Time:'):
+        return DumpTrailer(START_TIME, float(line[11:].strip(b' ms')))
+    return _message(line)
+
+def _parse_e(line):
+    if not line.startswith(b'End Time:'):
+        return _message(line)
+    return DumpTrailer(END_TIME, float(line[9:].strip(b' ms')))
+
+def _parse_f(line):
+    if line.startswith(b'FRAM READING'):
+        return _DUMP_START
+    return _message(line)
+
+def _parse_dash(line):
+    if line.startswith(b'----------'):
+        return _SEPARATOR
+    return _message(line)
+
+_DISPATCH = {
+    ord('C'): _parse_c,
+    ord('I'): _parse_i,
+    ord('A'): _parse_a,
+    ord('S'): _parse_s,
+    ord('E'): _parse_e,
+    ord('F'): _parse_f,
+    ord('-'): _parse_dash,
+}
+
+def parse_line(line):
+    """Classify one stripped protocol line (bytes) and return its record"""
+    if not line:
+        return None
+    first = line[0]
+    if 48 <= first <= 57:
+        # <index> <mA> sample lines make up nearly all of a dump
+        index, current = line.split()
+        return _new(DumpSample, (int(index), float(current)))
+    handler = _DISPATCH.get(first)
+    if handler is None:
+        return _message(line)
+    return handler(line)
+
+def format_dump_record(record):
+    """Firmware text for one record of a ``read`` dump (bytes, no line ending)
+
+    The inverse of ``parse_line`` for DumpStart, SetHeader, Separator,
+    DumpSample and DumpTrailer records, so a dump received live can be saved
+    in the same layout as a dump file.
+    """
+    record_type = type(record)
+    if record_type is DumpSample:
+        return f"{record.index} {record.current_ma:g}".encode('ascii')
+    if record_type is SetHeader:
+        return f"Set {record.label}{' readings:' if record.readings else ''}".encode('ascii')
+    if record_type is Separator:
+        return b'----------'
+    if record_type is DumpTrailer:
+        if record.field == START_TIME:
+            return f"Start Time: {record.value:g} s".encode('ascii')
+        if record.field == END_TIME:
+            return f"End Time: {record.value:g} s".encode('ascii')
+        return f"Average Current: {record.value:.1f} mA".encode('ascii')
+    if record_type is DumpStart:
+        return b'FRAM READING'
+    raise ValueError(f"not a dump record: {record!r}")
@@ -0,0 +1,125 @@
+from array import array
+from threading import Lock
+
+import numpy as np
+
+from utils.protocol import (CurrentSample, StorageIndex, AbnormalStatus, DumpStart, SetHeader,
+    Separator, DumpSample, DumpTrailer, START_TIME, END_TIME)
+
+def split_samples(chunk, count):
+    """Split a (times, currents) chunk after ``count`` samples (BoundedQueue split)"""
+    times, currents = chunk
+    return (times[:count], currents[:count]), (times[count:], currents[count:])
+
+class IngestBatch:
+    """Display state that changed since the previous batch, ready for the GUI
+
+    Each field carries the latest value seen for its display, or None if it
+    did not change during the batch. Live samples do not travel in batches;
+    they go through the batcher's sample queue.
+    """
+    __slots__ = ('storage_index', 'abnormal_status', 'set_label',
+                 'start_time', 'end_time', 'average_current', 'dump', 'dump_set_starts',
+                 'last_line')
+
+    def __init__(self):
+        self.storage_index = None
+        self.abnormal_status = None
+        self.set_label = None
+        self.start_time = None
+        self.end_time = None
+        self.average_current = None
+        self.dump = None
+        self.dump_set_starts = None
+        self.last_line = None
+
+class RecordBatcher:
+    """Fold parsed records into IngestBatch objects off the GUI thread
+
+    ``handle_records`` is an ingest pipeline subscriber and runs on the reader
+    thread; it also tracks the FRAM dump state machine so a completed ``read``
+    dump is delivered as a single list of (index, mA) pairs, with the position
+    in that list where each of its sets starts. Live samples are
+    put on ``samples`` (a BoundedQueue split with split_samples) as one
+    (times, currents) chunk per read: monotonic arrival time in seconds and
+    current in mA. With a ``detector`` (a StreamingDetector) every such chunk
+    is also checked as it arrives and the AnomalyEvents it finds are put on
+    ``events``, one queue item each, and with ``stats`` (a StreamStats) it
+    is added to the rolling statistics.
+    """
+    def __init__(self, samples, detector=None, events=None, stats=None):
+        self.samples = samples
+        self.detector = detector
+        self.events = events
+        self.stats = stats
+        self.lock = Lock()
+        self.batch = IngestBatch()
+        self.dirty = False
+        self.collecting_read_data = False
+        self.read_data_buffer = []
+        self.read_set_starts = []
+
+    def handle_records(self, records, arrival):
+        currents = array('d')
+        with self.lock:
+            batch = self.batch
+            for record in records:
+                record_type = type(record)
+                if record_type is CurrentSample:
+                    batch.storage_index = record.index
+                    # Live samples are held back while a dump is being read
+                    if not self.collecting_read_data:
+                        currents.append(record.current_ma)
+                elif record_type is DumpSample:
+                    if self.collecting_read_data:
+                        self.read_data_buffer.append((record.index, record.current_ma))
+                elif record_type is StorageIndex:
+                    batch.storage_index = record.index
+                elif record_type is AbnormalStatus:
+                    batch.abnormal_status = (record.count, record.total)
+                elif record_type is DumpStart:
+                    print("Starting FRAM reading")
+                    self.collecting_read_data = True
+                    self.read_data_buffer = []
+                    self.read_set_starts = []
+                elif record_type is SetHeader:
+                    batch.set_label = record.label
+                    if self.collecting_read_data:
+                        self.read_set_starts.append(len(self.read_data_buffer))
+                elif record_type is DumpTrailer:
+                    if record.field == START_TIME:
+                        batch.start_time = record.value
+                    elif record.field == END_TIME:
+                        batch.end_time = record.value
+                    else:
+                        batch.average_current = record.value
+                elif record_type is Separator:
+                    if not self.collecting_read_data:  # Start of data
+                        self.collecting_read_data = True
+                        self.read_data_buffer = []
+                        self.read_set_starts = []
+                    elif self.read_data_buffer:  # End of data
+                        batch.dump = self.read_data_buffer
+                        batch.dump_set_starts = self.read_set_starts
+                        self.read_data_buffer = []
+                        self.read_set_starts = []
+                        self.collecting_read_data = False
+            self.dirty = True
+        if currents:
+            currents = np.frombuffer(currents)
+            self.samples.put((np.full(len(currents), arrival), currents), len(currents))
+            if self.stats is not None:
+                self.stats.add(currents, arrival)
+            if self.detector is not None:
+                for event in self.detector.process(currents, arrival):
+                    self.events.put(event)
+
+    def take_batch(self):
+        """Return the accumulated batch and start a new one (None if idle)"""
+        with self.lock:
+            if not self.dirty:
+                return None
+            batch = self.batch
+            self.batch = IngestBatch()
+            self.dirty = False
+            return batch
@@ -0,0 +1,157 @@
+"""Replay of recorded sessions and dump files through the live ingest pipeline
+
+ReplayTransport stands in for the serial port (``SerialHandler(transport=...)``)
+and hands out timestamped chunks as they fall due: at the recorded pace, N
+times faster, or as fast as the reader asks for them (speed 0). Sources are
+session files written by SessionRecorder, replayed byte for byte, or dump
+files, whose readings are turned into the ``Current:`` lines the firmware
+sends while measuring, one per sample period.
+"""
+import logging
+import time
+
+from utils.dump_reader import read_dump
+from utils.dump_stats import DEFAULT_SAMPLE_PERIOD
+from utils.serial_communication import READ_TIMEOUT
+from utils.session_recorder import iter_session, read_session_header
+
+logger = logging.getLogger(__name__)
+
+# Serial drivers hand over at most about this much per read
+READ_SIZE = 4096
+
+# Dump samples are grouped into chunks of this many seconds
+DUMP_CHUNK_INTERVAL = 0.01
+
+def is_session_file(path):
+    try:
+        with open(path, 'rb') as file:
+            read_session_header(file)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def session_chunks(path):
+    """(seconds since the first chunk, bytes) for every chunk of a session"""
+    first = None
+    for arrival, data in iter_session(path):
+        if first is None:
+            first = arrival
+        yield arrival - first, data
+
+def dump_source(path, sample_period=DEFAULT_SAMPLE_PERIOD):
+    """Chunk source of ``Current:`` lines for every reading of a dump
+
+    The dump is parsed (and validated) once, here; the lines are formatted
+    lazily on every pass.
+    """
+    reader = read_dump(path)
+    if not reader.valid:
+        raise ValueError(f"{path} is not a valid dump file")
+    _, currents = reader.arrays()
+    if reader.sets:
+        segments = [(segment.label, segment.start, segment.stop) for segment in reader.sets]
+    else:
+        segments = [("1", 0, len(currents))]
+    per_chunk = max(1, round(DUMP_CHUNK_INTERVAL / sample_period))
+
+    def chunks():
+        for number, (label, start, stop) in enumerate(segments, 1):
+            # The set number drives the normal partition display
+            index = int(label) if label.isdigit() else number
+            suffix = f" mA | Set {label} | Index: {index}\r\n"
+            for chunk_start in range(start, stop, per_chunk):
+                values = currents[chunk_start:min(chunk_start + per_chunk, stop)].tolist()
+                data = "".join(f"Current: {value:g}{suffix}" for value in values).encode('ascii')
+                yield chunk_start * sample_period, data
+    return chunks
+
+def open_replay_source(path):
+    """Chunk source for a session or dump file, chosen by content"""
+    if is_session_file(path):
+        return lambda: session_chunks(path)
+    return dump_source(path)
+
+class ReplayTransport:
+    """Serial port stand-in that plays back ``(seconds, bytes)`` chunks
+
+    ``source`` is a callable returning a fresh chunk iterator, so the replay
+    can ``loop``. With ``speed`` 0 everything is due at once and the reader
+    gets up to ``read_size`` bytes per read, which makes the replay a
+    throughput benchmark of the pipeline. Commands written to the port are
+    logged and otherwise ignored. ``finished`` becomes true once the source
+    is exhausted and everything was read (never when looping).
+    """
+    def __init__(self, source, speed=1.0, loop=False, read_size=READ_SIZE, timeout=READ_TIMEOUT):
+        self.source = source
+        self.speed = speed
+        self.loop = loop
+        self.read_size = read_size
+        self.timeout = timeout
+        self.is_open = True
+        self.exhausted = False
+        self.bytes_replayed = 0
+        self.buffer = bytearray()
+        self.started = time.perf_counter()
+        self._restart(0.0)
+
+    @property
+    def finished(self):
+        return self.exhausted and not self.buffer
+
+    def _restart(self, offset):
+        self.chunks = iter(self.source())
+        self.offset = offset
+        self.next_chunk = next(self.chunks, None)
+        self.last_time = 0.0
+
+    def _due(self, timestamp):
+        if not self.speed:
+            return 0.0
+        return self.started + (self.offset + timestamp) / self.speed
+
+    def _fill(self):
+        """Move every chunk that is due into the buffer (up to read_size)"""
+        now = time.perf_counter()
+        while len(self.buffer) < self.read_size:
+            if self.next_chunk is None:
+                if not self.loop:
+                    self.exhausted = True
+                    return
+                # Continue the timeline where the previous pass ended
+                self._restart(self.offset + self.last_time + DUMP_CHUNK_INTERVAL)
+                if self.next_chunk is None:
+                    self.exhausted = True
+                    return
+            timestamp, data = self.next_chunk
+            if self._due(timestamp) > now:
+                return
+            self.buffer += data
+            self.last_time = timestamp
+            self.next_chunk = next(self.chunks, None)
+
+    @property
+    def in_waiting(self):
+        self._fill()
+        return min(len(self.buffer), self.read_size)
+
+    def read(self, size=1):
+        self._fill()
+        if not self.buffer:
+            # Block like a serial read: until the next chunk or the timeout
+            if self.next_chunk is not None:
+                wait = self._due(self.next_chunk[0]) - time.perf_counter()
+            else:
+                wait = self.timeout
+            time.sleep(min(max(wait, 0.0), self.timeout))
+            self._fill()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.bytes_replayed += len(data)
+        return data
+
+    def write(self, data):
+        logger.debug(f"Replay ignores command {data!r}")
+
+    def close(self):
+        self.is_open = False
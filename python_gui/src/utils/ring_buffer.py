@@ -0,0 +1,80 @@
+import numpy as np
+
+class RingBuffer:
+    """Preallocated circular buffer of (time, value) samples
+
+    Every sample is written twice, at ``i`` and ``i + capacity``, so the
+    newest ``len(self)`` samples are always one contiguous slice of the
+    backing arrays and can be handed to the plot as views without copying.
+    Times must be appended in non-decreasing order, which lets ``window``
+    find its cut with a binary search.
+    """
+    def __init__(self, capacity, time_dtype=np.float64, value_dtype=np.float32):
+        self.time_dtype = time_dtype
+        self.value_dtype = value_dtype
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = max(int(capacity), 1)
+        self._times = np.zeros(2 * self.capacity, dtype=self.time_dtype)
+        self._values = np.zeros(2 * self.capacity, dtype=self.value_dtype)
+        self._head = 0  # next write position, always in [0, capacity)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def extend(self, times, values):
+        """Append equally sized arrays of samples, dropping the oldest on overflow"""
+        times = np.asarray(times)
+        values = np.asarray(values)
+        count = len(times)
+        if count == 0:
+            return
+        capacity = self.capacity
+        if count > capacity:
+            times = times[-capacity:]
+            values = values[-capacity:]
+            count = capacity
+
+        head = self._head
+        first = min(count, capacity - head)
+        for target in (self._times, self._values):
+            source = times if target is self._times else values
+            # Primary copy, wrapping around the end of the first half
+            target[head:head + first] = source[:first]
+            target[:count - first] = source[first:]
+            # Mirror copy in the second half
+            target[head + capacity:head + capacity + first] = source[:first]
+            target[capacity:capacity + count - first] = source[first:]
+
+        self._head = (head + count) % capacity
+        self._size = min(self._size + count, capacity)
+
+    def append(self, time, value):
+        self.extend((time,), (value,))
+
+    def data(self):
+        """Return contiguous (times, values) views of all samples, oldest first"""
+        start = self._head - self._size + self.capacity
+        return self._times[start:start + self._size], self._values[start:start + self._size]
+
+    def window(self, start_time):
+        """Return views of the samples with time >= start_time"""
+        times, values = self.data()
+        cut = np.searchsorted(times, start_time, side='left')
+        return times[cut:], values[cut:]
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the newest samples that still fit"""
+        capacity = max(int(capacity), 1)
+        if capacity == self.capacity:
+            return
+        times, values = self.data()
+        times, values = times.copy(), values.copy()
+        self._allocate(capacity)
+        self.extend(times, values)
@@ -0,0 +1,90 @@
+"""Size-capped rotating output files for long unattended recordings"""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class RotatingFileWriter:
+    """Append bytes to ``<prefix>_<timestamp>_<n><suffix>`` files in a directory
+
+    A new file is started once the current one holds ``max_bytes`` (0 means no
+    size limit) or on ``rotate()``. Only the newest ``max_files`` files with the
+    same prefix and suffix are kept, so disk use stays bounded however long a
+    recording runs. ``header`` is written at the start of every file. With
+    ``sync_on_rotate`` every file is fsynced before it is closed.
+    """
+    def __init__(self, directory, prefix, suffix, max_bytes=64 << 20, max_files=100, header=b'',
+                 buffer_size=1 << 16, sync_on_rotate=False):
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.header = header
+        self.buffer_size = buffer_size
+        self.sync_on_rotate = sync_on_rotate
+        self.file = None
+        self.file_path = None
+        self.file_bytes = 0
+        self.sequence = 0
+        self.bytes_written = 0
+        self.files_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, data):
+        if self.file is None:
+            self._open()
+        self.file.write(data)
+        self.file_bytes += len(data)
+        self.bytes_written += len(data)
+        if self.max_bytes and self.file_bytes >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Close the current file; the next write starts a new one"""
+        if self.file is not None:
+            self.flush(sync=self.sync_on_rotate)
+            self.file.close()
+            self.file = None
+
+    def flush(self, sync=False):
+        """Push buffered data to the OS, and with ``sync`` to the disk"""
+        if self.file is not None:
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        self.rotate()
+
+    def _open(self):
+        self.sequence += 1
+        name = f"{self.prefix}_{time.strftime('%Y%m%d-%H%M%S')}_{self.sequence:04d}{self.suffix}"
+        self.file_path = os.path.join(self.directory, name)
+        self.file = open(self.file_path, 'ab', buffering=self.buffer_size)
+        self.file_bytes = 0
+        self.files_written += 1
+        if self.header:
+            self.file.write(self.header)
+            self.file_bytes += len(self.header)
+        self._prune()
+
+    def _prune(self):
+        """Delete the oldest files beyond ``max_files``"""
+        if not self.max_files:
+            return
+        try:
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.startswith(self.prefix + "_") and name.endswith(self.suffix)]
+            paths.sort(key=lambda path: (os.path.getmtime(path), path))
+        except OSError as e:
+            logger.warning(f"Could not list {self.directory}: {e}")
+            return
+        for path in paths[:max(len(paths) - self.max_files, 0)]:
+            if path == self.file_path:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove {path}: {e}")
@@ -1,8 +1,17 @@
 import serial
+import socket
 import time
-from queue import Queue
+import logging
 from threading import Thread
 
+from serial.urlhandler import protocol_socket
+
+from utils.protocol import parse_line
+
+# How long a blocking read waits for the first byte before the reader
+# loop re-checks its running flag
+READ_TIMEOUT = 0.1
+
 def recv(ser, x):
     time.sleep(0.01)
     if ser.in_waiting > 0:
@@ -10,45 +19,227 @@ def recv(ser, x):
         return data + ser.read(min(x - 1, ser.in_waiting))
     return b''
 
+class SocketSerial(protocol_socket.Serial):
+    """socket://host:port port whose in_waiting counts the bytes received
+
+    pyserial's socket handler reports at most one byte waiting, which would
+    make read_available return the stream a byte at a time.
+    """
+    @property
+    def in_waiting(self):
+        try:
+            return len(self._socket.recv(1 << 16, socket.MSG_PEEK))
+        except BlockingIOError:
+            return 0
+
+def open_port(port, baudrate):
+    """Open a serial device, or a TCP endpoint given as socket://host:port"""
+    if port.startswith("socket://"):
+        return SocketSerial(port, baudrate=baudrate, timeout=READ_TIMEOUT)
+    return serial.serial_for_url(port, baudrate=baudrate, timeout=READ_TIMEOUT)
+
+def read_available(ser):
+    """Block for the first byte, then return everything already buffered"""
+    return ser.read(ser.in_waiting or 1)
+
+class LineFramer:
+    """Incrementally split a byte stream into stripped, non-empty lines"""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Append a chunk and return the complete lines it terminates"""
+        if b'\n' not in data:
+            self.buffer += data
+            return []
+
+        self.buffer += data
+        end = self.buffer.rfind(b'\n')
+        chunk = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        return [line for line in (part.strip() for part in chunk.split(b'\n')) if line]
+
+    def clear(self):
+        self.buffer.clear()
+
+class IngestMeter:
+    """Ingest statistics: throughput, parse errors and reader CPU cost per MB"""
+    def __init__(self, log_interval=10.0):
+        self.log_interval = log_interval
+        self.start()
+
+    def start(self):
+        """Reset the counters; must be called from the reader thread"""
+        self.bytes_total = 0
+        self.lines_total = 0
+        self.parse_errors = 0
+        self.cpu_start = time.thread_time()
+        self.cpu_total = 0.0
+        self.started = time.monotonic()
+        self.last_log = self.started
+        self.last_snapshot = (self.started, 0, 0)
+
+    def add(self, nbytes, nlines):
+        self.bytes_total += nbytes
+        self.lines_total += nlines
+        # thread_time() is per-thread, so sample it here on the reader thread
+        self.cpu_total = time.thread_time() - self.cpu_start
+
+    def cpu_ms_per_mb(self):
+        if self.bytes_total == 0:
+            return 0.0
+        return self.cpu_total * 1000 / (self.bytes_total / 1e6)
+
+    def snapshot(self):
+        """Return the totals plus the rates since the previous snapshot"""
+        now = time.monotonic()
+        last_time, last_bytes, last_lines = self.last_snapshot
+        bytes_total, lines_total = self.bytes_total, self.lines_total
+        elapsed = max(now - last_time, 1e-9)
+        self.last_snapshot = (now, bytes_total, lines_total)
+        return {
+            'bytes_total': bytes_total,
+            'lines_total': lines_total,
+            'parse_errors': self.parse_errors,
+            'bytes_per_s': (bytes_total - last_bytes) / elapsed,
+            'lines_per_s': (lines_total - last_lines) / elapsed,
+            'uptime_s': now - self.started,
+            'cpu_ms_per_mb': self.cpu_ms_per_mb(),
+        }
+
+    def summary(self):
+        return (f"{self.bytes_total / 1e6:.3f} MB, {self.lines_total} lines, "
+                f"{self.parse_errors} parse errors, {self.cpu_total * 1000:.1f} ms CPU, "
+                f"{self.cpu_ms_per_mb():.1f} ms CPU/MB")
+
+    def maybe_log(self, logger):
+        """Log the running totals at most once per log interval"""
+        now = time.monotonic()
+        if now - self.last_log >= self.log_interval:
+            self.last_log = now
+            logger.debug(f"Serial ingest: {self.summary()}")
+
 class SerialHandler:
-    def __init__(self, port, baudrate):
-        self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=1)
-        self.running = True
-        self.data_queue = Queue()
+    """Shared serial ingest pipeline: transport -> line framing -> parsing -> subscribers
+
+    Subscribers are called on the reader thread as ``callback(records, arrival)``
+    with the records parsed from one read and its ``time.monotonic()`` arrival
+    time. The parser (``utils.protocol.parse_line`` by default) turns one framed
+    line (bytes) into a record; returning None drops the line and raising
+    ValueError/IndexError counts a parse error. ``last_line`` always holds the
+    most recent framed line for status displays.
+
+    Raw subscribers get every chunk exactly as read, before framing, as
+    ``callback(data, arrival)``; they run on the reader thread too, so they
+    must return quickly and never wait on I/O.
+
+    Consumers that buffer between a subscriber and their own thread register
+    that BoundedQueue with ``add_queue(name, queue)``; ``stats()`` then
+    includes each queue's counters under ``queues``.
+    """
+    def __init__(self, port=None, baudrate=9600, transport=None, parser=None):
+        self.logger = logging.getLogger(__name__)
+        if transport is None:
+            transport = open_port(port, baudrate)
+        self.serial = transport
+        self.parser = parser or parse_line
+        self.subscribers = []
+        self.raw_subscribers = []
+        self.last_line = b''
+        self.running = False
         self.read_thread = None
-        
-    def start_reading(self):
+        self.meter = IngestMeter()
+        self.queues = {}
+
+    def subscribe(self, callback):
+        self.subscribers = self.subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        self.subscribers = [s for s in self.subscribers if s != callback]
+
+    def subscribe_raw(self, callback):
+        self.raw_subscribers = self.raw_subscribers + [callback]
+
+    def unsubscribe_raw(self, callback):
+        self.raw_subscribers = [s for s in self.raw_subscribers if s != callback]
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
         self.read_thread = Thread(target=self._read_loop, daemon=True)
         self.read_thread.start()
-        
+
+    def stop(self):
+        self.running = False
+        if self.read_thread:
+            self.read_thread.join(timeout=1.0)
+            self.read_thread = None
+
+    def add_queue(self, name, queue):
+        self.queues = {**self.queues, name: queue}
+
+    def remove_queue(self, name):
+        self.queues = {key: queue for key, queue in self.queues.items() if key != name}
+
+    def stats(self):
+        stats = self.meter.snapshot()
+        stats['queues'] = {name: queue.stats() for name, queue in self.queues.items()}
+        return stats
+
     def _read_loop(self):
-        buffer = ""
+        framer = LineFramer()
+        meter = self.meter
+        meter.start()
         while self.running:
             try:
-                if self.serial.in_waiting > 0:
-                    line = self.serial.readline().decode('utf-8')
-                    if line:
-                        buffer += line
-                        lines = buffer.split('\n')
-                        buffer = lines[-1]
-                        
-                        for line in lines[:-1]:
-                            line = line.strip()
-                            if line:
-                                self.data_queue.put(line)
+                data = read_available(self.serial)
+                if not data:
+                    continue
+                arrival = time.monotonic()
+
+                for callback in self.raw_subscribers:
+                    try:
+                        callback(data, arrival)
+                    except Exception as e:
+                        self.logger.error(f"Error in raw serial subscriber: {str(e)}", exc_info=True)
+
+                lines = framer.feed(data)
+                if lines:
+                    self.last_line = lines[-1]
+                records = self._parse_lines(lines)
+                meter.add(len(data), len(lines))
+
+                if records:
+                    for callback in self.subscribers:
+                        try:
+                            callback(records, arrival)
+                        except Exception as e:
+                            self.logger.error(f"Error in serial subscriber: {str(e)}", exc_info=True)
+
+                meter.maybe_log(self.logger)
             except Exception as e:
                 print(f"Error reading serial data: {e}")
                 time.sleep(0.001)
-                
+
+    def _parse_lines(self, lines):
+        parser = self.parser
+        records = []
+        for line in lines:
+            try:
+                record = parser(line)
+            except (ValueError, IndexError):
+                self.meter.parse_errors += 1
+                continue
+            if record is not None:
+                records.append(record)
+        return records
+
     def send_command(self, command):
         self.serial.write(f"{command}\n".encode('utf-8'))
-        
-    def get_data(self):
-        return self.data_queue.get() if not self.data_queue.empty() else None
-        
+
     def close(self):
-        self.running = False
-        if self.read_thread:
-            self.read_thread.join(timeout=1.0)
+        self.stop()
         if self.serial and self.serial.is_open:
-            self.serial.close() 
\ No newline at end of file
+            self.serial.close()
+        self.logger.debug(f"Serial ingest totals: {self.meter.summary()}")
@@ -0,0 +1,182 @@
+"""Recorder for the raw serial byte stream of a live session
+
+Every chunk the SerialHandler reader thread receives is logged exactly as
+read, with its ``time.monotonic()`` arrival time, so a session can be replayed
+byte for byte later. Session files (``session_*.zss``) start with a fixed
+header and hold one record per chunk:
+
+  header  magic b"ZSSR", version (u32), wall-clock time (f8), monotonic time (f8)
+  record  arrival (f8, monotonic seconds), length (u32), raw bytes
+
+All fields are little-endian. The header's two clock readings were taken
+together, so ``arrival + wall - monotonic`` is the wall-clock arrival time.
+"""
+import logging
+import os
+import struct
+import time
+from threading import Thread, Event
+
+from utils.bounded_queue import BoundedQueue, BLOCK
+from utils.rotating_writer import RotatingFileWriter
+
+logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+SESSION_PREFIX = "session"
+SESSION_SUFFIX = ".zss"
+
+_MAGIC = b"ZSSR"
+_HEADER = struct.Struct("<4sIdd")
+_RECORD = struct.Struct("<dI")
+
+# When fsync is called: never (left to the OS), when a file is complete, or
+# additionally every fsync_interval seconds while recording
+FSYNC_NEVER = 'never'
+FSYNC_ROTATE = 'rotate'
+FSYNC_INTERVAL = 'interval'
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_ROTATE, FSYNC_INTERVAL)
+
+def default_session_dir():
+    return os.path.join(os.path.expanduser("~"), "ZSOM-CurrentSense", "sessions")
+
+class SessionRecorder:
+    """Append raw serial chunks to rotating session files from a writer thread
+
+    ``handle_data`` is a SerialHandler raw subscriber: it only queues the
+    chunk, so the reader thread does not wait on the disk. The writer thread
+    wakes every ``write_interval`` seconds and writes everything queued in one
+    go. The queue holds at most ``max_pending_bytes``; with the default BLOCK
+    policy a recording never loses data, and if the disk falls that far behind
+    the reader thread waits for it (the time is counted as ``blocked_ms``).
+    With DROP_OLDEST the oldest queued chunks are discarded instead.
+    """
+    def __init__(self, directory=None, max_bytes=64 << 20, max_files=100,
+                 fsync_policy=FSYNC_INTERVAL, fsync_interval=1.0, write_interval=0.05,
+                 max_pending_bytes=64 << 20, queue_policy=BLOCK):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {fsync_policy!r}")
+        self.directory = directory or default_session_dir()
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.write_interval = write_interval
+        self.queue = BoundedQueue(max_pending_bytes, queue_policy)
+        self.stop_event = Event()
+        self.thread = None
+        self.writer = None
+        # Written by the writer thread only; the queue keeps its own counters
+        self.written_bytes = 0
+        self.write_ms_max = 0.0
+        self.fsyncs = 0
+        self.fsync_ms_max = 0.0
+
+    def start(self):
+        header = _HEADER.pack(_MAGIC, SESSION_VERSION, time.time(), time.monotonic())
+        self.writer = RotatingFileWriter(self.directory, SESSION_PREFIX, SESSION_SUFFIX,
+                                         self.max_bytes, self.max_files, header=header,
+                                         sync_on_rotate=self.fsync_policy != FSYNC_NEVER)
+        self.stop_event.clear()
+        self.thread = Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write out everything still queued and close the current file"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        # Release a reader thread still waiting for room
+        self.queue.close()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def file_path(self):
+        return self.writer.file_path if self.writer else None
+
+    def handle_data(self, data, arrival):
+        """Queue one raw chunk (reader thread)"""
+        self.queue.put((arrival, data), len(data))
+
+    def stats(self):
+        queue = self.queue.stats()
+        return {
+            'bytes_queued': queue['put_total'],
+            'bytes_written': self.written_bytes,
+            'dropped_chunks': queue['dropped_items'],
+            'dropped_bytes': queue['dropped_total'],
+            'pending_bytes_max': queue['high_water'],
+            'blocked_ms': queue['blocked_ms'],
+            'queue_wait_ms_max': queue['wait_ms_max'],
+            'write_ms_max': self.write_ms_max,
+            'fsyncs': self.fsyncs,
+            'fsync_ms_max': self.fsync_ms_max,
+            'files': self.writer.files_written if self.writer else 0,
+        }
+
+    def _write_loop(self):
+        last_sync = time.monotonic()
+        try:
+            while not self.stop_event.wait(self.write_interval):
+                self._drain()
+                if self.fsync_policy == FSYNC_INTERVAL and time.monotonic() - last_sync >= self.fsync_interval:
+                    self._sync()
+                    last_sync = time.monotonic()
+            self._drain()
+        except Exception as e:
+            logger.error(f"Session recording stopped: {str(e)}", exc_info=True)
+        finally:
+            self.writer.close()
+
+    def _drain(self):
+        chunks = self.queue.get()
+        if not chunks:
+            return
+        start = time.perf_counter()
+        out = bytearray()
+        written = 0
+        pack = _RECORD.pack
+        for arrival, data in chunks:
+            out += pack(arrival, len(data))
+            out += data
+            written += len(data)
+        self.writer.write(bytes(out))
+        self.writer.flush()
+        self.written_bytes += written
+        self.write_ms_max = max(self.write_ms_max, (time.perf_counter() - start) * 1000)
+
+    def _sync(self):
+        start = time.perf_counter()
+        self.writer.flush(sync=True)
+        self.fsyncs += 1
+        self.fsync_ms_max = max(self.fsync_ms_max, (time.perf_counter() - start) * 1000)
+
+def read_session_header(file):
+    """Return (wall_time, monotonic_time) from an open session file"""
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("not a session file")
+    magic, version, wall, monotonic = _HEADER.unpack(header)
+    if magic != _MAGIC or version != SESSION_VERSION:
+        raise ValueError("not a session file")
+    return wall, monotonic
+
+def iter_session(path):
+    """Yield (arrival, data) for every chunk in a session file
+
+    A record cut short by a crash ends the iteration quietly.
+    """
+    with open(path, 'rb') as file:
+        read_session_header(file)
+        while True:
+            head = file.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            arrival, length = _RECORD.unpack(head)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield arrival, data
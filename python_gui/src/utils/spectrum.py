@@ -0,0 +1,61 @@
+"""Welch power spectral density of current readings
+
+Readings are cut into overlapping segments; each is mean-removed, multiplied
+by a Hann window and transformed with np.fft.rfft, and the periodograms are
+averaged. Segments are processed in blocks, so a long capture never needs
+more than one block of FFT output in memory and a computation can be
+abandoned between blocks.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+# The firmware stores one reading per millisecond (dump indices are ms)
+DUMP_SAMPLE_RATE = 1000.0
+
+DEFAULT_SEGMENT_LENGTH = 4096
+BLOCK_SEGMENTS = 256
+
+# Fewer readings than this give no useful spectrum
+MIN_SPECTRUM_SAMPLES = 64
+
+class Spectrum(NamedTuple):
+    frequencies: np.ndarray    # Hz, 0 to Nyquist
+    density: np.ndarray        # one-sided PSD in mA^2/Hz
+    segments: int
+    segment_length: int
+    sample_rate: float
+
+def welch(currents, sample_rate, segment_length=DEFAULT_SEGMENT_LENGTH, overlap=0.5, cancelled=None):
+    """Welch PSD of ``currents`` (mA) sampled at ``sample_rate`` (Hz)
+
+    Captures shorter than ``segment_length`` are analysed as one segment.
+    ``cancelled`` is polled between blocks; when it returns True the
+    computation stops and None is returned.
+    """
+    currents = np.asarray(currents)
+    if len(currents) < MIN_SPECTRUM_SAMPLES:
+        raise ValueError(f"need at least {MIN_SPECTRUM_SAMPLES} readings, got {len(currents)}")
+    if sample_rate <= 0:
+        raise ValueError("sample rate must be positive")
+    length = min(segment_length, len(currents))
+    step = max(int(length * (1 - overlap)), 1)
+    segments = np.lib.stride_tricks.sliding_window_view(currents, length)[::step]
+    window = np.hanning(length)
+
+    power = np.zeros(length // 2 + 1)
+    for start in range(0, len(segments), BLOCK_SEGMENTS):
+        if cancelled is not None and cancelled():
+            return None
+        block = segments[start:start + BLOCK_SEGMENTS].astype(np.float64)
+        block -= block.mean(axis=1, keepdims=True)
+        block *= window
+        transform = np.fft.rfft(block, axis=1)
+        power += (transform.real ** 2 + transform.imag ** 2).sum(axis=0)
+
+    density = power / (len(segments) * sample_rate * (window ** 2).sum())
+    # One-sided: fold the negative frequencies onto the positive ones,
+    # except for DC and (for even lengths) Nyquist, which appear once
+    density[1:length // 2 + length % 2] *= 2
+    return Spectrum(np.fft.rfftfreq(length, 1 / sample_rate), density, len(segments), length,
+                    float(sample_rate))
@@ -0,0 +1,172 @@
+"""Rolling statistics of the live current stream
+
+Every window is a ring of ``BUCKETS`` time buckets, each holding the count,
+sum, sum of squares, minimum, maximum and charge of the readings that
+arrived in it plus a QuantileSketch histogram. A chunk of readings is
+reduced once and added to the current bucket of every window; a query
+merges the buckets still inside the window. Both cost the same for a one
+second window as for a one hour one, and the window edge moves in steps of
+one bucket (1/BUCKETS of its length).
+"""
+import math
+import time
+from threading import Lock
+
+import numpy as np
+
+# Windows (seconds) besides the whole session, and buckets per window
+DEFAULT_WINDOWS = (1.0, 10.0, 60.0)
+BUCKETS = 20
+
+# A pause in the stream longer than this (the board stopped measuring) adds
+# no charge; shorter gaps are the time the chunk's readings cover
+MAX_CHARGE_GAP = 1.0
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class QuantileSketch:
+    """Log-spaced bins with relative accuracy ``accuracy`` (DDSketch layout)
+
+    Bin i > 0 holds values in (min_value * gamma^(i-1), min_value * gamma^i]
+    with gamma = (1 + accuracy) / (1 - accuracy); bin 0 holds everything up
+    to min_value (0 mA readings). Histograms of the same sketch merge by
+    adding their counts, which is what the window buckets rely on.
+    """
+    def __init__(self, accuracy=0.01, min_value=0.1, max_value=65535.0):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins = int(math.ceil(math.log(max_value / min_value) / self.log_gamma)) + 2
+        # Value reported for each bin: the point of least relative error
+        upper = min_value * self.gamma ** np.arange(self.bins)
+        self.values = np.concatenate([[0.0], 2 * upper[1:] / (self.gamma + 1)])
+
+    def histogram(self, values):
+        """Bin counts of an array of values"""
+        with np.errstate(divide='ignore'):
+            index = np.ceil(np.log(values / self.min_value) / self.log_gamma)
+        index = np.clip(np.nan_to_num(index, nan=0.0, neginf=0.0), 0, self.bins - 1).astype(np.intp)
+        return np.bincount(index, minlength=self.bins)
+
+    def quantiles(self, counts, quantiles=QUANTILES):
+        """Estimated values at ``quantiles`` of a (merged) histogram"""
+        total = counts.sum()
+        if not total:
+            return [math.nan] * len(quantiles)
+        ranks = np.cumsum(counts)
+        index = np.searchsorted(ranks, np.asarray(quantiles) * (total - 1), side='right')
+        return self.values[np.minimum(index, self.bins - 1)].tolist()
+
+class RollingWindow:
+    """Bucket ring for one window; ``length`` None keeps a single session bucket"""
+    def __init__(self, length, sketch, buckets=BUCKETS):
+        self.length = length
+        slots = buckets if length else 1
+        self.span = length / buckets if length else math.inf
+        self.ids = np.full(slots, -1, dtype=np.int64)
+        self.counts = np.zeros(slots, dtype=np.int64)
+        self.sums = np.zeros(slots)
+        self.squares = np.zeros(slots)
+        self.minima = np.full(slots, math.inf)
+        self.maxima = np.full(slots, -math.inf)
+        self.charges = np.zeros(slots)
+        self.histograms = np.zeros((slots, sketch.bins), dtype=np.int64)
+
+    def bucket_id(self, now):
+        return int(now // self.span) if self.length else 0
+
+    def add(self, now, count, total, squares, minimum, maximum, charge, histogram):
+        bucket = self.bucket_id(now)
+        slot = bucket % len(self.ids)
+        if self.ids[slot] != bucket:
+            self.ids[slot] = bucket
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+            self.squares[slot] = 0.0
+            self.minima[slot] = math.inf
+            self.maxima[slot] = -math.inf
+            self.charges[slot] = 0.0
+            self.histograms[slot] = 0
+        self.counts[slot] += count
+        self.sums[slot] += total
+        self.squares[slot] += squares
+        self.minima[slot] = min(self.minima[slot], minimum)
+        self.maxima[slot] = max(self.maxima[slot], maximum)
+        self.charges[slot] += charge
+        self.histograms[slot] += histogram
+
+    def live(self, now):
+        """Mask of the buckets still inside the window"""
+        return (self.ids >= 0) & (self.ids > self.bucket_id(now) - len(self.ids))
+
+class StreamStats:
+    """Mean, min, max, RMS, quantiles, sample rate and charge of a live stream
+
+    ``add`` is called on the reader thread with each chunk of readings (mA)
+    and its monotonic arrival time; ``snapshot`` may be called from any
+    thread. Each window's entry is a dict with count, mean, min, max, rms,
+    p50, p95, p99 (mA, from the sketch), rate (readings/s over the part of
+    the window that has elapsed) and charge_mah. The session entry is keyed
+    None.
+    """
+    def __init__(self, windows=DEFAULT_WINDOWS, sketch=None):
+        self.sketch = sketch or QuantileSketch()
+        self.windows = tuple(windows) + (None,)
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.rolling = {length: RollingWindow(length, self.sketch) for length in self.windows}
+            self.first_arrival = None
+            self.last_arrival = None
+
+    def add(self, currents, arrival):
+        currents = np.asarray(currents, dtype=np.float64)
+        if not len(currents):
+            return
+        # Reduce the chunk once, outside the lock
+        total = float(currents.sum())
+        summary = (len(currents), total, float(currents @ currents), float(currents.min()),
+                   float(currents.max()))
+        histogram = self.sketch.histogram(currents)
+        with self.lock:
+            if self.first_arrival is None:
+                self.first_arrival = arrival
+            gap = arrival - self.last_arrival if self.last_arrival is not None else 0.0
+            self.last_arrival = arrival
+            # mA * s of the readings, spread over the time since the last chunk
+            charge = total / len(currents) * gap if gap <= MAX_CHARGE_GAP else 0.0
+            for window in self.rolling.values():
+                window.add(arrival, *summary, charge, histogram)
+
+    def snapshot(self, now=None):
+        """{window length or None: stats dict} as of ``now`` (time.monotonic())"""
+        now = time.monotonic() if now is None else now
+        result = {}
+        with self.lock:
+            for length, window in self.rolling.items():
+                live = window.live(now)
+                count = int(window.counts[live].sum())
+                if not count:
+                    result[length] = None
+                    continue
+                elapsed = now - self.first_arrival
+                if length:
+                    # The oldest live bucket starts the window
+                    oldest = (window.bucket_id(now) - len(window.ids) + 1) * window.span
+                    elapsed = min(elapsed, now - oldest)
+                p50, p95, p99 = self.sketch.quantiles(window.histograms[live].sum(axis=0))
+                result[length] = {
+                    'count': count,
+                    'mean': window.sums[live].sum() / count,
+                    'min': window.minima[live].min(),
+                    'max': window.maxima[live].max(),
+                    'rms': math.sqrt(window.squares[live].sum() / count),
+                    'p50': p50,
+                    'p95': p95,
+                    'p99': p99,
+                    'rate': count / elapsed if elapsed > 0 else math.nan,
+                    'charge_mah': window.charges[live].sum() / 3600,
+                }
+        return result
@@ -0,0 +1,93 @@
+"""Evaluation of many deviation tables against labelled dumps
+
+Each dump is reduced once, in a process pool, to the largest deviation per
+set and current range plus the deviations of all its compared readings.
+Against those features a table's result is a handful of comparisons: a set
+is flagged when any of its maxima exceeds the table value for the range, and
+the number of flagged readings is a binary search in the sorted deviations.
+"""
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+from utils.dump_cache import load_or_parse
+from utils.thresholds import THRESHOLD_RANGES, detector_for_dump
+
+# Result columns per table, after one deviation column per range
+RESULT_COLUMNS = ("detected_dumps", "detection_rate", "detected_sets", "false_alarm_dumps",
+                  "false_alarm_sets", "false_alarm_readings")
+
+class DumpFeatures(NamedTuple):
+    """What a sweep needs from one dump"""
+    set_maxima: np.ndarray       # (sets, ranges) largest deviation %, -inf if none
+    range_deviations: list       # per range, deviation % of every compared reading
+
+def dump_features(path, cache=None):
+    """Parse (or load from the cache) one dump and reduce it to DumpFeatures,
+    or None if it is not a valid dump; runs in a process pool"""
+    reader = load_or_parse(path, cache)
+    if not reader.valid:
+        return None
+    detector = detector_for_dump(reader)
+    starts = [segment.start for segment in reader.sets] or [0]
+    return DumpFeatures(detector.set_maxima(starts), detector.range_deviations())
+
+def table_grid(values_per_range):
+    """Every combination of the candidate values, one table per row"""
+    return np.array(list(itertools.product(*values_per_range)), dtype=np.float64)
+
+class SweepCorpus:
+    """Features of the normal and abnormal dumps, stacked for evaluation"""
+    def __init__(self, normal, abnormal):
+        self.normal_maxima, self.normal_offsets = self._stack(normal)
+        self.abnormal_maxima, self.abnormal_offsets = self._stack(abnormal)
+        self.abnormal_dumps = len(abnormal)
+        # Sorted per range, so flagged readings are counted by binary search
+        self.normal_deviations = [
+            np.sort(np.concatenate([features.range_deviations[index] for features in normal]
+                                   or [np.empty(0)]))
+            for index in range(len(THRESHOLD_RANGES))]
+
+    @staticmethod
+    def _stack(features):
+        """All set maxima in one matrix plus the first row of every dump"""
+        features = [item for item in features if len(item.set_maxima)]
+        if not features:
+            return np.empty((0, len(THRESHOLD_RANGES))), np.empty(0, dtype=np.int64)
+        counts = [len(item.set_maxima) for item in features]
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        return np.vstack([item.set_maxima for item in features]), offsets
+
+    def evaluate(self, tables):
+        """(tables, RESULT_COLUMNS) counts for a block of tables"""
+        tables = np.asarray(tables, dtype=np.float64)
+        results = np.zeros((len(tables), len(RESULT_COLUMNS)))
+        if len(self.abnormal_maxima):
+            flagged = self._flag_sets(self.abnormal_maxima, tables)
+            detected = np.logical_or.reduceat(flagged, self.abnormal_offsets, axis=1)
+            results[:, 0] = detected.sum(axis=1)
+            results[:, 1] = results[:, 0] / self.abnormal_dumps
+            results[:, 2] = flagged.sum(axis=1)
+        if len(self.normal_maxima):
+            flagged = self._flag_sets(self.normal_maxima, tables)
+            results[:, 3] = np.logical_or.reduceat(flagged, self.normal_offsets, axis=1).sum(axis=1)
+            results[:, 4] = flagged.sum(axis=1)
+        for index, deviations in enumerate(self.normal_deviations):
+            results[:, 5] += len(deviations) - np.searchsorted(deviations, tables[:, index], side='right')
+        return results
+
+    @staticmethod
+    def _flag_sets(maxima, tables):
+        """(tables, sets) True where a set has a deviation above the table"""
+        return (maxima[None, :, :] > tables[:, None, :]).any(axis=2)
+
+# The corpus is sent to every pool process once, through the initializer
+_corpus = None
+
+def init_worker(corpus):
+    global _corpus
+    _corpus = corpus
+
+def evaluate_block(tables):
+    return _corpus.evaluate(tables)
@@ -0,0 +1,89 @@
+"""Host-side copy of the firmware's deviation check
+
+The firmware flags a reading as abnormal when it differs from the previous
+reading of the same set by more than the deviation percentage configured for
+the previous reading's current range (``getThreshold`` in the sketch);
+previous readings of 0 mA are never compared.
+"""
+import numpy as np
+
+# Range names used by the THR:<range>:<value> command, in table order
+THRESHOLD_RANGES = ("0.0-30.0", "30.1-60.0", "60.1-90.0", ">90.1")
+
+# Inclusive upper bound (mA) of every range but the last
+RANGE_LIMITS = np.array([30.0, 60.0, 90.0])
+
+# Deviation % the threshold table starts with
+DEFAULT_DEVIATIONS = (300.0, 200.0, 100.0, 50.0)
+
+# The firmware's compiled-in deviation table (DEV_* defines), in effect on
+# the board until THR: commands replace it
+FIRMWARE_DEVIATIONS = (300.0, 50.0, 25.0, 25.0)
+
+class DeviationDetector:
+    """Deviation check precomputed for one capture, re-run per threshold table
+
+    Every reading's deviation from its predecessor (in %) and the current
+    range of that predecessor are computed once, with np.diff and
+    np.digitize; ``events(deviations)`` is then a single gather and compare,
+    cheap enough to repeat on every edit of the threshold table. Readings are
+    only compared within a set: ``set_starts`` lists the index of each set's
+    first reading (the whole capture is one set by default).
+    """
+    def __init__(self, currents, set_starts=None):
+        currents = np.asarray(currents, dtype=np.float64)
+        self.sample_count = len(currents)
+        previous = currents[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Same expression as the firmware: |cur - prev| / prev * 100
+            percent = np.abs(np.diff(currents)) / previous * 100
+        # Previous readings of 0 mA (or less) are never compared, and neither
+        # are the first readings of later sets
+        percent[~(previous > 0)] = -np.inf
+        if set_starts is not None:
+            starts = np.asarray(set_starts, dtype=np.int64)
+            starts = starts[(starts > 0) & (starts < self.sample_count)]
+            percent[starts - 1] = -np.inf
+        self.percent = percent
+        self.ranges = np.digitize(previous, RANGE_LIMITS, right=True).astype(np.int8)
+
+    def flags(self, deviations=DEFAULT_DEVIATIONS):
+        """Boolean mask over readings 1..n-1: True where a reading is flagged"""
+        table = np.asarray(deviations, dtype=np.float64)
+        return self.percent > table[self.ranges]
+
+    def events(self, deviations=DEFAULT_DEVIATIONS):
+        """Indices of the readings the firmware would flag"""
+        return np.flatnonzero(self.flags(deviations)) + 1
+
+    def set_maxima(self, set_starts):
+        """Largest deviation % per set (rows) and predecessor range (columns)
+
+        A set is flagged by a table exactly when one of its row's values
+        exceeds the table's value for that range, so a sweep over many tables
+        only needs this (sets x 4) matrix. -inf where a set has no compared
+        reading in a range.
+        """
+        starts = np.asarray(set_starts, dtype=np.int64)
+        maxima = np.full((len(starts), len(THRESHOLD_RANGES)), -np.inf)
+        compared = np.flatnonzero(self.percent > -np.inf)
+        if len(starts) and len(compared):
+            # Reading i + 1 is compared with reading i, so it decides the set
+            sets = np.searchsorted(starts, compared + 1, side='right') - 1
+            valid = sets >= 0
+            np.maximum.at(maxima, (sets[valid], self.ranges[compared[valid]]), self.percent[compared[valid]])
+        return maxima
+
+    def range_deviations(self):
+        """Deviation % of every compared reading, one array per predecessor range"""
+        compared = self.percent > -np.inf
+        return [self.percent[compared & (self.ranges == index)] for index in range(len(THRESHOLD_RANGES))]
+
+def detector_for_dump(reader):
+    """DeviationDetector over all readings of a parsed dump, set by set"""
+    _, currents = reader.arrays()
+    return DeviationDetector(currents, [segment.start for segment in reader.sets])
+
+def deviation_events(currents, deviations=DEFAULT_DEVIATIONS):
+    """Indices of the samples in one set that the firmware would flag"""
+    return DeviationDetector(currents).events(deviations)
@@ -0,0 +1,91 @@
+from PySide6.QtCore import QTimer
+import pyqtgraph as pg
+import numpy as np
+
+from utils.decimation import minmax_decimate
+
+class DecimatedCurve(pg.PlotDataItem):
+    """Plot curve that only hands pyqtgraph a min/max reduction of the visible data
+
+    The full data set is kept on the item and reduced to one min/max pair per
+    pixel column of the current view whenever the data or the x-range changes
+    (coalesced to once per event-loop pass). ``dataBounds`` reports the full
+    data extent, so auto-range still zooms out to the whole capture. With a
+    LodPyramid attached, views are served from its precomputed levels instead
+    of scanning every visible sample.
+
+    The arrays passed to ``set_full_data`` are kept by reference and re-read
+    on every later view change, so callers must hand over arrays they own
+    and no longer modify: copy views of a buffer that is written in place.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.full_x = np.empty(0)
+        self.full_y = np.empty(0)
+        self.y_bounds = (None, None)
+        self.pyramid = None
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(0)
+        self.refresh_timer.timeout.connect(self.redecimate)
+
+    def set_full_data(self, x, y):
+        """Replace the data set; x must be sorted ascending and the arrays
+        must not be modified afterwards (they are not copied)"""
+        self.pyramid = None
+        self.full_x = np.asarray(x)
+        self.full_y = np.asarray(y)
+        if len(self.full_y):
+            self.y_bounds = (float(np.min(self.full_y)), float(np.max(self.full_y)))
+        else:
+            self.y_bounds = (None, None)
+        self.schedule_redecimate()
+
+    def set_pyramid(self, pyramid):
+        """Show the series summarised by a LodPyramid"""
+        self.set_full_data(pyramid.x, pyramid.y)
+        self.pyramid = pyramid
+        if pyramid.levels:
+            # The coarsest level covers everything in one block
+            mins, maxs, _ = pyramid.levels[-1]
+            self.y_bounds = (float(mins[0]), float(maxs[0]))
+
+    def clear_data(self):
+        self.set_full_data(np.empty(0), np.empty(0))
+
+    def schedule_redecimate(self):
+        if not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+
+    def visible_columns(self):
+        """Return the current (x_min, x_max) view range and its width in pixels"""
+        view_box = self.getViewBox()
+        if view_box is None:
+            return None
+        (x_min, x_max), _ = view_box.viewRange()
+        return x_min, x_max, max(int(view_box.width()), 1)
+
+    def decimate(self, x_min, x_max, columns):
+        """Reduce the full data set to the drawable points for one view"""
+        if self.pyramid is not None:
+            return self.pyramid.query(x_min, x_max, columns)
+        return minmax_decimate(self.full_x, self.full_y, x_min, x_max, columns)
+
+    def redecimate(self):
+        view = self.visible_columns()
+        if view is None or len(self.full_x) == 0:
+            self.setData([], [])
+            return
+        x, y = self.decimate(*view)
+        self.setData(x, y)
+
+    def viewRangeChanged(self, *args, **kwargs):
+        super().viewRangeChanged(*args, **kwargs)
+        self.schedule_redecimate()
+
+    def dataBounds(self, ax, frac=1.0, orthoRange=None):
+        if len(self.full_x) == 0:
+            return (None, None)
+        if ax == 0:
+            return (float(self.full_x[0]), float(self.full_x[-1]))
+        return self.y_bounds
@@ -0,0 +1,49 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
+import pyqtgraph as pg
+import numpy as np
+
+class SpectrumPanel(QWidget):
+    """Power spectral density plot (log scale) with a one-line summary
+
+    ``show_spectrum`` draws a utils.spectrum.Spectrum; the DC bin is left
+    out, since the segments are mean-removed and it only holds leakage.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(2, 2, 2, 2)
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground('k')
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_widget.setLabel('left', 'PSD', units='mA²/Hz')
+        self.plot_widget.setLabel('bottom', 'Frequency', units='Hz')
+        self.plot_widget.setLogMode(x=False, y=True)
+        self.curve = self.plot_widget.plot(pen=pg.mkPen('y', width=1))
+        self.summary_label = QLabel("No spectrum")
+
+        layout.addWidget(self.plot_widget)
+        layout.addWidget(self.summary_label)
+
+    def show_spectrum(self, spectrum, seconds=None, source=""):
+        frequencies = spectrum.frequencies[1:]
+        density = spectrum.density[1:]
+        self.curve.setData(frequencies, np.maximum(density, np.finfo(np.float64).tiny))
+        text = ""
+        if len(density):
+            peak = int(np.argmax(density))
+            text = f"peak {frequencies[peak]:.2f} Hz | "
+        text += (f"{spectrum.segments} segments of {spectrum.segment_length} at "
+                 f"{spectrum.sample_rate:.0f} Hz, {spectrum.frequencies[1]:.3f} Hz resolution")
+        if seconds is not None:
+            text += f" | computed in {seconds * 1000:.0f} ms"
+        if source:
+            text = f"{source}: {text}"
+        self.summary_label.setText(text)
+
+    def set_message(self, text):
+        self.summary_label.setText(text)
+
+    def clear(self):
+        self.curve.setData([], [])
+        self.summary_label.setText("No spectrum")
@@ -0,0 +1,100 @@
+from PySide6.QtCore import QObject, Signal
+from threading import Thread, Event
+import logging
+import time
+
+from utils.dump_reader import DumpReader, iter_line_blocks, CHUNK_SIZE
+from utils.lod_pyramid import load_or_build_pyramid
+from utils.dump_cache import file_identity
+
+class FileLoadProgress:
+    """Snapshot of a load in progress; ``times``/``currents`` are read-only
+    views of the samples parsed so far"""
+    __slots__ = ('bytes_read', 'total_bytes', 'sample_count', 'times', 'currents')
+
+    def __init__(self, bytes_read, total_bytes, times, currents):
+        self.bytes_read = bytes_read
+        self.total_bytes = total_bytes
+        self.sample_count = len(times)
+        self.times = times
+        self.currents = currents
+
+class FileLoadWorker(QObject):
+    """Parse a dump file on a background thread
+
+    ``progress`` is emitted at most once every ``interval_ms`` while chunks are
+    parsed, then exactly one of ``finished(reader, pyramid)``, ``cancelled()``
+    or ``failed(message)``. ``pyramid`` is a LodPyramid when the capture has at
+    least ``lod_min_samples`` samples, otherwise None. With a DumpCache, a
+    current cache entry replaces parsing and fresh results are stored in it.
+    Signals are queued onto the GUI thread, so connected slots may touch
+    widgets directly.
+    """
+    progress = Signal(object)
+    finished = Signal(object, object)
+    cancelled = Signal()
+    failed = Signal(str)
+
+    def __init__(self, file_path, lod_min_samples=None, cache=None, chunk_size=CHUNK_SIZE,
+                 interval_ms=100, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.file_path = file_path
+        self.lod_min_samples = lod_min_samples
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.interval = interval_ms / 1000
+        self.cancel_event = Event()
+        self.thread = None
+
+    def start(self):
+        self.cancel_event.clear()
+        self.thread = Thread(target=self._load, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _load(self):
+        try:
+            reader = self.cache.load(self.file_path) if self.cache else None
+            if reader is None:
+                reader = self._parse()
+                if reader is None:
+                    self.cancelled.emit()
+                    return
+
+            pyramid = None
+            if reader.valid and self.lod_min_samples and len(reader.samples) >= self.lod_min_samples:
+                times, currents = reader.arrays()
+                pyramid = load_or_build_pyramid(self.file_path, times, currents)
+            if self.cancel_event.is_set():
+                self.cancelled.emit()
+                return
+            self.finished.emit(reader, pyramid)
+        except Exception as e:
+            self.logger.error(f"Error loading {self.file_path}: {str(e)}", exc_info=True)
+            self.failed.emit(str(e))
+
+    def _parse(self):
+        """Parse the file, emitting progress; None if cancelled"""
+        identity = file_identity(self.file_path)
+        total_bytes = identity['size']
+        reader = DumpReader(total_bytes)
+        last_emit = time.monotonic()
+        for block in iter_line_blocks(self.file_path, self.chunk_size):
+            if self.cancel_event.is_set():
+                return None
+            reader.feed_lines(block)
+            now = time.monotonic()
+            if now - last_emit >= self.interval:
+                last_emit = now
+                self.progress.emit(FileLoadProgress(reader.bytes_read, total_bytes,
+                                                    *reader.samples.views()))
+        reader.finish()
+        if self.cache:
+            self.cache.store(self.file_path, reader, identity)
+        return reader
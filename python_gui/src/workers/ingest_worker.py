@@ -0,0 +1,79 @@
+from PySide6.QtCore import QObject, Signal
+from threading import Thread, Event
+import logging
+
+from utils.anomaly_detector import StreamingDetector
+from utils.bounded_queue import BoundedQueue, DROP_OLDEST
+from utils.record_batcher import RecordBatcher, split_samples
+from utils.stream_stats import StreamStats, DEFAULT_WINDOWS
+
+# Live samples held for the GUI; beyond this the oldest are dropped, so a
+# stalled window resumes with fresh data instead of a stale backlog
+MAX_PENDING_SAMPLES = 100_000
+
+# Anomaly events held for the GUI, likewise dropping the oldest
+MAX_PENDING_EVENTS = 10_000
+
+class IngestWorker(QObject):
+    """Deliver parsed serial data to the GUI as one batch per interval
+
+    Parsing and state tracking happen on the SerialHandler reader thread (via
+    RecordBatcher); a small flush thread emits ``batch_ready`` at most once
+    every ``interval_ms``. The signal is queued onto the GUI thread, so slots
+    connected to it may touch widgets directly.
+
+    Live samples bypass the signal: they wait in ``samples``, a drop-oldest
+    BoundedQueue of at most ``max_pending_samples`` that the GUI drains at
+    its own pace. It is registered with the SerialHandler as the "display"
+    queue, so its counters show up in ``serial_handler.stats()``.
+
+    Each chunk of live samples also goes through ``detector`` (a
+    StreamingDetector) on the reader thread; what it flags waits in
+    ``events``, the "events" queue, so the GUI can mark it on the next frame
+    without waiting for a batch. They are also added to ``stats`` (a
+    StreamStats over ``stats_windows`` seconds plus the session), so its
+    windows count every reading, including those the display queue drops.
+    """
+    batch_ready = Signal(object)
+
+    def __init__(self, serial_handler, interval_ms=16, max_pending_samples=MAX_PENDING_SAMPLES,
+                 stats_windows=DEFAULT_WINDOWS, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.serial_handler = serial_handler
+        self.interval = interval_ms / 1000
+        self.samples = BoundedQueue(max_pending_samples, DROP_OLDEST, split=split_samples)
+        self.events = BoundedQueue(MAX_PENDING_EVENTS, DROP_OLDEST)
+        self.detector = StreamingDetector()
+        self.stats = StreamStats(stats_windows)
+        self.batcher = RecordBatcher(self.samples, self.detector, self.events, self.stats)
+        self.stop_event = Event()
+        self.flush_thread = None
+        serial_handler.subscribe(self.batcher.handle_records)
+        serial_handler.add_queue("display", self.samples)
+        serial_handler.add_queue("events", self.events)
+
+    def start(self):
+        self.stop_event.clear()
+        self.flush_thread = Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.serial_handler.unsubscribe(self.batcher.handle_records)
+        self.serial_handler.remove_queue("display")
+        self.serial_handler.remove_queue("events")
+        if self.flush_thread:
+            self.flush_thread.join(timeout=1.0)
+            self.flush_thread = None
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                batch = self.batcher.take_batch()
+                if batch is None:
+                    continue
+                batch.last_line = self.serial_handler.last_line.decode('utf-8', errors='replace')
+                self.batch_ready.emit(batch)
+            except Exception as e:
+                self.logger.error(f"Error emitting ingest batch: {str(e)}", exc_info=True)
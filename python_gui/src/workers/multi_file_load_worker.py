@@ -0,0 +1,79 @@
+from PySide6.QtCore import QObject, Signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threading import Thread, Event
+import multiprocessing
+import logging
+import os
+
+from utils.dump_cache import load_or_parse
+
+class MultiFileLoadWorker(QObject):
+    """Parse many dump files concurrently in a process pool
+
+    Files already in the DumpCache are loaded directly; the rest are parsed
+    in up to ``max_workers`` processes (one per core by default). Emits
+    ``file_loaded(path, reader)`` or ``file_failed(path, message)`` per file
+    in completion order, then ``finished()`` once, also after ``cancel``.
+    Signals are queued onto the GUI thread, so connected slots may touch
+    widgets directly.
+    """
+    file_loaded = Signal(str, object)
+    file_failed = Signal(str, str)
+    finished = Signal()
+
+    def __init__(self, file_paths, cache=None, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.file_paths = list(file_paths)
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cancel_event = Event()
+        self.thread = None
+
+    def start(self):
+        self.cancel_event.clear()
+        self.thread = Thread(target=self._load, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _load(self):
+        try:
+            pending = []
+            for path in self.file_paths:
+                if self.cancel_event.is_set():
+                    return
+                reader = self.cache.load(path) if self.cache else None
+                if reader is None:
+                    pending.append(path)
+                else:
+                    self.file_loaded.emit(path, reader)
+            if pending:
+                self._parse_in_pool(pending)
+        except Exception as e:
+            self.logger.error(f"Error loading dump files: {str(e)}", exc_info=True)
+        finally:
+            self.finished.emit()
+
+    def _parse_in_pool(self, paths):
+        # Spawned rather than forked workers: forking a process that runs Qt
+        # threads is unsafe, and spawn is what Windows does anyway
+        executor = ProcessPoolExecutor(max_workers=min(len(paths), self.max_workers),
+                                       mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {executor.submit(load_or_parse, path, self.cache): path for path in paths}
+            for future in as_completed(futures):
+                if self.cancel_event.is_set():
+                    break
+                path = futures[future]
+                try:
+                    self.file_loaded.emit(path, future.result())
+                except Exception as e:
+                    self.logger.error(f"Error parsing {path}: {str(e)}")
+                    self.file_failed.emit(path, str(e))
+        finally:
+            executor.shutdown(wait=not self.cancel_event.is_set(), cancel_futures=True)
@@ -0,0 +1,96 @@
+from PySide6.QtCore import QObject, Signal
+from threading import Thread, Event, Lock
+from collections import OrderedDict
+import logging
+import time
+
+from utils.spectrum import welch
+
+# Spectra kept per worker, least recently requested dropped first
+CACHE_SIZE = 16
+
+class SpectrumWorker(QObject):
+    """Compute Welch spectra on a background thread, cached by data version
+
+    ``request(key, currents, sample_rate)`` returns the cached Spectrum if
+    ``key`` was computed before; otherwise it hands the data to the thread
+    and returns None, and ``finished(key, spectrum, seconds)`` follows once it
+    is done (``failed(key, message)`` on error). ``key`` must change whenever
+    the data does. Only the newest request is kept: one made while another is
+    being computed replaces it, and the older computation is abandoned at
+    its next block of segments. ``currents`` must not be modified until the
+    result arrives. With ``cache=False`` (data whose key changes on every
+    request, like a live window) the result goes to a single slot of its
+    own instead of the cache, so it never evicts cached spectra. Signals are
+    queued onto the GUI thread, so connected slots may touch widgets
+    directly.
+    """
+    finished = Signal(object, object, float)
+    failed = Signal(object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.cache = OrderedDict()
+        self.uncached = (None, None)
+        self.lock = Lock()
+        self.pending = None
+        self.wake_event = Event()
+        self.stop_event = Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def request(self, key, currents, sample_rate, cache=True):
+        with self.lock:
+            spectrum = self.cache.get(key)
+            if spectrum is not None:
+                self.cache.move_to_end(key)
+                return spectrum
+            if self.uncached[0] == key:
+                return self.uncached[1]
+            self.pending = (key, currents, sample_rate, cache)
+        self.wake_event.set()
+        return None
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def _superseded(self):
+        return self.pending is not None or self.stop_event.is_set()
+
+    def _run(self):
+        while True:
+            self.wake_event.wait()
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                return
+            with self.lock:
+                request, self.pending = self.pending, None
+            if request is None:
+                continue
+            key, currents, sample_rate, cache = request
+            try:
+                start = time.perf_counter()
+                spectrum = welch(currents, sample_rate, cancelled=self._superseded)
+                if spectrum is None:
+                    self.wake_event.set()  # Pick up the newer request
+                    continue
+                with self.lock:
+                    if cache:
+                        self.cache[key] = spectrum
+                        while len(self.cache) > CACHE_SIZE:
+                            self.cache.popitem(last=False)
+                    else:
+                        self.uncached = (key, spectrum)
+                self.finished.emit(key, spectrum, time.perf_counter() - start)
+            except Exception as e:
+                self.logger.error(f"Error computing spectrum: {str(e)}", exc_info=True)
+                self.failed.emit(key, str(e))